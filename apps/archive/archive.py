@@ -38,6 +38,7 @@ from superdesk.metadata.packages import LINKED_IN_PACKAGES, RESIDREF
 from apps.common.components.utils import get_component
 from apps.item_autosave.components.item_autosave import ItemAutosave
 from apps.common.models.base_model import InvalidEtag
+from apps.archive.versions import DeltaVersionsMixin, DELTA_FIELD
 from superdesk.text_utils import update_word_count
 from apps.content import push_content_notification, push_expired_notification
 from apps.common.models.utils import get_model
@@ -115,16 +116,19 @@ def update_associations(doc):
 
 
 class ArchiveVersionsResource(Resource):
-    schema = item_schema()
+    schema = item_schema({DELTA_FIELD: {'type': 'dict'}})
     extra_response_fields = extra_response_fields
     item_url = item_url
     resource_methods = []
     internal_resource = True
     privileges = {'PATCH': 'archive'}
-    mongo_indexes = {'guid': ([('guid', 1)], {'background': True})}
+    mongo_indexes = {
+        'guid': ([('guid', 1)], {'background': True}),
+        'document_version_1': ([('_id_document', 1), (config.VERSION, -1)], {'background': True}),
+    }
 
 
-class ArchiveVersionsService(BaseService):
+class ArchiveVersionsService(DeltaVersionsMixin, BaseService):
     def on_deleted(self, doc):
         remove_media_files(doc)
 
@@ -845,16 +849,17 @@ class ArchiveService(BaseService):
         if updates.get('force_unlock', False):
             del updates['force_unlock']
 
-    def get_expired_items(self, expiry_datetime, invalid_only=False):
+    def get_expired_items(self, expiry_datetime, invalid_only=False, unique_id=0):
         """Get the expired items.
 
         Where content state is not scheduled and the item matches given parameters
 
         :param datetime expiry_datetime: expiry datetime
         :param bool invalid_only: True only invalid items
+        :param int unique_id: only items with greater unique id, used to continue previous run
         :return pymongo.cursor: expired non published items.
         """
-        unique_id = 0
+        unique_id = unique_id or 0
 
         while True:
             req = ParsedRequest()
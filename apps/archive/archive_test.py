@@ -275,6 +275,20 @@ class RemoveSpikedContentTestCase(TestCase):
             for key, rendition in item.get('renditions').items():
                 media_delete.assert_any_call(rendition['media'])
 
+    def test_remove_media_files_skips_lazy_renditions(self):
+        item = {
+            '_id': 'testimage',
+            'type': 'picture',
+            'renditions': {
+                'viewImage': {'media': '123', 'mimetype': 'image/jpeg'},
+                'thumbnail': {'lazy': {'media': '123', 'width': 169, 'format': 'jpeg'}, 'mimetype': 'image/jpeg'},
+            }
+        }
+
+        with patch.object(self.app.media, 'delete') as media_delete:
+            remove_media_files(item)
+            media_delete.assert_called_once_with('123')
+
     def test_remove_media_files_for_picture_associations(self):
         item = {
             '_id': 'testimage',
@@ -9,7 +9,10 @@
 # at https://www.sourcefabric.org/superdesk/license
 
 import functools as ft
+import itertools
 import logging
+import time
+import pymongo
 import superdesk
 from flask import current_app as app
 from eve.utils import config, ParsedRequest
@@ -19,14 +22,19 @@ from superdesk.celery_task_utils import get_lock_id
 from superdesk.utc import utcnow
 from .archive import SOURCE as ARCHIVE
 from superdesk.metadata.item import ITEM_STATE, CONTENT_STATE, ITEM_TYPE, CONTENT_TYPE, ASSOCIATIONS, MEDIA_TYPES
-from superdesk.lock import lock, unlock, remove_locks
+from superdesk.lock import lock, unlock, touch, remove_locks
 from superdesk.notification import push_notification
 from superdesk import get_resource_service
+from eve.versioning import versioned_id_field
 from bson.objectid import ObjectId
+from .versions import encode_versions, decode_versions, is_snapshot, get_size
 from datetime import timedelta
 
 logger = logging.getLogger(__name__)
 
+#: mongo collection storing last processed item of expiry
+CHECKPOINTS_COLLECTION = 'expiry_checkpoints'
+
 
 def log_exeption(fn):
     @ft.wraps(fn)
@@ -50,6 +58,8 @@ class RemoveExpiredContent(superdesk.Command):
     """
 
     log_msg = ''
+    log_msg_format = "{{'_id': {_id}, 'unique_name': {unique_name}, 'version': {_current_version}, " \
+                     "'expired_on': {expiry}}}."
 
     def run(self):
         now = utcnow()
@@ -65,7 +75,7 @@ class RemoveExpiredContent(superdesk.Command):
         # both functions should be called, even the first one throw exception,
         # so they are wrapped with log_exeption
         self._remove_expired_publish_queue_items()
-        self._remove_expired_items(now)
+        self._remove_expired_items(now, lock_name)
         unlock(lock_name)
 
         push_notification('content:expired')
@@ -83,127 +93,243 @@ class RemoveExpiredContent(superdesk.Command):
             get_resource_service('publish_queue').delete({'_id': {'$lte': ObjectId.from_datetime(expire_time)}})
 
     @log_exeption
-    def _remove_expired_items(self, expiry_datetime):
+    def _remove_expired_items(self, expiry_datetime, lock_name=None):
         """Remove the expired items.
 
+        Items are processed per page, references of all items on page are resolved
+        using bulk queries and items are moved to archived and deleted in bulk.
+        Last processed item is stored after every page and the next run continues from it,
+        so the work done before the lock expired is not repeated.
+
         :param datetime expiry_datetime: expiry datetime
-        :param str log_msg: log message to be prefixed
+        :param str lock_name: lock to keep alive while processing
         """
         logger.info('{} Starting to remove published expired items.'.format(self.log_msg))
         archive_service = get_resource_service(ARCHIVE)
-        published_service = get_resource_service('published')
-        items_to_remove = set()
-        items_to_be_archived = dict()
         items_having_issues = dict()
+        filter_conditions = None
+        checkpoint = self._get_checkpoint()
+        if checkpoint:
+            logger.info('{} Continuing from unique id {}.'.format(self.log_msg, checkpoint))
 
-        for expired_items in archive_service.get_expired_items(expiry_datetime):
+        for expired_items in archive_service.get_expired_items(expiry_datetime, unique_id=checkpoint):
             if len(expired_items) == 0:
                 logger.info('{} No items found to expire.'.format(self.log_msg))
                 return
 
-            # delete spiked items
-            self.delete_spiked_items(expired_items)
-
-            # get killed items
-            killed_items = {item.get(config.ID_FIELD): item
-                            for item in expired_items
-                            if item.get(ITEM_STATE) in {CONTENT_STATE.KILLED, CONTENT_STATE.RECALLED}}
-
-            # check if killed items imported to legal
-            items_having_issues.update(self.check_if_items_imported_to_legal_archive(killed_items))
-
-            # filter out the killed items not imported to legal.
-            killed_items = {item_id: item for item_id, item in killed_items.items()
-                            if item_id not in items_having_issues}
-
-            # Get the not killed and spiked items
-            not_killed_items = {item.get(config.ID_FIELD): item for item in expired_items
-                                if item.get(ITEM_STATE) not in {
-                                    CONTENT_STATE.KILLED, CONTENT_STATE.SPIKED, CONTENT_STATE.RECALLED}}
-
-            log_msg_format = "{{'_id': {_id}, 'unique_name': {unique_name}, 'version': {_current_version}, " \
-                             "'expired_on': {expiry}}}."
-
-            # Processing items to expire
-            for item_id, item in not_killed_items.items():
-                item.setdefault(config.VERSION, 1)
-                item.setdefault('expiry', expiry_datetime)
-                item.setdefault('unique_name', '')
-                expiry_msg = log_msg_format.format(**item)
-                logger.info('{} Processing expired item. {}'.format(self.log_msg, expiry_msg))
-
-                processed_items = dict()
-                if item_id not in items_to_be_archived and item_id not in items_having_issues and \
-                        self._can_remove_item(item, processed_items):
-                    # item can be archived and removed from the database
-                    logger.info('{} Removing item. {}'.format(self.log_msg, expiry_msg))
-                    logger.info('{} Items to be removed. {}'.format(self.log_msg, processed_items))
-                    issues = self.check_if_items_imported_to_legal_archive(processed_items)
-                    if issues:
-                        items_having_issues.update(processed_items)
-                    else:
-                        items_to_be_archived.update(processed_items)
-
-            # all items to expire
-            items_to_expire = deepcopy(items_to_be_archived)
-
-            # check once again in items imported to legal
-            items_having_issues.update(self.check_if_items_imported_to_legal_archive(items_to_expire))
-            if items_having_issues:
-                # remove items not imported to legal
-                items_to_expire = {item_id: item for item_id, item in items_to_expire.items()
-                                   if item_id not in items_having_issues}
-
-                # remove items not imported to legal from archived items
-                items_to_be_archived = {item_id: item for item_id, item in items_to_be_archived.items()
-                                        if item_id not in items_having_issues}
-
-                # items_to_be_archived might contain killed items
-                for item_id, item in items_to_be_archived.items():
-                    if item.get(ITEM_STATE) in {CONTENT_STATE.KILLED, CONTENT_STATE.RECALLED}:
-                        killed_items[item_id] = item
-
-                # remove killed items from the items_to_be_archived
-                items_to_be_archived = {item_id: item for item_id, item in items_to_be_archived.items()
-                                        if item.get(ITEM_STATE) not in {CONTENT_STATE.KILLED, CONTENT_STATE.RECALLED}}
-
-            # add killed items to items to expire
-            items_to_expire.update(killed_items)
-
-            # get the filter conditions
-            logger.info('{} filter conditions.'.format(self.log_msg))
-            req = ParsedRequest()
-            filter_conditions = list(get_resource_service('content_filters').get(req=req,
-                                                                                 lookup={'is_archived_filter': True}))
-
-            # move to archived collection
-            logger.info('{} Archiving items.'.format(self.log_msg))
+            if filter_conditions is None:
+                # get the filter conditions
+                logger.info('{} filter conditions.'.format(self.log_msg))
+                req = ParsedRequest()
+                filter_conditions = list(get_resource_service('content_filters').get(
+                    req=req, lookup={'is_archived_filter': True}))
+
+            self._remove_expired_page(expired_items, expiry_datetime, items_having_issues, filter_conditions)
+            self._set_checkpoint(expired_items[-1]['unique_id'])
+            if lock_name:
+                touch(lock_name, expire=610)
+
+        # all items processed, start from the beginning next time
+        self._set_checkpoint(0)
+
+    def _remove_expired_page(self, expired_items, expiry_datetime, items_having_issues, filter_conditions):
+        """Remove single page of expired items.
+
+        :param list expired_items: expired items
+        :param datetime expiry_datetime: expiry datetime
+        :param dict items_having_issues: items not imported to legal archive found so far
+        :param list filter_conditions: archived filter conditions
+        """
+        # delete spiked items
+        self.delete_spiked_items(expired_items)
+
+        # get killed items
+        killed_items = {item.get(config.ID_FIELD): item
+                        for item in expired_items
+                        if item.get(ITEM_STATE) in {CONTENT_STATE.KILLED, CONTENT_STATE.RECALLED}}
+
+        # Get the not killed and spiked items
+        not_killed_items = {item.get(config.ID_FIELD): item for item in expired_items
+                            if item.get(ITEM_STATE) not in {
+                                CONTENT_STATE.KILLED, CONTENT_STATE.SPIKED, CONTENT_STATE.RECALLED} and
+                            item.get(config.ID_FIELD) not in items_having_issues}
+
+        for item_id, item in not_killed_items.items():
+            self._set_log_defaults(item, expiry_datetime)
+            logger.info('{} Processing expired item. {}'.format(self.log_msg, self.log_msg_format.format(**item)))
+
+        # Processing items to expire, resolving references for the whole page at once
+        removable_groups = self._get_removable_items(not_killed_items)
+
+        # check if all items are imported to legal using single check per page
+        items_to_check = dict(killed_items)
+        for group in removable_groups:
+            items_to_check.update(group)
+        for item in items_to_check.values():
+            self._set_log_defaults(item, expiry_datetime)
+        page_issues = self.check_if_items_imported_to_legal_archive(items_to_check) if items_to_check else {}
+
+        # filter out the killed items not imported to legal.
+        killed_items = {item_id: item for item_id, item in killed_items.items() if item_id not in page_issues}
+
+        items_to_be_archived = dict()
+        for group in removable_groups:
+            if any(item_id in page_issues for item_id in group):
+                page_issues.update(group)
+            else:
+                logger.info('{} Items to be removed. {}'.format(self.log_msg, list(group.keys())))
+                items_to_be_archived.update(group)
+
+        items_having_issues.update(page_issues)
+        if items_having_issues:
+            # items_to_be_archived might contain killed items
             for item_id, item in items_to_be_archived.items():
-                self._move_to_archived(item, filter_conditions)
+                if item.get(ITEM_STATE) in {CONTENT_STATE.KILLED, CONTENT_STATE.RECALLED}:
+                    killed_items[item_id] = item
 
-            for item_id, item in killed_items.items():
-                # delete from the published collection and queue
-                msg = log_msg_format.format(**item)
-                try:
-                    published_service.delete_by_article_id(item_id)
-                    logger.info('{} Deleting killed item from published. {}'.format(self.log_msg, msg))
-                    items_to_remove.add(item_id)
-                except Exception:
-                    logger.exception('{} Failed to delete killed item from published. {}'.format(self.log_msg, msg))
+            # remove killed items from the items_to_be_archived
+            items_to_be_archived = {item_id: item for item_id, item in items_to_be_archived.items()
+                                    if item.get(ITEM_STATE) not in {CONTENT_STATE.KILLED, CONTENT_STATE.RECALLED}}
 
-            if items_to_remove:
-                logger.info('{} Deleting articles.: {}'.format(self.log_msg, items_to_remove))
-                archive_service.delete_by_article_ids(list(items_to_remove))
+        # move to archived collection
+        logger.info('{} Archiving items.'.format(self.log_msg))
+        self._move_items_to_archived(items_to_be_archived, filter_conditions)
 
-            for item_id, item in items_having_issues.items():
-                msg = log_msg_format.format(**item)
-                try:
-                    archive_service.system_update(item.get(config.ID_FIELD), {'expiry_status': 'invalid'}, item)
-                    logger.info('{} Setting item expiry status. {}'.format(self.log_msg, msg))
-                except Exception:
-                    logger.exception('{} Failed to set expiry status for item. {}'.format(self.log_msg, msg))
+        # delete killed items from the published collection, queue and archive
+        self._delete_killed_items(killed_items)
+
+        for item_id, item in page_issues.items():
+            msg = self.log_msg_format.format(**item)
+            try:
+                get_resource_service(ARCHIVE).system_update(item_id, {'expiry_status': 'invalid'}, item)
+                logger.info('{} Setting item expiry status. {}'.format(self.log_msg, msg))
+            except Exception:
+                logger.exception('{} Failed to set expiry status for item. {}'.format(self.log_msg, msg))
+
+    def _set_log_defaults(self, item, expiry_datetime):
+        item.setdefault(config.VERSION, 1)
+        item.setdefault('expiry', expiry_datetime)
+        item.setdefault('unique_name', '')
+
+    def _get_removable_items(self, items):
+        """Get groups of items which can be removed together.
+
+        References of items are resolved level by level for all items at once, item can be
+        removed if all items it references (recursively) are expired too.
+
+        :param dict items: expired items
+        :return list: dict of items per group, each group contains item with all its references
+        """
+        docs = dict(items)
+        refs = {}
+        pending = [item for item in items.values() if self._is_expired(item)]
+        while pending:
+            level_refs = self._get_items_refs(pending)
+            refs.update(level_refs)
+            missing = {ref for item_refs in level_refs.values() for ref in item_refs if ref not in docs}
+            pending = []
+            if missing:
+                lookup = {config.ID_FIELD: {'$in': list(missing)}}
+                for doc in get_resource_service(ARCHIVE).get_from_mongo(req=None, lookup=lookup):
+                    docs[doc[config.ID_FIELD]] = doc
+                    if self._is_expired(doc):
+                        pending.append(doc)
+
+        groups = []
+        grouped = set()
+        for item_id in items:
+            if item_id in grouped:
+                continue
+            group = self._get_removable_group(item_id, docs, refs)
+            if group:
+                groups.append(group)
+                grouped.update(group)
+        return groups
+
+    def _get_removable_group(self, item_id, docs, refs):
+        """Get item with all its references if all are expired.
+
+        :param item_id: item id
+        :param dict docs: archive items
+        :param dict refs: references per item
+        :return dict: items or ``None`` if any is not expired
+        """
+        group = dict()
+        stack = [item_id]
+        while stack:
+            _id = stack.pop()
+            if _id in group or _id not in docs:
+                continue
+            if not self._is_expired(docs[_id]):
+                return None
+            group[_id] = docs[_id]
+            stack.extend(refs.get(_id, []))
+        return group
+
+    def _is_expired(self, item):
+        return bool(item.get('expiry') and item.get('expiry') < utcnow())
+
+    def _get_items_refs(self, items):
+        """Get ids of items referenced by given items using bulk queries.
+
+        Same references as in :meth:`_can_remove_item` are used.
+
+        :param list items: archive items
+        :return dict: list of referenced ids per item id
+        """
+        package_service = PackageService()
+        refs = {item[config.ID_FIELD]: [] for item in items}
+        text_items = []
+        media_items = []
+        for item in items:
+            item_refs = refs[item[config.ID_FIELD]]
+            if item.get(ITEM_TYPE) == CONTENT_TYPE.COMPOSITE:
+                item_refs.extend(package_service.get_residrefs(item))
+
+            if item.get(ITEM_TYPE) in [CONTENT_TYPE.TEXT, CONTENT_TYPE.PREFORMATTED]:
+                text_items.append(item)
+                if item.get('rewrite_of'):
+                    item_refs.append(item.get('rewrite_of'))
+                if item.get('rewritten_by'):
+                    item_refs.append(item.get('rewritten_by'))
+
+            if item.get(ITEM_TYPE) in MEDIA_TYPES:
+                media_items.append(item)
+
+            item_refs.extend(package_service.get_linked_in_package_ids(item))
+
+        if text_items:
+            # If master story expires then check if broadcast item is included in a package.
+            master_ids = {str(item[config.ID_FIELD]): item[config.ID_FIELD] for item in text_items}
+            broadcast_items = get_resource_service('archive_broadcast').get_broadcast_items_from_master_stories(
+                text_items)
+            for broadcast_item in broadcast_items:
+                master_id = master_ids.get(str((broadcast_item.get('broadcast') or {}).get('master_id')))
+                if master_id is not None:
+                    refs[master_id].append(broadcast_item.get(config.ID_FIELD))
 
-            logger.info('{} Deleting killed from archive.'.format(self.log_msg))
+        for item_id, associated_ids in self._get_associated_items_map(media_items).items():
+            refs[item_id].extend(associated_ids)
+
+        return refs
+
+    def _get_associated_items_map(self, items):
+        """Get ids of items where media items are associated using single query.
+
+        :param list items: media items
+        :return dict: list of associated item ids per media item id
+        """
+        media_ids = [item[config.ID_FIELD] for item in items if item.get(ITEM_TYPE) in MEDIA_TYPES]
+        if not media_ids:
+            return {}
+        associated = {media_id: [] for media_id in media_ids}
+        references = get_resource_service('media_references').get(
+            req=None, lookup={'associated_id': {'$in': media_ids}})
+        for reference in references:
+            if reference['associated_id'] in associated and reference['item_id'] not in \
+                    associated[reference['associated_id']]:
+                associated[reference['associated_id']].append(reference['item_id'])
+        return associated
 
     def _can_remove_item(self, item, processed_item=None):
         """Recursively checks if the item can be removed.
@@ -332,6 +458,117 @@ class RemoveExpiredContent(superdesk.Command):
             failed_items = [item.get(config.ID_FIELD) for item in published_items]
             logger.exception('{} Failed to move to archived. {}'.format(self.log_msg, failed_items))
 
+    def _move_items_to_archived(self, items, filter_conditions):
+        """Move published versions of multiple items to archived and delete items using bulk operations.
+
+        Items are deleted only if their published versions were archived, those which failed
+        or if the bulk delete fails are moved one by one.
+
+        :param dict items: items to move
+        :param list filter_conditions: list of filter conditions
+        """
+        if not items:
+            return
+
+        item_ids = list(items.keys())
+        published_service = get_resource_service('published')
+        archived_ids = set()
+        try:
+            published_items = list(published_service.get_from_mongo(req=None, lookup={'item_id': {'$in': item_ids}}))
+            to_archive = [published_item for published_item in published_items
+                          if self._conforms_to_archived_filter(items[published_item['item_id']], filter_conditions)]
+            failed_ids = set()
+            if to_archive:
+                with superdesk.get_backend().bulk() as bulk:
+                    get_resource_service('archived').post(to_archive)
+                item_id_by_archived_id = {doc[config.ID_FIELD]: doc['item_id'] for doc in to_archive}
+                failed_ids = {item_id_by_archived_id.get(error[config.ID_FIELD]) for error in bulk.errors}
+                if failed_ids:
+                    logger.error('{} Failed to move items to text archive. {}'.format(self.log_msg, failed_ids))
+                logger.info('{} Moved {} published items to text archive.'.format(
+                    self.log_msg, len(to_archive) - len(failed_ids)))
+
+            archived_ids = {item_id for item_id in item_ids if item_id not in failed_ids}
+            moved_ids = list(archived_ids)
+            if moved_ids:
+                with superdesk.get_backend().bulk() as bulk:
+                    if published_items:
+                        published_service.delete({'item_id': {'$in': moved_ids}})
+                        get_resource_service('publish_queue').delete({'item_id': {'$in': moved_ids}})
+                        logger.info('{} Deleted published items. {}'.format(self.log_msg, moved_ids))
+                    get_resource_service(ARCHIVE).delete_by_article_ids(moved_ids)
+                if bulk.errors:
+                    raise Exception('Bulk errors {}'.format(bulk.errors))
+                logger.info('{} Deleted archive items. {}'.format(self.log_msg, moved_ids))
+
+            for item_id in failed_ids:
+                if item_id in items:
+                    self._move_to_archived(items[item_id], filter_conditions)
+        except Exception:
+            logger.exception('{} Failed to move items to archived in bulk, moving one by one. {}'.format(
+                self.log_msg, item_ids))
+            for item_id, item in items.items():
+                if item_id in archived_ids:
+                    self._delete_archived_item(item_id)
+                else:
+                    self._move_to_archived(item, filter_conditions)
+
+    def _delete_archived_item(self, item_id):
+        """Delete item which published versions were already moved to archived.
+
+        :param str item_id: item id
+        """
+        try:
+            get_resource_service('published').delete_by_article_id(item_id)
+            get_resource_service(ARCHIVE).delete_by_article_ids([item_id])
+            logger.info('{} Deleted archive item. {}'.format(self.log_msg, item_id))
+        except Exception:
+            logger.exception('{} Failed to delete archived item. {}'.format(self.log_msg, item_id))
+
+    def _delete_killed_items(self, killed_items):
+        """Delete killed items from the published collection, queue and archive.
+
+        :param dict killed_items: killed items
+        """
+        if not killed_items:
+            return
+
+        published_service = get_resource_service('published')
+        items_to_remove = set()
+        try:
+            item_ids = list(killed_items.keys())
+            published_service.delete({'item_id': {'$in': item_ids}})
+            get_resource_service('publish_queue').delete({'item_id': {'$in': item_ids}})
+            logger.info('{} Deleting killed items from published. {}'.format(self.log_msg, item_ids))
+            items_to_remove.update(item_ids)
+        except Exception:
+            logger.exception('{} Failed to delete killed items from published in bulk.'.format(self.log_msg))
+            for item_id, item in killed_items.items():
+                msg = self.log_msg_format.format(**item)
+                try:
+                    published_service.delete_by_article_id(item_id)
+                    logger.info('{} Deleting killed item from published. {}'.format(self.log_msg, msg))
+                    items_to_remove.add(item_id)
+                except Exception:
+                    logger.exception('{} Failed to delete killed item from published. {}'.format(self.log_msg, msg))
+
+        if items_to_remove:
+            logger.info('{} Deleting articles.: {}'.format(self.log_msg, items_to_remove))
+            get_resource_service(ARCHIVE).delete_by_article_ids(list(items_to_remove))
+
+    def _get_checkpoint(self):
+        """Get unique id of the last item processed by previous run."""
+        checkpoint = app.data.mongo.pymongo().db[CHECKPOINTS_COLLECTION].find_one({config.ID_FIELD: 'archive'})
+        return checkpoint.get('unique_id', 0) if checkpoint else 0
+
+    def _set_checkpoint(self, unique_id):
+        """Store unique id of the last processed item.
+
+        :param int unique_id: unique id, ``0`` to start from the beginning
+        """
+        app.data.mongo.pymongo().db[CHECKPOINTS_COLLECTION].update_one(
+            {config.ID_FIELD: 'archive'}, {'$set': {'unique_id': unique_id, 'updated': utcnow()}}, upsert=True)
+
     def _conforms_to_archived_filter(self, item, filter_conditions):
         """Check if the item can be moved the archived collection or not.
 
@@ -362,8 +599,17 @@ class RemoveExpiredContent(superdesk.Command):
         """
         try:
             logger.info('{} deleting spiked items.'.format(self.log_msg))
-            spiked_ids = [item.get(config.ID_FIELD) for item in items
-                          if item.get(ITEM_STATE) == CONTENT_STATE.SPIKED and not self._get_associated_items(item)]
+            spiked_items = [item for item in items if item.get(ITEM_STATE) == CONTENT_STATE.SPIKED]
+            associated = self._get_associated_items_map(spiked_items)
+            if associated:
+                # ensure that associated items are not deleted
+                associated_ids = list({_id for ids in associated.values() for _id in ids})
+                existing_ids = {doc[config.ID_FIELD] for doc in get_resource_service(ARCHIVE).get_from_mongo(
+                    req=None, lookup={config.ID_FIELD: {'$in': associated_ids}})}
+                associated = {media_id: [_id for _id in ids if _id in existing_ids]
+                              for media_id, ids in associated.items()}
+            spiked_ids = [item.get(config.ID_FIELD) for item in spiked_items
+                          if not associated.get(item.get(config.ID_FIELD))]
             if spiked_ids:
                 logger.warning('{} deleting spiked items: {}.'.format(self.log_msg, spiked_ids))
                 get_resource_service('archive').delete_by_article_ids(spiked_ids)
@@ -408,4 +654,78 @@ class RemoveExpiredContent(superdesk.Command):
         return items_not_moved
 
 
+class CompressVersions(superdesk.Command):
+    """Store existing item versions as periodic snapshots and deltas.
+
+    Versions of every item are decoded and encoded again using ``--interval`` (defaults to
+    ``VERSIONS_SNAPSHOT_INTERVAL``), ``--interval=1`` stores all versions in full again.
+    It prints size of stored, full and encoded versions and time needed to decode a version.
+    With ``--dry-run`` nothing is written so it can be used as a benchmark.
+
+    Example:
+    ::
+
+        $ python manage.py archive:compress_versions
+        $ python manage.py archive:compress_versions --resource=legal_archive_versions
+        $ python manage.py archive:compress_versions --interval=20 --dry-run
+        $ python manage.py archive:compress_versions --interval=1
+    """
+
+    option_list = [
+        superdesk.Option('--resource', '-r', dest='resource', default='archive_versions',
+                         choices=['archive_versions', 'legal_archive_versions']),
+        superdesk.Option('--interval', '-i', dest='interval', type=int),
+        superdesk.Option('--dry-run', '-d', action='store_true', dest='dry_run'),
+    ]
+
+    def run(self, resource='archive_versions', interval=None, dry_run=False):
+        interval = max(1, interval or app.config.get('VERSIONS_SNAPSHOT_INTERVAL', 1))
+        id_field = versioned_id_field(app.config['DOMAIN']['archive'])
+        collection = app.data.get_mongo_collection(resource)
+        stats = {'items': 0, 'versions': 0, 'updated': 0, 'stored': 0, 'full': 0, 'encoded': 0, 'decode_time': 0.0}
+
+        def get_base(_id):
+            return collection.find_one({config.ID_FIELD: _id})
+
+        print('Compressing {} with snapshot interval {}'.format(resource, interval))
+        # sort matching the document_version_1 index to avoid in memory sort
+        cursor = collection.find({}, sort=[(id_field, pymongo.ASCENDING), (config.VERSION, pymongo.DESCENDING)])
+        for item_id, group in itertools.groupby(cursor, key=lambda doc: doc.get(id_field)):
+            if not item_id:
+                continue
+            stored = list(reversed(list(group)))
+            versions = decode_versions(deepcopy(stored), get_base)
+            encoded = encode_versions(deepcopy(versions), {}, interval, id_field)
+
+            started = time.perf_counter()
+            decode_versions(deepcopy(encoded), get_base)
+            stats['decode_time'] += time.perf_counter() - started
+
+            stats['items'] += 1
+            stats['versions'] += len(stored)
+            stats['stored'] += sum(get_size(doc) for doc in stored)
+            stats['full'] += sum(get_size(doc) for doc in versions)
+            stats['encoded'] += sum(get_size(doc) for doc in encoded)
+
+            changed = [new for old, new in zip(stored, encoded) if old != new]
+            stats['updated'] += len(changed)
+            if not dry_run:
+                # write snapshots first so that deltas never reference missing base
+                for doc in sorted(changed, key=lambda doc: not is_snapshot(doc)):
+                    collection.replace_one({config.ID_FIELD: doc[config.ID_FIELD]}, doc)
+
+        self.print_stats(resource, stats, dry_run)
+        return stats
+
+    def print_stats(self, resource, stats, dry_run):
+        full = stats['full'] or 1
+        versions = stats['versions'] or 1
+        print('{}: {} versions of {} items, {} versions {}'.format(
+            resource, stats['versions'], stats['items'], stats['updated'], 'to update' if dry_run else 'updated'))
+        print('size: stored {} bytes ({:.0%}), full {} bytes, encoded {} bytes ({:.0%})'.format(
+            stats['stored'], stats['stored'] / full, stats['full'], stats['encoded'], stats['encoded'] / full))
+        print('decode time: {:.1f} us per version'.format(stats['decode_time'] / versions * 1000000))
+
+
 superdesk.command('archive:remove_expired', RemoveExpiredContent())
+superdesk.command('archive:compress_versions', CompressVersions())
@@ -1,5 +1,7 @@
+from datetime import timedelta
 
 from superdesk.tests import TestCase
+from superdesk.utc import utcnow
 from apps.archive.commands import RemoveExpiredContent
 
 
@@ -9,3 +11,54 @@ class RemoveExpiredContentTestCase(TestCase):
         command = RemoveExpiredContent()
         item = {'expiry': None, '_id': 'foo'}
         self.assertFalse(command._can_remove_item(item))
+
+    def test_get_removable_items(self):
+        past = utcnow() - timedelta(minutes=10)
+        future = utcnow() + timedelta(days=1)
+        items = [
+            {'_id': 'pkg', 'type': 'composite', 'expiry': past,
+             'groups': [{'id': 'main', 'refs': [{'residRef': 'text1'}]}]},
+            {'_id': 'text1', 'type': 'text', 'expiry': past, 'linked_in_packages': [{'package': 'pkg'}]},
+            {'_id': 'text2', 'type': 'text', 'expiry': past, 'rewritten_by': 'text3'},
+            {'_id': 'text3', 'type': 'text', 'expiry': future, 'rewrite_of': 'text2'},
+        ]
+        self.app.data.insert('archive', items)
+
+        command = RemoveExpiredContent()
+        groups = command._get_removable_items({'pkg': items[0], 'text1': items[1], 'text2': items[2]})
+        self.assertEqual([{'pkg', 'text1'}], [set(group.keys()) for group in groups])
+        self.assertTrue(command._can_remove_item(items[0]))
+        self.assertFalse(command._can_remove_item(items[2]))
+
+    def test_checkpoint(self):
+        command = RemoveExpiredContent()
+        self.assertEqual(0, command._get_checkpoint())
+        command._set_checkpoint(10)
+        self.assertEqual(10, command._get_checkpoint())
+        command._set_checkpoint(0)
+        self.assertEqual(0, command._get_checkpoint())
+
+    def test_move_items_to_archived_keeps_items_failed_to_archive(self):
+        items = [
+            {'_id': 'foo', 'type': 'text', 'state': 'published'},
+            {'_id': 'bar', 'type': 'text', 'state': 'published'},
+        ]
+        self.app.data.insert('archive', items)
+        self.app.data.get_mongo_collection('published').insert_many([
+            {'_id': 'published-foo', 'item_id': 'foo', 'type': 'text', '_current_version': 1},
+            {'_id': 'published-bar', 'item_id': 'bar', 'type': 'text', '_current_version': 1},
+        ])
+        # archived by previous run which failed later
+        self.app.data.get_mongo_collection('archived').insert_one({'_id': 'published-foo', 'item_id': 'foo'})
+
+        command = RemoveExpiredContent()
+        command._move_items_to_archived({item['_id']: item for item in items}, [])
+
+        archive = self.app.data.get_mongo_collection('archive')
+        published = self.app.data.get_mongo_collection('published')
+        archived = self.app.data.get_mongo_collection('archived')
+        self.assertIsNotNone(archive.find_one({'_id': 'foo'}))
+        self.assertIsNotNone(published.find_one({'item_id': 'foo'}))
+        self.assertIsNone(archive.find_one({'_id': 'bar'}))
+        self.assertIsNone(published.find_one({'item_id': 'bar'}))
+        self.assertIsNotNone(archived.find_one({'_id': 'published-bar'}))
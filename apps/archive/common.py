@@ -471,6 +471,9 @@ def remove_media_files(doc):
 
     for renditions in references:
         for rendition in renditions.values():
+            if not rendition.get('media'):
+                # lazy rendition which was never generated, cached one expires on its own
+                continue
             media = rendition.get('media') if isinstance(rendition.get('media'), str) else str(rendition.get('media'))
             try:
                 references = get_resource_service('media_references').get(req=None, lookup={
@@ -0,0 +1,279 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Delta encoded storage of item versions.
+
+Every ``VERSIONS_SNAPSHOT_INTERVAL`` versions of an item a full copy (snapshot) is stored,
+other versions only store fields which are small or were modified compared to the latest snapshot.
+Large unchanged fields are listed in ``version_delta.same`` and modified large text fields
+like ``body_html`` are stored as a patch in ``version_delta.text``.
+
+Services using :class:`DeltaVersionsMixin` encode versions on create and decode them
+on every read, so that callers always get full documents.
+"""
+
+import re
+import logging
+
+from bson import BSON, ObjectId
+from copy import deepcopy
+from difflib import SequenceMatcher
+from flask import current_app as app
+from eve.utils import config, ParsedRequest
+from eve.versioning import versioned_id_field
+
+logger = logging.getLogger(__name__)
+
+DELTA_FIELD = 'version_delta'
+
+#: fields stored in every version so they can be used in queries
+ALWAYS_STORED_FIELDS = {
+    config.ID_FIELD, config.VERSION, config.LAST_UPDATED, config.DATE_CREATED, config.ETAG,
+    'guid', 'unique_id', 'unique_name', 'type', 'state', 'task', 'operation',
+    'versioncreated', 'version_creator', 'original_creator',
+}
+
+#: fields smaller than this (bytes) are always stored
+MIN_DELTA_FIELD_SIZE = 200
+
+#: tokens are html tags and lines, every token ends with ``>`` or new line except the last one
+TOKEN_RE = re.compile(r'[^>\n]*[>\n]|[^>\n]+')
+
+
+def get_size(value):
+    """Get BSON size of given value."""
+    return len(BSON.encode({'v': value}))
+
+
+def make_text_patch(base, text):
+    """Get list of ``[start, end, replacement]`` operations transforming base text into text.
+
+    Texts are compared per html tags and lines.
+
+    :param str base: base text
+    :param str text: new text
+    """
+    base_tokens = TOKEN_RE.findall(base)
+    tokens = TOKEN_RE.findall(text)
+    matcher = SequenceMatcher(None, base_tokens, tokens)
+    return [[i1, i2, ''.join(tokens[j1:j2])] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != 'equal']
+
+
+def apply_text_patch(base, patch):
+    """Apply patch created by :func:`make_text_patch` to base text.
+
+    :param str base: base text
+    :param list patch: patch operations
+    """
+    base_tokens = TOKEN_RE.findall(base)
+    output = []
+    position = 0
+    for start, end, replacement in patch:
+        output.extend(base_tokens[position:start])
+        output.append(replacement)
+        position = end
+    output.extend(base_tokens[position:])
+    return ''.join(output)
+
+
+def encode_version(doc, base):
+    """Encode version as delta to base version.
+
+    :param dict doc: full version
+    :param dict base: full version snapshot with ``_id``
+    :return dict: encoded version, or ``doc`` itself if encoding would not save space
+    """
+    encoded = {}
+    same = []
+    text = {}
+    for field, value in doc.items():
+        if field in ALWAYS_STORED_FIELDS or field not in base:
+            encoded[field] = value
+            continue
+        size = get_size(value)
+        if size < MIN_DELTA_FIELD_SIZE:
+            encoded[field] = value
+        elif base[field] == value:
+            same.append(field)
+        elif isinstance(value, str) and isinstance(base[field], str):
+            patch = make_text_patch(base[field], value)
+            if get_size(patch) < size / 2:
+                text[field] = patch
+            else:
+                encoded[field] = value
+        else:
+            encoded[field] = value
+
+    if not same and not text:
+        return doc
+
+    encoded[DELTA_FIELD] = {'base': base[config.ID_FIELD], 'same': same, 'text': text}
+    return encoded
+
+
+def decode_version(doc, base):
+    """Decode version encoded by :func:`encode_version`.
+
+    :param dict doc: stored version, it's modified in place
+    :param dict base: base version snapshot
+    :return dict: full version
+    """
+    delta = doc.pop(DELTA_FIELD, None)
+    if not delta:
+        return doc
+    if base is None:
+        logger.error('Missing base version for version _id=%s', doc.get(config.ID_FIELD))
+        return doc
+    for field in delta.get('same', []):
+        doc[field] = deepcopy(base[field])
+    for field, patch in delta.get('text', {}).items():
+        doc[field] = apply_text_patch(base[field], patch)
+    return doc
+
+
+def is_snapshot(doc):
+    """Test if stored version is a full snapshot."""
+    return DELTA_FIELD not in doc
+
+
+def encode_versions(docs, snapshots, interval, id_field):
+    """Encode versions, creating new snapshot every ``interval`` versions.
+
+    Docs should be sorted by version. Snapshots get ``_id`` set if missing,
+    so that following versions can reference them.
+
+    :param list docs: full versions
+    :param dict snapshots: latest snapshot per document id, updated with new snapshots
+    :param int interval: max number of versions between snapshots
+    :param str id_field: versioned id field
+    :return list: encoded versions
+    """
+    encoded_docs = []
+    for doc in docs:
+        doc_id = doc.get(id_field)
+        snapshot = snapshots.get(doc_id) if doc_id else None
+        version = doc.get(config.VERSION) or 0
+        if snapshot is not None and 0 < version - (snapshot.get(config.VERSION) or 0) < interval:
+            encoded = encode_version(doc, snapshot)
+        else:
+            encoded = doc
+        if is_snapshot(encoded):
+            encoded.setdefault(config.ID_FIELD, ObjectId())
+            if doc_id:
+                snapshots[doc_id] = encoded
+        encoded_docs.append(encoded)
+    return encoded_docs
+
+
+def decode_versions(docs, get_base):
+    """Decode versions.
+
+    :param docs: stored versions
+    :param get_base: function returning base version for given ``_id``, used if not among ``docs``
+    """
+    bases = {}
+    for doc in docs:
+        if is_snapshot(doc):
+            bases[doc[config.ID_FIELD]] = doc
+    for doc in docs:
+        if not is_snapshot(doc):
+            base_id = doc[DELTA_FIELD]['base']
+            if base_id not in bases:
+                bases[base_id] = get_base(base_id)
+            decode_version(doc, bases[base_id])
+    return docs
+
+
+class DecodedVersionsCursor:
+    """Cursor wrapper decoding versions on iteration.
+
+    :param cursor: cursor with stored versions
+    :param get_base: function returning base version for given ``_id``
+    """
+
+    def __init__(self, cursor, get_base):
+        self.cursor = cursor
+        self.get_base = get_base
+        self._bases = {}
+
+    def __iter__(self):
+        for doc in self.cursor:
+            yield self._decode(doc)
+
+    def __getitem__(self, index):
+        return self._decode(self.cursor[index])
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def _decode(self, doc):
+        if is_snapshot(doc):
+            return doc
+        base_id = doc[DELTA_FIELD]['base']
+        if base_id not in self._bases:
+            self._bases[base_id] = self.get_base(base_id)
+        return decode_version(doc, self._bases[base_id])
+
+
+class DeltaVersionsMixin:
+    """Versions service mixin storing versions as delta to latest snapshot.
+
+    Snapshot is stored every ``VERSIONS_SNAPSHOT_INTERVAL`` versions, ``1`` disables encoding.
+    """
+
+    def create(self, docs, **kwargs):
+        interval = app.config.get('VERSIONS_SNAPSHOT_INTERVAL', 1)
+        if interval <= 1:
+            return super().create(docs, **kwargs)
+
+        id_field = versioned_id_field(app.config['DOMAIN']['archive'])
+        snapshots = {}
+        for doc_id in {doc.get(id_field) for doc in docs if doc.get(id_field)}:
+            snapshots[doc_id] = self.get_latest_snapshot(doc_id)
+
+        sorted_docs = sorted(docs, key=lambda doc: doc.get(config.VERSION) or 0)
+        encoded_docs = encode_versions([dict(doc) for doc in sorted_docs], snapshots, interval, id_field)
+        super().create(encoded_docs, **kwargs)
+        for doc, encoded in zip(sorted_docs, encoded_docs):
+            doc[config.ID_FIELD] = encoded[config.ID_FIELD]
+        return [doc[config.ID_FIELD] for doc in docs]
+
+    def get_latest_snapshot(self, doc_id):
+        """Get latest full version of given document.
+
+        :param doc_id: document id
+        """
+        req = ParsedRequest()
+        req.sort = '[("{}", -1)]'.format(config.VERSION)
+        req.max_results = 1
+        lookup = {versioned_id_field(app.config['DOMAIN']['archive']): doc_id, DELTA_FIELD: {'$exists': False}}
+        return next(iter(self.backend.get_from_mongo(self.datasource, req=req, lookup=lookup)), None)
+
+    def get_base_version(self, base_id):
+        """Get stored snapshot by ``_id`` without any access checks.
+
+        :param base_id: snapshot ``_id``
+        """
+        return self.backend.find_one(self.datasource, req=None, _id=base_id)
+
+    def find_one(self, req, **lookup):
+        doc = super().find_one(req, **lookup)
+        if doc is not None and not is_snapshot(doc):
+            decode_version(doc, self.get_base_version(doc[DELTA_FIELD]['base']))
+        return doc
+
+    def find(self, where, **kwargs):
+        return DecodedVersionsCursor(super().find(where, **kwargs), self.get_base_version)
+
+    def get(self, req, lookup):
+        return DecodedVersionsCursor(super().get(req, lookup), self.get_base_version)
+
+    def get_from_mongo(self, req, lookup):
+        return DecodedVersionsCursor(super().get_from_mongo(req, lookup), self.get_base_version)
@@ -0,0 +1,99 @@
+from copy import deepcopy
+
+from superdesk import get_resource_service
+from superdesk.tests import TestCase
+from apps.archive.commands import CompressVersions
+from apps.archive.versions import encode_version, decode_version, make_text_patch, apply_text_patch, \
+    is_snapshot, DELTA_FIELD
+
+
+def get_body(changed=()):
+    return ''.join('<p>paragraph {} {}</p>\n'.format(i, 'changed' if i in changed else 'lorem ipsum dolor sit')
+                   for i in range(30))
+
+
+class VersionsTestCase(TestCase):
+
+    def get_versions(self, count):
+        return [{
+            '_id_document': 'item',
+            '_current_version': version,
+            'headline': 'headline {}'.format(version),
+            'body_html': get_body(range(version)),
+            'body_footer': 'footer ' * 50,
+        } for version in range(1, count + 1)]
+
+    def test_text_patch(self):
+        base = get_body()
+        text = 'intro\n' + get_body([3, 4, 20]).replace('<p>paragraph 10 lorem ipsum dolor sit</p>\n', '')
+        patch = make_text_patch(base, text)
+        self.assertEqual(text, apply_text_patch(base, patch))
+        self.assertLess(len(str(patch)), len(text) / 5)
+
+    def test_text_patch_round_trip(self):
+        texts = ['', 'plain text without tags', '<p>foo</p>', 'line\n\nline\n', '>>\n<', get_body(), get_body([1])]
+        for base in texts:
+            for text in texts:
+                self.assertEqual(text, apply_text_patch(base, make_text_patch(base, text)))
+
+    def test_encode_decode(self):
+        base, doc = self.get_versions(2)
+        base['_id'] = 'base'
+        encoded = encode_version(deepcopy(doc), base)
+        self.assertFalse(is_snapshot(encoded))
+        self.assertEqual('base', encoded[DELTA_FIELD]['base'])
+        self.assertEqual(['body_footer'], encoded[DELTA_FIELD]['same'])
+        self.assertIn('body_html', encoded[DELTA_FIELD]['text'])
+        self.assertNotIn('body_html', encoded)
+        self.assertEqual(doc['headline'], encoded['headline'])
+        self.assertEqual(doc, decode_version(encoded, base))
+
+    def test_encode_small_doc(self):
+        base = {'_id': 'base', 'headline': 'foo'}
+        doc = {'headline': 'foo'}
+        self.assertIs(doc, encode_version(doc, base))
+
+    def test_service(self):
+        self.app.config['VERSIONS_SNAPSHOT_INTERVAL'] = 3
+        versions = self.get_versions(7)
+        service = get_resource_service('archive_versions')
+        service.post(deepcopy(versions))
+
+        stored = list(self.app.data.get_mongo_collection('archive_versions').find({}, sort=[('_current_version', 1)]))
+        self.assertEqual([True, False, False, True, False, False, True], [is_snapshot(doc) for doc in stored])
+
+        for version in versions:
+            doc = service.find_one(req=None, _id_document='item', _current_version=version['_current_version'])
+            self.assertEqual(version['body_html'], doc['body_html'])
+            self.assertEqual(version['body_footer'], doc['body_footer'])
+            self.assertNotIn(DELTA_FIELD, doc)
+
+        docs = list(service.get(req=None, lookup={'_id_document': 'item'}))
+        self.assertEqual(7, len(docs))
+        self.assertEqual(sorted(version['body_html'] for version in versions),
+                         sorted(doc['body_html'] for doc in docs))
+
+        service.post([dict(self.get_versions(8)[-1])])
+        last = self.app.data.get_mongo_collection('archive_versions').find_one({'_current_version': 8})
+        self.assertEqual(stored[-1]['_id'], last[DELTA_FIELD]['base'])
+
+    def test_compress_command(self):
+        self.app.config['VERSIONS_SNAPSHOT_INTERVAL'] = 1
+        versions = self.get_versions(5)
+        get_resource_service('archive_versions').post(deepcopy(versions))
+        collection = self.app.data.get_mongo_collection('archive_versions')
+        self.assertTrue(all(is_snapshot(doc) for doc in collection.find()))
+
+        stats = CompressVersions().run(interval=5, dry_run=True)
+        self.assertEqual(5, stats['versions'])
+        self.assertEqual(4, stats['updated'])
+        self.assertLess(stats['encoded'], stats['stored'])
+        self.assertTrue(all(is_snapshot(doc) for doc in collection.find()))
+
+        CompressVersions().run(interval=5)
+        self.assertEqual(1, len([doc for doc in collection.find() if is_snapshot(doc)]))
+        docs = list(get_resource_service('archive_versions').get(req=None, lookup={'_id_document': 'item'}))
+        self.assertEqual(sorted(version['body_html'] for version in versions), sorted(doc['body_html'] for doc in docs))
+
+        CompressVersions().run(interval=1)
+        self.assertTrue(all(is_snapshot(doc) for doc in collection.find()))
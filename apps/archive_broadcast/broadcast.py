@@ -118,13 +118,15 @@ class ArchiveBroadcastService(BaseService):
         if item.get(ITEM_STATE) not in [CONTENT_STATE.CORRECTED, CONTENT_STATE.PUBLISHED]:
             raise SuperdeskApiError.badRequestError(message="Invalid content state.")
 
-    def _get_broadcast_items(self, ids, include_archived_repo=False):
+    def _get_broadcast_items(self, ids, include_archived_repo=False, size=None, offset=0):
         """Returns list of broadcast items.
 
         Get the broadcast items for the master_id
 
         :param list ids: list of item ids
         :param include_archived_repo True if archived repo needs to be included in search, default is False
+        :param int size: max number of items returned, elastic default if not set
+        :param int offset: number of items to skip
         :return list: list of broadcast items
         """
         query = {
@@ -140,6 +142,10 @@ class ArchiveBroadcastService(BaseService):
             }
         }
 
+        if size:
+            query['size'] = size
+            query['from'] = offset
+
         req = ParsedRequest()
         repos = 'archive,published'
         if include_archived_repo:
@@ -161,6 +167,26 @@ class ArchiveBroadcastService(BaseService):
         ids = [str(item.get(config.ID_FIELD))]
         return list(self._get_broadcast_items(ids, include_archived_repo))
 
+    def get_broadcast_items_from_master_stories(self, items, include_archived_repo=False, page_size=500):
+        """Get the broadcast items for multiple master stories using paged search.
+
+        :param list items: master story items
+        :param include_archived_repo True if archived repo needs to be included in search, default is False
+        :param int page_size: number of broadcast items fetched per search request
+        :return list: returns list of broadcast items
+        """
+        ids = [str(item.get(config.ID_FIELD)) for item in items if not is_genre(item, BROADCAST_GENRE)]
+        broadcast_items = []
+        if not ids:
+            return broadcast_items
+
+        while True:
+            page = list(self._get_broadcast_items(ids, include_archived_repo, size=page_size,
+                                                  offset=len(broadcast_items)))
+            broadcast_items.extend(page)
+            if len(page) < page_size:
+                return broadcast_items
+
     def on_broadcast_master_updated(self, item_event, item, rewrite_id=None):
         """Runs when master item is updated.
 
@@ -0,0 +1,138 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+from eve.utils import config
+from superdesk import get_resource_service
+from apps.content_filters.filter_condition.filter_condition import FilterCondition
+
+
+class CompiledContentFilters:
+    """Content filters compiled for repeated matching.
+
+    Every filter condition is parsed only once into a predicate and every content filter
+    is turned into a flat plan - a list of expressions, each of them a tuple of filter condition
+    ids and a tuple of nested content filter ids. Plans are evaluated using :class:`ContentFilterMatcher`
+    which memoizes results per article, so filters shared by multiple products are evaluated only once.
+
+    :param dict filters: filters cache as built by ``EnqueueService.get_filters``,
+                         if not set filters are fetched from db when needed
+    """
+
+    def __init__(self, filters=None):
+        self.filters = filters
+        self._predicates = {}
+        self._plans = {}
+
+    def get_filter_condition(self, filter_condition_id):
+        if self.filters:
+            return self.filters.get('filter_conditions', {}).get(filter_condition_id, {}).get('fc')
+        return get_resource_service('filter_conditions').find_one(req=None, _id=filter_condition_id)
+
+    def get_content_filter(self, content_filter_id):
+        if self.filters:
+            return self.filters.get('content_filters', {}).get(content_filter_id, {}).get('cf')
+        return get_resource_service('content_filters').find_one(req=None, _id=content_filter_id)
+
+    def get_predicate(self, filter_condition_id):
+        """Get predicate for filter condition with given id.
+
+        :param filter_condition_id: filter condition id
+        """
+        try:
+            return self._predicates[filter_condition_id]
+        except KeyError:
+            filter_condition = FilterCondition.parse(self.get_filter_condition(filter_condition_id))
+            predicate = self._predicates[filter_condition_id] = filter_condition.get_predicate()
+            return predicate
+
+    def get_plan(self, content_filter):
+        """Get evaluation plan for content filter.
+
+        :param dict content_filter: content filter
+        """
+        filter_id = content_filter.get(config.ID_FIELD)
+        if filter_id is None:
+            return self.build_plan(content_filter)
+        try:
+            return self._plans[filter_id]
+        except KeyError:
+            plan = self._plans[filter_id] = self.build_plan(content_filter)
+            return plan
+
+    @staticmethod
+    def build_plan(content_filter):
+        plan = []
+        for expression in content_filter.get('content_filter', []):
+            expression = expression.get('expression', {})
+            plan.append((tuple(expression.get('fc', [])), tuple(expression.get('pf', []))))
+        return plan
+
+    def get_matcher(self, article):
+        """Get matcher for given article.
+
+        Matcher should be reused for all filters tested against the same article.
+
+        :param dict article: article to match
+        """
+        return ContentFilterMatcher(self, article)
+
+
+class ContentFilterMatcher:
+    """Matches content filters against single article.
+
+    Results of filter conditions and nested content filters are memoized,
+    so the article must not be modified while matcher is being used.
+
+    :param CompiledContentFilters compiled: compiled filters
+    :param dict article: article to match
+    """
+
+    def __init__(self, compiled, article):
+        self.compiled = compiled
+        self.article = article
+        self._conditions = {}
+        self._content_filters = {}
+
+    def does_match(self, content_filter):
+        """Test if article matches given content filter.
+
+        :param dict content_filter: content filter, if not set it matches every article
+        """
+        if not content_filter:
+            return True  # a non-existing filter matches every thing
+
+        filter_id = content_filter.get(config.ID_FIELD)
+        if filter_id is not None and filter_id in self._content_filters:
+            return self._content_filters[filter_id]
+
+        result = any(
+            all(self._condition_matches(fc) for fc in fc_ids) and all(self._filter_matches(pf) for pf in pf_ids)
+            for fc_ids, pf_ids in self.compiled.get_plan(content_filter)
+        )
+
+        if filter_id is not None:
+            self._content_filters[filter_id] = result
+        return result
+
+    def _condition_matches(self, filter_condition_id):
+        try:
+            return self._conditions[filter_condition_id]
+        except KeyError:
+            result = self._conditions[filter_condition_id] = \
+                self.compiled.get_predicate(filter_condition_id)(self.article)
+            return result
+
+    def _filter_matches(self, content_filter_id):
+        try:
+            return self._content_filters[content_filter_id]
+        except KeyError:
+            result = self._content_filters[content_filter_id] = \
+                self.does_match(self.compiled.get_content_filter(content_filter_id))
+            return result
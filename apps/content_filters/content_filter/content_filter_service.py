@@ -8,13 +8,15 @@
 # AUTHORS and LICENSE files distributed with this source code, or
 # at https://www.sourcefabric.org/superdesk/license
 from superdesk.services import BaseService
+from superdesk.resource_cache import CacheGenerationMixin
 from eve.utils import ParsedRequest
 from superdesk.errors import SuperdeskApiError
 from superdesk import get_resource_service
 from apps.content_filters.filter_condition.filter_condition import FilterCondition
+from apps.content_filters.content_filter.content_filter_matcher import CompiledContentFilters
 
 
-class ContentFilterService(BaseService):
+class ContentFilterService(CacheGenerationMixin, BaseService):
     def get(self, req, lookup):
         if req is None:
             req = ParsedRequest()
@@ -191,21 +193,7 @@ class ContentFilterService(BaseService):
         if not content_filter:
             return True  # a non-existing filter matches every thing
 
-        filter_condition_service = get_resource_service('filter_conditions')
-        expressions = []
-        for expression in content_filter.get('content_filter', []):
-            filter_conditions = []
-            if 'fc' in expression.get('expression', {}):
-                for f in expression['expression']['fc']:
-                    fc = filters.get('filter_conditions', {}).get(f, {}).get('fc') if filters \
-                        else filter_condition_service.find_one(req=None, _id=f)
-                    filter_condition = FilterCondition.parse(fc)
-                    filter_conditions.append(filter_condition.does_match(article))
-            if 'pf' in expression.get('expression', {}):
-                for f in expression['expression']['pf']:
-                    current_filter = filters.get('content_filters', {}).get(f, {}).get('cf') if filters \
-                        else super().find_one(req=None, _id=f)
-                    filter_conditions.append(self.does_match(current_filter, article))
-
-            expressions.append(all(filter_conditions))
-        return any(expressions)
+        compiled = filters.get('compiled') if filters else None
+        if compiled is None:
+            compiled = CompiledContentFilters(filters)
+        return compiled.get_matcher(article).does_match(content_filter)
@@ -13,6 +13,7 @@ import json
 import os
 
 from apps.content_filters.content_filter.content_filter_service import ContentFilterService
+from apps.content_filters.content_filter.content_filter_matcher import CompiledContentFilters
 from apps.prepopulate.app_populate import AppPopulateCommand
 from superdesk import get_backend, get_resource_service
 from superdesk.errors import SuperdeskApiError
@@ -482,6 +483,49 @@ class FilteringDataTests(ContentFilterTests):
             self.assertTrue(len(r4[0]['selected_subscribers']) == 1)
 
 
+class CompiledFiltersTests(ContentFilterTests):
+
+    def _get_filters(self):
+        return {
+            'filter_conditions': {fc['_id']: {'fc': fc} for fc in
+                                  get_resource_service('filter_conditions').get(req=None, lookup={})},
+            'content_filters': {cf['_id']: {'cf': cf} for cf in
+                                get_resource_service('content_filters').get(req=None, lookup={})},
+        }
+
+    def test_does_match_using_compiled_filters(self):
+        doc = {'content_filter': [{"expression": {"pf": [4], "fc": [4]}}], 'name': 'pf-1'}
+        with self.app.app_context():
+            filters = self._get_filters()
+            filters['compiled'] = CompiledContentFilters(filters)
+            results = [self.f.does_match(doc, article, filters) for article in self.articles[:6]]
+            self.assertEqual([False, False, True, False, False, False], results)
+
+    def test_matcher_evaluates_condition_once_per_article(self):
+        with self.app.app_context():
+            filters = self._get_filters()
+            compiled = CompiledContentFilters(filters)
+            predicate = compiled.get_predicate(1)
+            calls = []
+            compiled._predicates[1] = lambda article: calls.append(article) or predicate(article)
+
+            matcher = compiled.get_matcher(self.articles[0])
+            self.assertTrue(matcher.does_match(filters['content_filters'][1]['cf']))
+            self.assertTrue(matcher.does_match({'content_filter': [{'expression': {'pf': [1]}}]}))
+            self.assertTrue(matcher.does_match({'content_filter': [{'expression': {'fc': [1]}}]}))
+            self.assertEqual(1, len(calls))
+
+            compiled.get_matcher(self.articles[3]).does_match(filters['content_filters'][1]['cf'])
+            self.assertEqual(2, len(calls))
+
+    def test_in_operator_predicate_ignores_case(self):
+        with self.app.app_context():
+            compiled = CompiledContentFilters({'filter_conditions': {
+                1: {'fc': {'field': 'source', 'operator': 'in', 'value': 'AAP,Reuters'}}}})
+            self.assertTrue(compiled.get_predicate(1)({'source': 'reuters'}))
+            self.assertFalse(compiled.get_predicate(1)({'source': 'AFP'}))
+
+
 class DeleteMethodTestCase(ContentFilterTests):
     """Tests for the delete() method."""
 
@@ -52,14 +52,32 @@ class FilterCondition:
         return self.operator.contains_not()
 
     def does_match(self, article):
+        return self.get_predicate()(article)
 
-        if not self.field.is_in_article(article):
-            return type(self.operator) is NotInOperator or \
-                type(self.operator) is NotLikeOperator or \
-                self.operator.operator is FilterConditionOperatorsEnum.ne or \
-                (self.operator.operator is FilterConditionOperatorsEnum.eq and
-                 self.value.value.lower() in ("no", "false", "f", "0"))
+    def get_predicate(self):
+        """Return a function testing if an article matches this condition.
 
-        article_value = self.field.get_value(article)
-        filter_value = self.value.get_value(self.field, self.operator)
-        return self.operator.does_match(article_value, filter_value)
+        Filter value is computed (and regex compiled) only once, on first article
+        containing the field, so the returned function should be reused when testing
+        multiple articles.
+        """
+        field = self.field
+        missing_match = self._does_match_missing()
+        value_matcher = None
+
+        def predicate(article):
+            nonlocal value_matcher
+            if not field.is_in_article(article):
+                return missing_match
+            if value_matcher is None:
+                value_matcher = self.operator.get_matcher(self.value.get_value(field, self.operator))
+            return value_matcher(field.get_value(article))
+        return predicate
+
+    def _does_match_missing(self):
+        """Get match result for articles without the filtered field."""
+        return type(self.operator) is NotInOperator or \
+            type(self.operator) is NotLikeOperator or \
+            self.operator.operator is FilterConditionOperatorsEnum.ne or \
+            (self.operator.operator is FilterConditionOperatorsEnum.eq and
+             self.value.value.lower() in ("no", "false", "f", "0"))
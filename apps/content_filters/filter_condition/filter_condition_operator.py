@@ -65,9 +65,22 @@ class FilterConditionOperator:
     def does_match(self, article_value, filter_value):
         raise NotImplementedError()
 
+    def get_matcher(self, filter_value):
+        """Return a function matching article values against given filter value.
+
+        Subclasses can preprocess the filter value here so it's done only once
+        when the filter is used for multiple articles.
+
+        :param filter_value: filter value as returned by :meth:`FilterConditionValue.get_value`
+        """
+        return lambda article_value: self.does_match(article_value, filter_value)
+
     def get_lower_case(self, value):
         return str(value).lower()
 
+    def _get_lower_case_set(self, filter_value):
+        return frozenset(map(self.get_lower_case, filter_value))
+
 
 class InOperator(FilterConditionOperator):
     def __init__(self, operator):
@@ -81,6 +94,15 @@ class InOperator(FilterConditionOperator):
         else:
             return self.get_lower_case(article_value) in map(self.get_lower_case, filter_value)
 
+    def get_matcher(self, filter_value):
+        values = self._get_lower_case_set(filter_value)
+
+        def matcher(article_value):
+            if isinstance(article_value, list):
+                return any(self.get_lower_case(v) in values for v in article_value)
+            return self.get_lower_case(article_value) in values
+        return matcher
+
 
 class NotInOperator(FilterConditionOperator):
     def __init__(self, operator):
@@ -94,6 +116,15 @@ class NotInOperator(FilterConditionOperator):
         else:
             return self.get_lower_case(article_value) not in map(self.get_lower_case, filter_value)
 
+    def get_matcher(self, filter_value):
+        values = self._get_lower_case_set(filter_value)
+
+        def matcher(article_value):
+            if isinstance(article_value, list):
+                return all(self.get_lower_case(v) not in values for v in article_value)
+            return self.get_lower_case(article_value) not in values
+        return matcher
+
     def contains_not(self):
         return True
 
@@ -180,3 +211,12 @@ class MatchOperator(FilterConditionOperator):
             return any([self.get_lower_case(v) in map(self.get_lower_case, filter_value) for v in article_value])
         else:
             return self.get_lower_case(article_value) in map(self.get_lower_case, filter_value)
+
+    def get_matcher(self, filter_value):
+        values = self._get_lower_case_set(filter_value)
+
+        def matcher(article_value):
+            if isinstance(article_value, list):
+                return any(self.get_lower_case(v) in values for v in article_value)
+            return self.get_lower_case(article_value) in values
+        return matcher
@@ -12,11 +12,12 @@ import re
 from superdesk.errors import SuperdeskApiError
 from superdesk import get_resource_service
 from superdesk.services import BaseService
+from superdesk.resource_cache import CacheGenerationMixin
 
 logger = logging.getLogger(__name__)
 
 
-class FilterConditionService(BaseService):
+class FilterConditionService(CacheGenerationMixin, BaseService):
     def on_create(self, docs):
         self._check_equals(docs)
         self._check_parameters(docs)
@@ -20,6 +20,7 @@ from superdesk import config
 from superdesk.utils import SuperdeskBaseEnum
 from bson.objectid import ObjectId
 from superdesk.services import BaseService
+from superdesk.resource_cache import CacheGenerationMixin
 from superdesk.notification import push_notification
 from superdesk.activity import add_activity, ACTIVITY_UPDATE
 from superdesk.metadata.item import FAMILY_ID
@@ -139,7 +140,7 @@ class DesksResource(Resource):
     datasource = {'default_sort': [('name', 1)]}
 
 
-class DesksService(BaseService):
+class DesksService(CacheGenerationMixin, BaseService):
     notification_key = 'desk'
 
     def create(self, docs, **kwargs):
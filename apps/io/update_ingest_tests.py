@@ -99,6 +99,17 @@ class UpdateIngestTest(TestCase):
         self.assertEqual(12, len(items))
         self.ingest_items(items, provider, provider_service)
 
+    def test_ingest_items_batch_keeps_single_item_per_guid(self):
+        provider, provider_service = self.setup_reuters_provider()
+        items = provider_service.fetch_ingest(reuters_guid)
+        items.extend(provider_service.fetch_ingest(reuters_guid))
+        self.ingest_items(items, provider, provider_service)
+        ingest_service = get_resource_service('ingest')
+        for item in items[:6]:
+            self.assertEqual(1, ingest_service.get_from_mongo(req=None, lookup={'guid': item['guid']}).count())
+            self.assertIsNotNone(self.app.data._search_backend('ingest').find_one('ingest', _id=item['_id'],
+                                                                                  req=None))
+
     def test_ingest_item_expiry(self):
         provider, provider_service = self.setup_reuters_provider()
         items = provider_service.fetch_ingest(reuters_guid)
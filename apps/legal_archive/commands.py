@@ -10,6 +10,7 @@
 
 import logging
 import json
+from collections import OrderedDict
 
 from bson.objectid import ObjectId
 
@@ -31,6 +32,7 @@ from superdesk.publish.publish_queue import QueueState
 from superdesk.errors import update_notifiers
 from superdesk.activity import ACTIVITY_ERROR
 from superdesk.utc import utcnow
+from superdesk.resource_cache import get_reference_cache
 
 logger = logging.getLogger(__name__)
 
@@ -40,10 +42,73 @@ def is_legal_archive_enabled():
     return app.config['LEGAL_ARCHIVE']
 
 
+class DenormalizationLookup:
+    """In-memory map of users, desks and stages used for de-normalizing legal archive items.
+
+    Referenced documents can be fetched for many items at once using :meth:`prefetch`,
+    any missing document is fetched on first use.
+    """
+
+    def __init__(self):
+        self._docs = {'users': {}, 'desks': {}, 'stages': {}}
+
+    def prefetch(self, resource, ids):
+        """Fetch documents for given ids not fetched yet using single query.
+
+        :param str resource: users, desks or stages
+        :param ids: ids of documents
+        """
+        docs = self._docs[resource]
+        ids = {str(_id): _id for _id in ids if _id and str(_id) not in docs}
+        if not ids:
+            return
+        docs.update(get_reference_cache().get_many(resource, ids.values()))
+        for key in ids:
+            docs.setdefault(key, None)
+
+    def prefetch_items(self, items):
+        """Fetch users, desks and stages referenced by archive items or their versions.
+
+        :param items: archive items
+        """
+        tasks = [item.get('task') or {} for item in items]
+        self.prefetch('users', [item.get(field) for item in items for field in ('original_creator', 'version_creator')]
+                      + [task.get('user') for task in tasks])
+        self.prefetch('desks', [task.get('desk') for task in tasks])
+        self.prefetch('stages', [task.get('stage') for task in tasks])
+
+    def prefetch_history(self, history_items):
+        """Fetch users, desks and stages referenced by archive history items.
+
+        :param history_items: archive history items
+        """
+        tasks = [(history.get('update') or {}).get('task') or {} for history in history_items]
+        self.prefetch('users', [history.get('user_id') for history in history_items]
+                      + [task.get('user') for task in tasks])
+        self.prefetch('desks', [task.get('desk') for task in tasks])
+        self.prefetch('stages', [task.get('stage') for task in tasks])
+
+    def get(self, resource, _id):
+        """Get document by id.
+
+        :param str resource: users, desks or stages
+        :param _id: document id
+        :return: document or ``None`` if not found
+        """
+        if not _id:
+            return None
+        if str(_id) not in self._docs[resource]:
+            self.prefetch(resource, [_id])
+        return self._docs[resource][str(_id)]
+
+
 class LegalArchiveImport:
     log_msg_format = "{{'_id': {_id}, 'unique_name': {unique_name}, 'version': {_current_version}, " \
                      "'expired_on': {expiry}}}."
 
+    def __init__(self, lookup=None):
+        self.lookup = lookup or DenormalizationLookup()
+
     def upsert_into_legal_archive(self, item_id):
         """Once publish actions are performed on the article do the below:
 
@@ -65,54 +130,30 @@ class LegalArchiveImport:
                 logger.error('Could not find the document {} to import to legal archive.'.format(item_id))
                 return
 
-            # setting default values in case they are missing other log message will fail.
-            doc.setdefault('unique_name', 'NO UNIQUE NAME')
-            doc.setdefault(config.VERSION, 1)
-            doc.setdefault('expiry', utcnow())
-
-            if not doc.get(ITEM_STATE) in \
-                    {CONTENT_STATE.PUBLISHED, CONTENT_STATE.CORRECTED, CONTENT_STATE.KILLED, CONTENT_STATE.RECALLED}:
-                # at times we have seen that item is published but the item is different in the archive collection
-                # this will notify admins about the issue but proceed to move the item into legal archive.
-                msg = 'Invalid state: {}. Moving the item to legal archive. item: {}'.\
-                    format(doc.get(ITEM_STATE), self.log_msg_format.format(**doc))
-                logger.error(msg)
-                update_notifiers(ACTIVITY_ERROR, msg=msg, resource=ARCHIVE)
-
-            # required for behave test.
-            legal_archive_doc = deepcopy(doc)
             legal_archive_service = get_resource_service(LEGAL_ARCHIVE_NAME)
             legal_archive_versions_service = get_resource_service(LEGAL_ARCHIVE_VERSIONS_NAME)
             legal_archive_history_service = get_resource_service(LEGAL_ARCHIVE_HISTORY_NAME)
-
-            log_msg = self.log_msg_format.format(**legal_archive_doc)
             version_id_field = versioned_id_field(app.config['DOMAIN'][ARCHIVE])
-            logger.info('Preparing Article to be inserted into Legal Archive ' + log_msg)
 
-            # Removing irrelevant properties
-            legal_archive_doc.pop(config.ETAG, None)
-            legal_archive_doc.pop('lock_user', None)
-            legal_archive_doc.pop('lock_session', None)
-            legal_archive_doc.pop('lock_time', None)
-            legal_archive_doc.pop('lock_action', None)
+            # Step 1
+            article_in_legal_archive = legal_archive_service.find_one(req=None, _id=doc[config.ID_FIELD])
 
-            logger.info('Removed irrelevant properties from the article {}'.format(log_msg))
+            # Step 4 and 5 - Get Versions and History
+            lookup = {version_id_field: doc[config.ID_FIELD]}
+            versions = list(get_resource_service('archive_versions').get(req=None, lookup=lookup))
+            legal_versions = list(legal_archive_versions_service.get(req=None, lookup=lookup))
+            lookup = {'item_id': doc[config.ID_FIELD]}
+            history_items = list(get_resource_service('archive_history').get(req=None, lookup=lookup))
+            legal_history_items = list(legal_archive_history_service.get(req=None, lookup=lookup))
 
-            # Step 1
-            article_in_legal_archive = legal_archive_service.find_one(req=None, _id=legal_archive_doc[config.ID_FIELD])
-
-            if article_in_legal_archive and \
-               article_in_legal_archive.get(config.VERSION, 0) > legal_archive_doc.get(config.VERSION):
-                logger.info('Item {} version: {} already in legal archive. Legal Archive document version {}'.format(
-                    legal_archive_doc.get(config.ID_FIELD), legal_archive_doc.get(config.VERSION),
-                    article_in_legal_archive.get(config.VERSION)
-                ))
+            legal_archive_doc, versions_to_insert, history_to_insert = self._prepare_legal_archive_doc(
+                doc, article_in_legal_archive, versions, legal_versions, history_items, legal_history_items)
+
+            if legal_archive_doc is None:
                 self._set_moved_to_legal(doc)
                 return
 
-            # Step 2 - De-normalizing the legal archive doc
-            self._denormalize_user_desk(legal_archive_doc, log_msg)
-            logger.info('De-normalized article {}'.format(log_msg))
+            log_msg = self.log_msg_format.format(**legal_archive_doc)
 
             # Step 3 - Upserting Legal Archive
             logger.info('Upserting Legal Archive Repo with article {}'.format(log_msg))
@@ -122,53 +163,10 @@ class LegalArchiveImport:
             else:
                 legal_archive_service.post([legal_archive_doc])
 
-            # Step 4 - Get Versions and De-normalize and Inserting Legal Archive Versions
-            lookup = {version_id_field: legal_archive_doc[config.ID_FIELD]}
-            versions = list(get_resource_service('archive_versions').get(req=None, lookup=lookup))
-            legal_versions = list(legal_archive_versions_service.get(req=None, lookup=lookup))
-
-            logger.info('Fetched version history for article {}'.format(log_msg))
-            versions_to_insert = [version for version in versions
-                                  if not any(legal_version for legal_version in legal_versions
-                                             if version[config.VERSION] == legal_version[config.VERSION])]
-
-            # Step 5 - Get History and de-normalize and insert into Legal Archive History
-            lookup = {'item_id': legal_archive_doc[config.ID_FIELD]}
-            history_items = list(get_resource_service('archive_history').get(req=None, lookup=lookup))
-            legal_history_items = list(legal_archive_history_service.get(req=None, lookup=lookup))
-
-            logger.info('Fetched history for article {}'.format(log_msg))
-            history_to_insert = [history for history in history_items
-                                 if not any(legal_version for legal_version in legal_history_items
-                                            if history[config.ID_FIELD] == legal_version[config.ID_FIELD])]
-
-            # This happens when user kills an article from Dusty Archive
-            if article_in_legal_archive and \
-               article_in_legal_archive[config.VERSION] < legal_archive_doc[config.VERSION] and \
-               len(versions_to_insert) == 0:
-
-                resource_def = app.config['DOMAIN'][ARCHIVE]
-                versioned_doc = deepcopy(legal_archive_doc)
-                versioned_doc[versioned_id_field(resource_def)] = legal_archive_doc[config.ID_FIELD]
-                versioned_doc[config.ID_FIELD] = ObjectId()
-                versions_to_insert.append(versioned_doc)
-
-            for version_doc in versions_to_insert:
-                self._denormalize_user_desk(version_doc,
-                                            self.log_msg_format.format(_id=version_doc[version_id_field],
-                                                                       unique_name=version_doc.get('unique_name'),
-                                                                       _current_version=version_doc[config.VERSION],
-                                                                       expiry=version_doc.get('expiry')))
-                version_doc.pop(config.ETAG, None)
-
             if versions_to_insert:
                 legal_archive_versions_service.post(versions_to_insert)
                 logger.info('Inserted de-normalized versions for article {}'.format(log_msg))
 
-            for history_doc in history_to_insert:
-                self._denormalize_history(history_doc)
-                history_doc.pop(config.ETAG, None)
-
             if history_to_insert:
                 legal_archive_history_service.post(history_to_insert)
                 logger.info('Inserted de-normalized history for article {}'.format(log_msg))
@@ -181,6 +179,179 @@ class LegalArchiveImport:
             logger.exception('Failed to import into legal archive {}.'.format(item_id))
             raise
 
+    def upsert_items_into_legal_archive(self, item_ids):
+        """Import multiple items into legal archive.
+
+        Archive items, legal archive items, versions and history are fetched for all items at once,
+        users, desks and stages are prefetched into lookup map and new documents are inserted
+        using single post per resource.
+
+        :param list item_ids: ids of documents from 'archive' collection
+        :return list: ids of imported items and of items missing in archive, which can't be imported
+        """
+        if not item_ids:
+            return []
+
+        logger.info('Import items into legal {}.'.format(item_ids))
+        legal_archive_service = get_resource_service(LEGAL_ARCHIVE_NAME)
+        legal_archive_versions_service = get_resource_service(LEGAL_ARCHIVE_VERSIONS_NAME)
+        legal_archive_history_service = get_resource_service(LEGAL_ARCHIVE_HISTORY_NAME)
+        version_id_field = versioned_id_field(app.config['DOMAIN'][ARCHIVE])
+
+        ids_lookup = {config.ID_FIELD: {'$in': list(item_ids)}}
+        docs = list(get_resource_service(ARCHIVE).get_from_mongo(req=None, lookup=ids_lookup))
+        missing = set(item_ids) - {doc[config.ID_FIELD] for doc in docs}
+        if missing:
+            logger.error('Could not find the documents {} to import to legal archive.'.format(list(missing)))
+        if not docs:
+            return list(missing)
+
+        item_ids = [doc[config.ID_FIELD] for doc in docs]
+        legal_docs = {doc[config.ID_FIELD]: doc for doc in legal_archive_service.get_from_mongo(
+            req=None, lookup={config.ID_FIELD: {'$in': item_ids}})}
+        versions_lookup = {version_id_field: {'$in': item_ids}}
+        versions = self._group_by(get_resource_service('archive_versions').get_from_mongo(
+            req=None, lookup=versions_lookup), version_id_field)
+        legal_versions = self._group_by(legal_archive_versions_service.get_from_mongo(
+            req=None, lookup=versions_lookup), version_id_field)
+        history_lookup = {'item_id': {'$in': item_ids}}
+        history_items = self._group_by(get_resource_service('archive_history').get_from_mongo(
+            req=None, lookup=history_lookup), 'item_id')
+        legal_history_items = self._group_by(legal_archive_history_service.get_from_mongo(
+            req=None, lookup=history_lookup), 'item_id')
+
+        self.lookup.prefetch_items(docs + [version for item_versions in versions.values()
+                                           for version in item_versions])
+        self.lookup.prefetch_history([history for item_history in history_items.values() for history in item_history])
+
+        new_docs = []
+        updated_docs = []
+        all_versions = []
+        all_history = []
+        for doc in docs:
+            legal_archive_doc, versions_to_insert, history_to_insert = self._prepare_legal_archive_doc(
+                doc, legal_docs.get(doc[config.ID_FIELD]),
+                versions.get(doc[config.ID_FIELD], []), legal_versions.get(doc[config.ID_FIELD], []),
+                history_items.get(doc[config.ID_FIELD], []), legal_history_items.get(doc[config.ID_FIELD], []))
+            if legal_archive_doc is None:
+                continue
+            if doc[config.ID_FIELD] in legal_docs:
+                updated_docs.append(legal_archive_doc)
+            else:
+                new_docs.append(legal_archive_doc)
+            all_versions.extend(versions_to_insert)
+            all_history.extend(history_to_insert)
+
+        for legal_archive_doc in updated_docs:
+            legal_archive_service.put(legal_archive_doc[config.ID_FIELD], legal_archive_doc)
+        if new_docs:
+            legal_archive_service.post(new_docs)
+        if all_versions:
+            legal_archive_versions_service.post(all_versions)
+        if all_history:
+            legal_archive_history_service.post(all_history)
+        logger.info('Inserted {} items, updated {} items, inserted {} versions and {} history items '
+                    'into legal archive.'.format(len(new_docs), len(updated_docs), len(all_versions),
+                                                 len(all_history)))
+
+        for doc in docs:
+            self._set_moved_to_legal(doc)
+        return item_ids + list(missing)
+
+    def _group_by(self, docs, field):
+        groups = {}
+        for doc in docs:
+            groups.setdefault(doc.get(field), []).append(doc)
+        return groups
+
+    def _prepare_legal_archive_doc(self, doc, article_in_legal_archive, versions, legal_versions,
+                                   history_items, legal_history_items):
+        """De-normalize archive item and compute its versions and history missing in legal archive.
+
+        :param dict doc: archive item
+        :param dict article_in_legal_archive: legal archive item if exists
+        :param list versions: archive versions of the item
+        :param list legal_versions: legal archive versions of the item
+        :param list history_items: archive history of the item
+        :param list legal_history_items: legal archive history of the item
+        :return: tuple of legal archive doc (``None`` if legal archive has newer version),
+                 versions to insert and history to insert
+        """
+        # setting default values in case they are missing other log message will fail.
+        doc.setdefault('unique_name', 'NO UNIQUE NAME')
+        doc.setdefault(config.VERSION, 1)
+        doc.setdefault('expiry', utcnow())
+
+        if not doc.get(ITEM_STATE) in \
+                {CONTENT_STATE.PUBLISHED, CONTENT_STATE.CORRECTED, CONTENT_STATE.KILLED, CONTENT_STATE.RECALLED}:
+            # at times we have seen that item is published but the item is different in the archive collection
+            # this will notify admins about the issue but proceed to move the item into legal archive.
+            msg = 'Invalid state: {}. Moving the item to legal archive. item: {}'.\
+                format(doc.get(ITEM_STATE), self.log_msg_format.format(**doc))
+            logger.error(msg)
+            update_notifiers(ACTIVITY_ERROR, msg=msg, resource=ARCHIVE)
+
+        # required for behave test.
+        legal_archive_doc = deepcopy(doc)
+
+        log_msg = self.log_msg_format.format(**legal_archive_doc)
+        version_id_field = versioned_id_field(app.config['DOMAIN'][ARCHIVE])
+        logger.info('Preparing Article to be inserted into Legal Archive ' + log_msg)
+
+        # Removing irrelevant properties
+        legal_archive_doc.pop(config.ETAG, None)
+        legal_archive_doc.pop('lock_user', None)
+        legal_archive_doc.pop('lock_session', None)
+        legal_archive_doc.pop('lock_time', None)
+        legal_archive_doc.pop('lock_action', None)
+
+        logger.info('Removed irrelevant properties from the article {}'.format(log_msg))
+
+        if article_in_legal_archive and \
+           article_in_legal_archive.get(config.VERSION, 0) > legal_archive_doc.get(config.VERSION):
+            logger.info('Item {} version: {} already in legal archive. Legal Archive document version {}'.format(
+                legal_archive_doc.get(config.ID_FIELD), legal_archive_doc.get(config.VERSION),
+                article_in_legal_archive.get(config.VERSION)
+            ))
+            return None, [], []
+
+        # Step 2 - De-normalizing the legal archive doc
+        self._denormalize_user_desk(legal_archive_doc, log_msg)
+        logger.info('De-normalized article {}'.format(log_msg))
+
+        # Step 4 - De-normalize and Inserting Legal Archive Versions
+        legal_version_numbers = {legal_version[config.VERSION] for legal_version in legal_versions}
+        versions_to_insert = [version for version in versions if version[config.VERSION] not in legal_version_numbers]
+
+        # Step 5 - de-normalize and insert into Legal Archive History
+        legal_history_ids = {legal_history[config.ID_FIELD] for legal_history in legal_history_items}
+        history_to_insert = [history for history in history_items if history[config.ID_FIELD] not in legal_history_ids]
+
+        # This happens when user kills an article from Dusty Archive
+        if article_in_legal_archive and \
+           article_in_legal_archive[config.VERSION] < legal_archive_doc[config.VERSION] and \
+           len(versions_to_insert) == 0:
+
+            resource_def = app.config['DOMAIN'][ARCHIVE]
+            versioned_doc = deepcopy(legal_archive_doc)
+            versioned_doc[versioned_id_field(resource_def)] = legal_archive_doc[config.ID_FIELD]
+            versioned_doc[config.ID_FIELD] = ObjectId()
+            versions_to_insert.append(versioned_doc)
+
+        for version_doc in versions_to_insert:
+            self._denormalize_user_desk(version_doc,
+                                        self.log_msg_format.format(_id=version_doc[version_id_field],
+                                                                   unique_name=version_doc.get('unique_name'),
+                                                                   _current_version=version_doc[config.VERSION],
+                                                                   expiry=version_doc.get('expiry')))
+            version_doc.pop(config.ETAG, None)
+
+        for history_doc in history_to_insert:
+            self._denormalize_history(history_doc)
+            history_doc.pop(config.ETAG, None)
+
+        return legal_archive_doc, versions_to_insert, history_to_insert
+
     def _denormalize_history(self, history_item):
         """
         De-normalizes history items
@@ -194,7 +365,7 @@ class LegalArchiveImport:
         history_update = history_item.get('update')
         if history_update:
             if history_update.get('task') and history_update.get('task').get('desk'):
-                desk = get_resource_service('desks').find_one(req=None, _id=str(history_update['task']['desk']))
+                desk = self.lookup.get('desks', history_update['task']['desk'])
                 if desk:
                     history_update['task']['desk'] = desk.get('name')
                     logger.info('De-normalized Desk Details for article history {}'.format(msg))
@@ -202,7 +373,7 @@ class LegalArchiveImport:
                     logger.info('Desk Details Not Found: {}. {}'.format(history_update['task'].get('desk'), msg))
 
             if history_update.get('task') and history_update['task'].get('stage'):
-                stage = get_resource_service('stages').find_one(req=None, _id=str(history_update['task']['stage']))
+                stage = self.lookup.get('stages', history_update['task']['stage'])
                 if stage:
                     history_update['task']['stage'] = stage.get('name')
                     logger.info('De-normalized Stage Details for article {}'.format(msg))
@@ -229,7 +400,7 @@ class LegalArchiveImport:
         # De-normalizing Desk and Stage details
         if legal_archive_doc.get('task'):
             if legal_archive_doc['task'].get('desk'):
-                desk = get_resource_service('desks').find_one(req=None, _id=str(legal_archive_doc['task']['desk']))
+                desk = self.lookup.get('desks', legal_archive_doc['task']['desk'])
                 if desk:
                     legal_archive_doc['task']['desk'] = desk.get('name')
                     logger.info('De-normalized Desk Details for article {}'.format(log_msg))
@@ -237,7 +408,7 @@ class LegalArchiveImport:
                     logger.info('Desk Details Not Found: {}. {}'.format(legal_archive_doc['task'].get('desk'), log_msg))
 
             if legal_archive_doc['task'].get('stage'):
-                stage = get_resource_service('stages').find_one(req=None, _id=str(legal_archive_doc['task']['stage']))
+                stage = self.lookup.get('stages', legal_archive_doc['task']['stage'])
                 if stage:
                     legal_archive_doc['task']['stage'] = stage.get('name')
                     logger.info('De-normalized Stage Details for article {}'.format(log_msg))
@@ -256,7 +427,7 @@ class LegalArchiveImport:
         if not user_id:
             return ''
 
-        user = get_resource_service('users').find_one(req=None, _id=user_id)
+        user = self.lookup.get('users', user_id)
 
         if not user:
             return ''
@@ -486,13 +657,15 @@ class ImportLegalArchiveCommand(superdesk.Command):
             # move the publish item to legal archive.
             expired_items = set()
             for items in self.get_expired_items(page_size):
-                for item in items:
-                    self._move_to_legal(item.get('item_id'), item.get(config.VERSION), expired_items)
+                self._move_items_to_legal(legal_archive_import,
+                                          [(item.get('item_id'), item.get(config.VERSION)) for item in items],
+                                          expired_items)
 
             # get the invalid items from archive.
             for items in get_resource_service(ARCHIVE).get_expired_items(utcnow(), invalid_only=True):
-                for item in items:
-                    self._move_to_legal(item.get(config.ID_FIELD), item.get(config.VERSION), expired_items)
+                self._move_items_to_legal(legal_archive_import,
+                                          [(item.get(config.ID_FIELD), item.get(config.VERSION)) for item in items],
+                                          expired_items)
 
             # if publish item is moved but publish_queue item is not.
             if len(expired_items):
@@ -516,9 +689,37 @@ class ImportLegalArchiveCommand(superdesk.Command):
         finally:
             unlock(lock_name)
 
-    def _move_to_legal(self, item_id, item_version, expired_items):
+    def _move_items_to_legal(self, legal_archive_import, items, expired_items):
+        """Move page of items to legal archive using batch import.
+
+        If batch import fails items are imported one by one.
+
+        :param LegalArchiveImport legal_archive_import: importer sharing users/desks/stages lookup
+        :param list items: list of (item_id, item_version) tuples
+        :param set expired_items: ids of items moved to legal archive
+        """
+        item_ids = list(OrderedDict.fromkeys(item_id for item_id, _ in items))
+        try:
+            # items missing in archive are marked as moved like when importing one by one
+            imported = set(legal_archive_import.upsert_items_into_legal_archive(item_ids))
+        except Exception:
+            logger.exception('Failed to import items into legal archive via command {}.'.format(item_ids))
+            for item_id, item_version in items:
+                self._move_to_legal(legal_archive_import, item_id, item_version, expired_items)
+            return
+
+        published_service = get_resource_service('published')
+        for item_id, item_version in items:
+            if item_id not in imported:
+                continue
+            try:
+                published_service.set_moved_to_legal(item_id, item_version, True)
+                expired_items.add(item_id)
+            except Exception:
+                logger.exception('Failed to set moved to legal flag via command {}.'.format(item_id))
+
+    def _move_to_legal(self, legal_archive_import, item_id, item_version, expired_items):
         try:
-            legal_archive_import = LegalArchiveImport()
             legal_archive_import.upsert_into_legal_archive(item_id)
             # set the flag to be set to true.
             get_resource_service('published').set_moved_to_legal(item_id,
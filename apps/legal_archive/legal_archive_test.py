@@ -10,13 +10,13 @@
 
 import json
 
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from datetime import timedelta
 
 from eve.versioning import resolve_document_version
 from eve.utils import ParsedRequest
 
-from .commands import LegalArchiveImport
+from .commands import LegalArchiveImport, DenormalizationLookup, ImportLegalArchiveCommand
 from apps.archive.common import insert_into_versions, ARCHIVE
 from superdesk import get_resource_service
 from superdesk.tests import TestCase
@@ -66,6 +66,20 @@ class LegalArchiveTestCase(TestCase):
         self.assertEqual(task.get('stage'), 'dddd')
         self.assertEqual(task.get('user'), '')
 
+    def test_denormalize_using_prefetched_lookup(self):
+        lookup = DenormalizationLookup()
+        items = [{'task': {'desk': '123', 'stage': '123', 'user': '123'}, 'original_creator': '123'},
+                 {'task': {'desk': '1234', 'stage': 'dddd', 'user': 'test'}}]
+        lookup.prefetch_items(items)
+        with patch.object(DenormalizationLookup, 'prefetch') as prefetch:
+            importer = LegalArchiveImport(lookup)
+            for item in items:
+                importer._denormalize_user_desk(item, '')
+            prefetch.assert_not_called()
+        self.assertEqual(items[0]['task'], {'desk': 'Sports', 'stage': 'working stage', 'user': 'test user'})
+        self.assertEqual(items[0]['original_creator'], 'test user')
+        self.assertEqual(items[1]['task'], {'desk': '1234', 'stage': 'dddd', 'user': ''})
+
 
 class ImportLegalArchiveCommandTestCase(TestCase):
     desks = [{'name': 'Sports'}]
@@ -198,3 +212,17 @@ class ImportLegalArchiveCommandTestCase(TestCase):
             self.assertGreaterEqual(len(queue_items), 1)
             for queue_item in queue_items:
                 self.assertEqual(queue_item['moved_to_legal'], True)
+
+    def test_import_items_returns_missing_items(self):
+        imported = LegalArchiveImport().upsert_items_into_legal_archive(['item1', 'missing'])
+        self.assertEqual(['item1', 'missing'], imported)
+        self.assertEqual(['missing'], LegalArchiveImport().upsert_items_into_legal_archive(['missing']))
+
+    def test_failed_batch_import_falls_back_to_same_importer(self):
+        legal_archive_import = MagicMock()
+        legal_archive_import.upsert_items_into_legal_archive.side_effect = Exception('failed')
+        expired_items = set()
+        with patch('apps.legal_archive.commands.LegalArchiveImport') as importer_class:
+            ImportLegalArchiveCommand()._move_items_to_legal(legal_archive_import, [('item1', 1)], expired_items)
+        importer_class.assert_not_called()
+        legal_archive_import.upsert_into_legal_archive.assert_called_once_with('item1')
@@ -18,6 +18,7 @@ from superdesk.errors import SuperdeskApiError
 from superdesk.metadata.item import ITEM_TYPE, GUID_FIELD, CONTENT_TYPE
 from superdesk.metadata.packages import GROUPS, RESIDREF, REFS
 from superdesk.utils import ListCursor
+from apps.archive.versions import DeltaVersionsMixin
 
 logger = logging.getLogger(__name__)
 
@@ -154,7 +155,7 @@ class LegalPublishQueueService(LegalService):
         return ids
 
 
-class LegalArchiveVersionsService(LegalService):
+class LegalArchiveVersionsService(DeltaVersionsMixin, LegalService):
     def create(self, docs, **kwargs):
         """
         Overriding this from preventing the same version again. This happens when an item is published more than once.
@@ -10,12 +10,13 @@
 
 from superdesk import get_resource_service
 from superdesk.services import BaseService
+from superdesk.resource_cache import CacheGenerationMixin
 from eve.utils import ParsedRequest, config
 from superdesk.errors import SuperdeskApiError
 from superdesk.metadata.utils import ProductTypes
 
 
-class ProductsService(BaseService):
+class ProductsService(CacheGenerationMixin, BaseService):
 
     def on_update(self, updates, original):
         self._validate_product_type(updates, original)
@@ -24,6 +24,7 @@ from superdesk.metadata.item import CONTENT_TYPE, ITEM_TYPE, ITEM_STATE, CONTENT
     PUBLISH_STATES, EMBARGO, PUB_STATUS, PUBLISH_SCHEDULE, SCHEDULE_SETTINGS, ASSOCIATIONS, MEDIA_TYPES
 from superdesk.metadata.packages import LINKED_IN_PACKAGES, PACKAGE, PACKAGE_TYPE
 from superdesk.metadata.utils import item_url
+from superdesk.resource_cache import get_desk
 from superdesk.notification import push_notification
 from superdesk.publish import SUBSCRIBER_TYPES
 from superdesk.services import BaseService
@@ -273,7 +274,7 @@ class BasePublishService(BaseService):
         """Common updates for published items."""
         desk = None
         if original.get('task', {}).get('desk'):
-            desk = get_resource_service('desks').find_one(req=None, _id=original['task']['desk'])
+            desk = get_desk(original['task']['desk'])
         if not original.get('ingest_provider'):
             updates['source'] = desk['source'] if desk and desk.get('source', '') \
                 else app.settings['DEFAULT_SOURCE_VALUE_FOR_MANUAL_ARTICLES']
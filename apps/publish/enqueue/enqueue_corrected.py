@@ -8,7 +8,6 @@
 # AUTHORS and LICENSE files distributed with this source code, or
 # at https://www.sourcefabric.org/superdesk/license
 
-from superdesk import get_resource_service
 from superdesk.metadata.item import CONTENT_STATE
 from eve.utils import config
 from apps.publish.enqueue.enqueue_service import EnqueueService
@@ -44,8 +43,7 @@ class EnqueueCorrectedService(EnqueueService):
 
         if subscribers:
             # Step 2
-            query = {'is_active': True}
-            active_subscribers = list(get_resource_service('subscribers').get(req=None, lookup=query))
+            active_subscribers = self.get_active_subscribers()
             subscribers_yet_to_receive = [a for a in active_subscribers
                                           if not any(a[config.ID_FIELD] == s[config.ID_FIELD]
                                                      for s in subscribers)]
@@ -8,7 +8,6 @@
 # AUTHORS and LICENSE files distributed with this source code, or
 # at https://www.sourcefabric.org/superdesk/license
 
-from superdesk import get_resource_service
 from superdesk.metadata.item import ITEM_TYPE, CONTENT_TYPE, CONTENT_STATE
 from eve.utils import config
 from apps.publish.enqueue.enqueue_service import EnqueueService
@@ -34,8 +33,7 @@ class EnqueuePublishedService(EnqueueService):
         rewrite_of = doc.get('rewrite_of')
 
         # Step 1
-        query = {'is_active': True}
-        subscribers = list(get_resource_service('subscribers').get(req=None, lookup=query))
+        subscribers = self.get_active_subscribers()
 
         # Step 2b
         if doc.get(ITEM_TYPE) in [CONTENT_TYPE.TEXT, CONTENT_TYPE.PREFORMATTED]:
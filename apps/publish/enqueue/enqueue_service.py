@@ -14,6 +14,7 @@ import logging
 
 from bson import ObjectId
 from functools import partial
+from collections import OrderedDict
 import content_api
 from flask import current_app as app
 from superdesk import get_resource_service
@@ -24,6 +25,7 @@ from superdesk.notification import push_notification
 from superdesk.publish import SUBSCRIBER_TYPES
 from superdesk.publish.publish_queue import PUBLISHED_IN_PACKAGE
 from superdesk.publish.formatters import get_formatter
+from superdesk.resource_cache import ResourceCache
 from apps.publish.content.common import BasePublishService
 from copy import deepcopy
 from eve.utils import config, ParsedRequest
@@ -31,11 +33,35 @@ from apps.archive.common import get_user, get_utc_schedule
 from apps.packages.package_service import PackageService
 from apps.publish.published_item import PUBLISH_STATE, QUEUE_STATE
 from apps.content_types import apply_schema
+from apps.content_filters.content_filter.content_filter_matcher import CompiledContentFilters
 from datetime import datetime
 import pytz
 
 logger = logging.getLogger(__name__)
 
+#: process-wide cache of data used for every item being enqueued
+publish_cache = ResourceCache(['filter_conditions', 'content_filters', 'products', 'subscribers'])
+
+
+class SubscriberProductsPlan:
+    """Products of subscribers indexed for filtering.
+
+    Built once for a list of subscribers and reused for every item filtered for them,
+    eg. for all items of a package. Every distinct product is then evaluated once per item
+    and subscribers are resolved using matching product ids.
+
+    :param subscribers: list of subscribers
+    """
+
+    def __init__(self, subscribers):
+        self.key = self.get_key(subscribers)
+        self.all_products = frozenset().union(*(subscriber.get('products') or [] for subscriber in subscribers),
+                                              *(subscriber.get('api_products') or [] for subscriber in subscribers))
+
+    @staticmethod
+    def get_key(subscribers):
+        return tuple((subscriber[config.ID_FIELD], subscriber.get(config.ETAG)) for subscriber in subscribers)
+
 
 class EnqueueService:
     """
@@ -51,43 +77,51 @@ class EnqueueService:
     package_service = PackageService()
 
     filters = None
+    subscriber_plan = None
 
     def get_filters(self):
         """Retrieve all of the available filter conditions and content filters if they have not yet been retrieved or
         they have been updated. This avoids the filtering functions having to repeatedly retireve the individual filter
         records.
 
+        It also refreshes products and subscribers in the publish cache, so those are loaded only when modified.
+
         :return:
         """
+        reloaded = publish_cache.refresh()
 
-        # Get the most recent update time to the filter conditions and content_filters
-        req = ParsedRequest()
-        req.sort = '-_updated'
-        req.max_results = 1
-        mindate = datetime.min.replace(tzinfo=pytz.UTC)
-        latest_fc = next(get_resource_service('filter_conditions').get_from_mongo(req=req, lookup=None),
-                         {}).get('_updated', mindate)
-        latest_cf = next(get_resource_service('content_filters').get_from_mongo(req=req, lookup=None),
-                         {}).get('_updated', mindate)
-
-        if not self.filters or \
-                latest_fc > self.filters.get('latest_filter_conditions', mindate) or latest_fc == mindate or \
-                latest_cf > self.filters.get('latest_content_filters', mindate) or latest_cf == mindate:
+        if not self.filters or reloaded & {'filter_conditions', 'content_filters'}:
             logger.debug('Getting content filters and filter conditions')
+            mindate = datetime.min.replace(tzinfo=pytz.UTC)
             self.filters = dict()
             self.filters['filter_conditions'] = dict()
             self.filters['content_filters'] = dict()
-            for fc in get_resource_service('filter_conditions').get(req=None, lookup={}):
+            for fc in publish_cache.get('filter_conditions').values():
                 self.filters['filter_conditions'][fc.get('_id')] = {'fc': fc}
                 self.filters['latest_filter_conditions'] = fc.get('_updated') if fc.get('_updated') > self.filters.get(
                     'latest_filter_conditions', mindate) else self.filters.get('latest_filter_conditions', mindate)
-            for cf in get_resource_service('content_filters').get(req=None, lookup={}):
+            for cf in publish_cache.get('content_filters').values():
                 self.filters['content_filters'][cf.get('_id')] = {'cf': cf}
                 self.filters['latest_content_filters'] = cf.get('_updated') if cf.get('_updated') > self.filters.get(
                     'latest_content_filters', mindate) else self.filters.get('latest_content_filters', mindate)
+            self.filters['compiled'] = CompiledContentFilters(self.filters)
         else:
             logger.debug('Using chached content filters and filters conditions')
 
+    def get_products(self):
+        """Get all products from publish cache.
+
+        :return dict: products by id, must not be modified
+        """
+        return publish_cache.get('products')
+
+    def get_active_subscribers(self):
+        """Get copy of all active subscribers from publish cache.
+
+        :return list: list of subscribers
+        """
+        return [deepcopy(s) for s in publish_cache.get('subscribers').values() if s.get('is_active')]
+
     def _enqueue_item(self, item, content_type=None):
         item_to_queue = deepcopy(item)
         if item[ITEM_TYPE] == CONTENT_TYPE.COMPOSITE:
@@ -273,7 +307,7 @@ class EnqueueService:
 
     def _get_subscriber_codes(self, subscribers):
         subscriber_codes = {}
-        all_products = list(get_resource_service('products').get(req=None, lookup=None))
+        all_products = self.get_products().values()
 
         for subscriber in subscribers:
             codes = self._get_codes(subscriber)
@@ -410,15 +444,18 @@ class EnqueueService:
 
         ::Important Note:: Format Type across Subscribers can repeat. But we can't have formatted item generated once
         based on the format_types configured across for all the subscribers as the formatted item must have a published
-        sequence number generated by Subscriber.
+        sequence number generated by Subscriber. Formatters with subscriber invariant output are an exception,
+        those render the item only once and then only stamp it for every subscriber.
 
         :param dict doc: document to queue for transmission
         :param list subscribers: List of subscriber dict.
         :return : (list, bool) tuple of list of missing formatters and boolean flag. True if queued else False
         """
         try:
-            queued = False
+            queue_items = []
             no_formatters = []
+            rendered = {}
+            embedded = False
             for subscriber in subscribers:
                 try:
                     if doc[ITEM_TYPE] not in [CONTENT_TYPE.TEXT, CONTENT_TYPE.PREFORMATTED] and \
@@ -431,6 +468,7 @@ class EnqueueService:
                             (destination.get('config') or {}).get('packaged', False)
                         if embed_package_items:
                             doc = self._embed_package_items(doc)
+                            embedded = True
 
                         if doc.get(PUBLISHED_IN_PACKAGE) and \
                                 (destination.get('config') or {}).get('packaged', False):
@@ -444,9 +482,9 @@ class EnqueueService:
                             continue
 
                         formatter.set_destination(destination, subscriber)
-                        formatted_docs = formatter.format(self.filter_document(doc),
-                                                          subscriber,
-                                                          subscriber_codes.get(subscriber[config.ID_FIELD]))
+                        formatted_docs = self._format_document(formatter, doc, subscriber,
+                                                               subscriber_codes.get(subscriber[config.ID_FIELD]),
+                                                               rendered, (destination['format'], embedded))
 
                         for idx, publish_data in enumerate(formatted_docs):
                             if not isinstance(publish_data, dict):
@@ -484,18 +522,72 @@ class EnqueueService:
                                 publish_queue_item['encoded_item_id'] = app.storage.put(binary)
                             publish_queue_item.pop(ITEM_STATE, None)
 
-                            # content api delivery will be marked as SUCCESS in queue
-                            get_resource_service('publish_queue').post([publish_queue_item])
-
-                            queued = True
+                            queue_items.append(publish_queue_item)
                 except Exception:
                     logger.exception("Failed to queue item for id {} with headline {} for subscriber {}."
                                      .format(doc.get(config.ID_FIELD), doc.get('headline'), subscriber.get('name')))
 
+            queued = self._post_queue_items(doc, queue_items)
             return no_formatters, queued
         except Exception:
             raise
 
+    def _post_queue_items(self, doc, queue_items):
+        """Save all publish queue items for doc using single insert.
+
+        If it fails items are saved one by one, so a broken item doesn't prevent
+        other subscribers from getting the doc. Items keep ids assigned by the failed
+        insert, so those already saved won't be duplicated.
+
+        :param dict doc: document being queued
+        :param list queue_items: publish queue items
+        :return bool: True if any item was queued
+        """
+        if not queue_items:
+            return False
+
+        service = get_resource_service('publish_queue')
+        try:
+            # content api delivery will be marked as SUCCESS in queue
+            service.post(queue_items)
+            return True
+        except Exception:
+            logger.exception("Failed to queue items for id {} in bulk, saving one by one."
+                             .format(doc.get(config.ID_FIELD)))
+
+        queued = False
+        for queue_item in queue_items:
+            try:
+                service.post([queue_item])
+                queued = True
+            except Exception:
+                logger.exception("Failed to queue item for id {} for subscriber {}."
+                                 .format(doc.get(config.ID_FIELD), queue_item.get('subscriber_id')))
+        return queued
+
+    def _format_document(self, formatter, doc, subscriber, codes, rendered, key):
+        """Format document for subscriber.
+
+        Output of subscriber invariant formatters is rendered only once and stored
+        in ``rendered``, then it's only stamped for every other subscriber.
+
+        :param Formatter formatter: formatter to use
+        :param dict doc: document to format
+        :param dict subscriber: subscriber
+        :param list codes: subscriber codes
+        :param dict rendered: rendered output per key
+        :param key: key identifying formatter output for doc
+        :return list: formatted docs
+        """
+        if not formatter.subscriber_invariant:
+            return formatter.format(self.filter_document(doc), subscriber, codes)
+
+        try:
+            formatted_items = rendered[key]
+        except KeyError:
+            formatted_items = rendered[key] = formatter.format_body(self.filter_document(doc), subscriber)
+        return formatter.stamp(formatted_items, subscriber, codes)
+
     def _embed_package_items(self, package):
         """Embeds all package items in the package document."""
         for group in package.get(GROUPS, []):
@@ -550,8 +642,8 @@ class EnqueueService:
                     associations[subscriber_id] = list(set(associations.get(subscriber_id, [])) |
                                                        set(queue_item.get('associated_items', [])))
 
-            query = {'$and': [{config.ID_FIELD: {'$in': list(subscriber_ids.keys())}}]}
-            subscribers = list(get_resource_service('subscribers').get(req=None, lookup=query))
+            cached_subscribers = publish_cache.get('subscribers')
+            subscribers = [deepcopy(cached_subscribers[_id]) for _id in subscriber_ids if _id in cached_subscribers]
             for s in subscribers:
                 s['api_enabled'] = subscriber_ids.get(s.get(config.ID_FIELD))
 
@@ -567,13 +659,17 @@ class EnqueueService:
         """
         filtered_subscribers = []
         subscriber_codes = {}
-        existing_products = {p[config.ID_FIELD]: p for p in
-                             list(get_resource_service('products').get(req=None, lookup=None))}
         global_filters = deepcopy([gf['cf'] for gf in self.filters.get('content_filters', {}).values() if
                                    gf['cf'].get('is_global', True)])
 
+        matcher = self.get_filter_matcher(doc)
+
         # apply global filters
-        self.conforms_global_filter(global_filters, doc)
+        self.conforms_global_filter(global_filters, doc, matcher)
+
+        # evaluate every product once, subscribers are resolved using matching product ids
+        plan = self.get_subscriber_plan(subscribers)
+        matching_products = self.get_matching_products(doc, plan.all_products, matcher)
 
         for subscriber in subscribers:
             if target_media_type and subscriber.get('subscriber_type', '') != SUBSCRIBER_TYPES.ALL:
@@ -593,22 +689,22 @@ class EnqueueService:
             subscriber_added = False
             subscriber['api_enabled'] = False
             # validate against direct products
-            result, codes = self._validate_article_for_subscriber(doc,
-                                                                  subscriber.get('products'),
-                                                                  existing_products)
-            if result:
-                product_codes.extend(codes)
+            matched = [product_id for product_id in subscriber.get('products') or []
+                       if product_id in matching_products]
+            if matched:
+                for product_id in matched:
+                    product_codes.extend(matching_products[product_id])
                 if not subscriber_added:
                     filtered_subscribers.append(subscriber)
                     subscriber_added = True
 
             if content_api.is_enabled():
                 # validate against api products
-                result, codes = self._validate_article_for_subscriber(doc,
-                                                                      subscriber.get('api_products'),
-                                                                      existing_products)
-                if result:
-                    product_codes.extend(codes)
+                matched = [product_id for product_id in subscriber.get('api_products') or []
+                           if product_id in matching_products]
+                if matched:
+                    for product_id in matched:
+                        product_codes.extend(matching_products[product_id])
                     subscriber['api_enabled'] = True
                     if not subscriber_added:
                         filtered_subscribers.append(subscriber)
@@ -623,39 +719,38 @@ class EnqueueService:
 
             # unify the list of codes by removing duplicates
             if subscriber_added:
-                subscriber_codes[subscriber[config.ID_FIELD]] = list(set(product_codes))
+                subscriber_codes[subscriber[config.ID_FIELD]] = list(OrderedDict.fromkeys(product_codes))
 
         return filtered_subscribers, subscriber_codes
 
-    def _validate_article_for_subscriber(self, doc, products, existing_products):
-        """Validate the article for subscriber
+    def get_subscriber_plan(self, subscribers):
+        """Get products plan for given subscribers, reusing the last one if subscribers are the same.
 
-        :param dict doc: Document to be validated
-        :param list products: list of product ids
-        :param dict existing_products: Product lookup
-        :return tuple bool, list: Boolean flag to add subscriber or not and list of product codes.
+        :param list subscribers: list of subscribers
+        :return SubscriberProductsPlan: plan
         """
-        add_subscriber, product_codes = False, []
+        if self.subscriber_plan is None or self.subscriber_plan.key != SubscriberProductsPlan.get_key(subscribers):
+            self.subscriber_plan = SubscriberProductsPlan(subscribers)
+        return self.subscriber_plan
 
-        if not products:
-            return add_subscriber, product_codes
+    def get_matching_products(self, doc, product_ids, matcher=None):
+        """Evaluate given products against the document.
 
-        for product_id in products:
-            # check if the product filter conforms with the story
+        :param dict doc: Document to be validated
+        :param product_ids: ids of products to evaluate
+        :param ContentFilterMatcher matcher: content filter matcher for doc
+        :return dict: product codes per matching product id
+        """
+        existing_products = self.get_products()
+        if matcher is None:
+            matcher = self.get_filter_matcher(doc)
+        matching = {}
+        for product_id in product_ids:
             product = existing_products.get(product_id)
-
-            if not product:
-                continue
-
-            if not self.conforms_product_targets(product, doc):
-                continue
-
-            if self.conforms_content_filter(product, doc):
-                # gather the codes of products
-                product_codes.extend(self._get_codes(product))
-                add_subscriber = True
-
-        return add_subscriber, product_codes
+            if product and self.conforms_product_targets(product, doc) and \
+                    self.conforms_content_filter(product, doc, matcher):
+                matching[product_id] = self._get_codes(product)
+        return matching
 
     def _filter_subscribers_for_associations(self, subscribers, doc, target_media_type, existing_associations):
         """Filter the subscriber for associations.
@@ -777,11 +872,12 @@ class EnqueueService:
         # Nothing matches so this subscriber doesn't conform
         return False, False
 
-    def conforms_content_filter(self, product, doc):
+    def conforms_content_filter(self, product, doc, matcher=None):
         """Checks if the document matches the subscriber filter
 
         :param product: Product where the filter is used
         :param doc: Document to test the filter against
+        :param matcher: content filter matcher for doc, it will be created if not set
         :return:
         True if there's no filter
         True if matches and permitting
@@ -794,26 +890,43 @@ class EnqueueService:
         if content_filter is None or 'filter_id' not in content_filter or content_filter['filter_id'] is None:
             return True
 
-        service = get_resource_service('content_filters')
+        if matcher is None:
+            matcher = self.get_filter_matcher(doc)
         filter = self.filters.get('content_filters', {}).get(content_filter['filter_id'], {}).get('cf')
-        does_match = service.does_match(filter, doc, self.filters)
+        does_match = matcher.does_match(filter)
 
         if does_match:
             return content_filter['filter_type'] == 'permitting'
         else:
             return content_filter['filter_type'] == 'blocking'
 
-    def conforms_global_filter(self, global_filters, doc):
+    def conforms_global_filter(self, global_filters, doc, matcher=None):
         """Check global filter
 
         Checks if document matches the global filter
 
         :param global_filters: List of all global filters
         :param doc: Document to test the global filter against
+        :param matcher: content filter matcher for doc, it will be created if not set
         """
-        service = get_resource_service('content_filters')
+        if matcher is None:
+            matcher = self.get_filter_matcher(doc)
         for global_filter in global_filters:
-            global_filter['does_match'] = service.does_match(global_filter, doc, self.filters)
+            global_filter['does_match'] = matcher.does_match(global_filter)
+
+    def get_filter_matcher(self, doc):
+        """Get content filter matcher for given document.
+
+        It uses filters compiled in :meth:`get_filters` so filter conditions are parsed
+        only once per filters refresh and every filter is evaluated only once per document.
+
+        :param doc: Document to test filters against
+        :return ContentFilterMatcher: matcher
+        """
+        compiled = self.filters.get('compiled') if self.filters else None
+        if compiled is None:
+            compiled = CompiledContentFilters(self.filters)
+        return compiled.get_matcher(doc)
 
     def conforms_subscriber_global_filter(self, subscriber, global_filters):
         """Check global filter for subscriber
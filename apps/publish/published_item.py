@@ -129,6 +129,9 @@ class PublishedItemResource(Resource):
         'url': 'regex("[\w,.:-]+")',
         'field': 'item_id'
     }
+    mongo_indexes = {
+        'item_id': ([('item_id', 1)], {'background': True}),
+    }
 
 
 class PublishedItemService(BaseService):
@@ -9,20 +9,20 @@
 # at https://www.sourcefabric.org/superdesk/license
 
 import logging
-import superdesk
 
 import pytz
 from pytz import all_timezones_set
 
 from enum import Enum
-from datetime import datetime, timedelta
+from datetime import datetime
 from superdesk import get_resource_service
 from superdesk.resource import Resource
 from superdesk.services import BaseService
 from superdesk.errors import SuperdeskApiError
 from eve.utils import config
 from superdesk.metadata.item import CONTENT_STATE
-from superdesk.utc import set_time
+from superdesk.resource_cache import get_desk
+from apps.content_filters.content_filter.content_filter_matcher import CompiledContentFilters
 
 logger = logging.getLogger(__name__)
 
@@ -64,6 +64,136 @@ class Weekdays(Enum):
         return cls(day.weekday()).name
 
 
+def _get_seconds(timestr):
+    """Get number of seconds since midnight for time in `%H:%M:%S` format."""
+    time = datetime.strptime(timestr, '%H:%M:%S')
+    return time.hour * 3600 + time.minute * 60 + time.second
+
+
+class RuleSchedule():
+    """Routing rule schedule parsed for fast checks.
+
+    Time of day limits are stored as seconds since midnight. If start time is not
+    defined, the beginning of the day is assumed. If end time is not defined, the end
+    of the day is assumed (excluding the midnight, since at that point a new day has already begun).
+    End time with zero seconds includes the whole last minute.
+
+    :param dict schedule: routing rule schedule
+    """
+
+    def __init__(self, schedule):
+        tz_name = schedule.get('time_zone')
+        self.tz = pytz.timezone(tz_name) if tz_name else pytz.utc
+        self.days = {Weekdays[day.upper()].value for day in schedule.get('day_of_week', [])}
+        self.start = _get_seconds(schedule.get('hour_of_day_from') or '00:00:00')  # might be both '' or None
+        hour_of_day_to = schedule.get('hour_of_day_to')
+        if hour_of_day_to:
+            self.end = _get_seconds(hour_of_day_to) + (60 if hour_of_day_to[-2:] == '00' else 0)
+        else:
+            self.end = _get_seconds('23:59:59') + 60
+
+    def is_scheduled(self, now_utc):
+        """Test if schedule is active at given time.
+
+        :param datetime now_utc: timezone-aware current time
+        """
+        now = now_utc.astimezone(tz=self.tz)
+        seconds = now.hour * 3600 + now.minute * 60 + now.second
+        return now.weekday() in self.days and self.start <= seconds < self.end
+
+
+class CompiledRoutingRule():
+    """Routing rule with resolved content filter and parsed schedule.
+
+    It counts how many items were tested against the rule and how many matched.
+
+    :param dict rule: routing rule
+    :param dict filters: content filters by id used if rule filter is not embedded
+    """
+
+    def __init__(self, rule, filters):
+        self.rule = rule
+        self.name = rule.get('name')
+        self.actions = rule.get('actions') or {}
+        self.content_filter = rule.get('filter') or None
+        if self.content_filter is not None and not isinstance(self.content_filter, dict):
+            self.content_filter = filters.get(self.content_filter, {}).get('cf')
+        self.schedule = RuleSchedule(rule['schedule']) if rule.get('schedule') else None
+        self.evaluated = 0
+        self.matched = 0
+
+    def is_scheduled(self, now_utc):
+        return self.schedule is None or self.schedule.is_scheduled(now_utc)
+
+
+class CompiledRoutingScheme():
+    """Routing scheme compiled for routing many items.
+
+    All content filters and filter conditions used by the rules are fetched at once
+    and conditions are parsed into predicates by :class:`CompiledContentFilters`,
+    so the scheme should be compiled once per ingest run and reused for all items.
+
+    :param dict routing_scheme: routing scheme, rule filters can be embedded or ids
+    """
+
+    def __init__(self, routing_scheme):
+        self.routing_scheme = routing_scheme
+        self.name = routing_scheme.get('name')
+        self.filters = self._get_filters(routing_scheme.get('rules') or [])
+        self.compiled_filters = CompiledContentFilters(self.filters)
+        self.rules = [CompiledRoutingRule(rule, self.filters['content_filters'])
+                      for rule in routing_scheme.get('rules') or []]
+
+    @staticmethod
+    def _get_filters(rules):
+        """Fetch content filters and filter conditions used by rules.
+
+        :param list rules: routing rules
+        :return dict: filters cache in format used by :class:`CompiledContentFilters`
+        """
+        filters = {'content_filters': {}, 'filter_conditions': {}}
+        content_filters = [rule['filter'] for rule in rules if isinstance(rule.get('filter'), dict)]
+        missing = {rule['filter'] for rule in rules if rule.get('filter') and not isinstance(rule['filter'], dict)}
+        condition_ids = set()
+        while content_filters or missing:
+            if missing:
+                content_filters.extend(get_resource_service('content_filters').get_from_mongo(
+                    req=None, lookup={config.ID_FIELD: {'$in': list(missing)}}))
+            missing = set()
+            for content_filter in content_filters:
+                filters['content_filters'][content_filter.get(config.ID_FIELD)] = {'cf': content_filter}
+            for content_filter in content_filters:
+                for expression in content_filter.get('content_filter', []):
+                    expression = expression.get('expression', {})
+                    condition_ids.update(expression.get('fc', []))
+                    missing.update(pf for pf in expression.get('pf', []) if pf not in filters['content_filters'])
+            content_filters = []
+        if condition_ids:
+            for filter_condition in get_resource_service('filter_conditions').get_from_mongo(
+                    req=None, lookup={config.ID_FIELD: {'$in': list(condition_ids)}}):
+                filters['filter_conditions'][filter_condition[config.ID_FIELD]] = {'fc': filter_condition}
+        return filters
+
+    def get_scheduled_rules(self, current_dt_utc):
+        """Get rules scheduled at given time.
+
+        :param datetime current_dt_utc: current time in UTC
+        """
+        current_dt_utc = current_dt_utc.replace(tzinfo=pytz.utc)
+        return [rule for rule in self.rules if rule.is_scheduled(current_dt_utc)]
+
+    def get_matcher(self, item):
+        """Get content filter matcher for given item.
+
+        :param dict item: item to match
+        """
+        return self.compiled_filters.get_matcher(item)
+
+    def get_stats(self):
+        """Get number of evaluated and matched items per rule."""
+        return [{'name': rule.name, 'evaluated': rule.evaluated, 'matched': rule.matched} for rule in self.rules]
+
+
 class RoutingRuleSchemeResource(Resource):
     """
     Resource class for 'routing_schemes' endpoint
@@ -198,54 +328,102 @@ class RoutingRuleSchemeService(BaseService):
         if self.backend.find_one('ingest_providers', req=None, routing_scheme=doc[config.ID_FIELD]):
             raise SuperdeskApiError.forbiddenError('Routing scheme is applied to channel(s). It cannot be deleted.')
 
+    def compile_routing_scheme(self, routing_scheme):
+        """Compile routing scheme so it can be applied to many items.
+
+        :param routing_scheme: routing scheme or already compiled scheme
+        :return CompiledRoutingScheme: compiled routing scheme
+        """
+        if isinstance(routing_scheme, CompiledRoutingScheme):
+            return routing_scheme
+        return CompiledRoutingScheme(routing_scheme)
+
     def apply_routing_scheme(self, ingest_item, provider, routing_scheme):
         """Applies routing scheme and applies appropriate action (fetch, publish) to the item
 
         :param item: ingest item to which routing scheme needs to applied.
         :param provider: provider for which the routing scheme is applied.
-        :param routing_scheme: routing scheme.
+        :param routing_scheme: routing scheme or compiled routing scheme.
         """
-        rules = routing_scheme.get('rules', [])
-        if not rules:
-            logger.warning("Routing Scheme % for provider % has no rules configured." %
-                           (provider.get('name'), routing_scheme.get('name')))
-
-        filters_service = superdesk.get_resource_service('content_filters')
-
-        now = datetime.utcnow()
-
-        for rule in self._get_scheduled_routing_rules(rules, now):
-            content_filter = rule.get('filter', {})
-            logger.info('Applying rule. Item: %s . Routing Scheme: %s. Rule Name %s.' % (ingest_item.get('guid'),
-                                                                                         routing_scheme.get('name'),
-                                                                                         rule.get('name')))
-            if filters_service.does_match(content_filter, ingest_item):
+        compiled = self.compile_routing_scheme(routing_scheme)
+        if not compiled.rules:
+            logger.warning("Routing Scheme %s for provider %s has no rules configured." %
+                           (compiled.name, provider.get('name')))
+        self._apply_rules(ingest_item, provider, compiled, compiled.get_scheduled_rules(datetime.utcnow()))
+
+    def apply_routing_scheme_to_items(self, ingest_items, provider, routing_scheme):
+        """Apply routing scheme to multiple items.
+
+        The scheme is compiled only once if not compiled already and rules schedule
+        is checked once for all items. Error while routing an item is logged
+        and routing continues with next item.
+
+        :param list ingest_items: ingest items to which routing scheme needs to applied
+        :param provider: provider for which the routing scheme is applied
+        :param routing_scheme: routing scheme or compiled routing scheme
+        :return list: items which failed to be routed
+        """
+        compiled = self.compile_routing_scheme(routing_scheme)
+        if not compiled.rules:
+            logger.warning("Routing Scheme %s for provider %s has no rules configured." %
+                           (compiled.name, provider.get('name')))
+        rules = compiled.get_scheduled_rules(datetime.utcnow())
+        failed = []
+        for ingest_item in ingest_items:
+            try:
+                self._apply_rules(ingest_item, provider, compiled, rules)
+            except Exception as ex:
+                logger.exception(ex)
+                failed.append(ingest_item)
+        for stats in compiled.get_stats():
+            logger.info('Routing Scheme %s rule %s matched %d of %d items.' % (
+                compiled.name, stats['name'], stats['matched'], stats['evaluated']))
+        return failed
+
+    def _apply_rules(self, ingest_item, provider, compiled, rules):
+        """Apply scheduled rules of compiled routing scheme to the item.
+
+        :param ingest_item: ingest item
+        :param provider: provider for which the routing scheme is applied
+        :param CompiledRoutingScheme compiled: compiled routing scheme
+        :param list rules: scheduled compiled rules
+        """
+        matcher = compiled.get_matcher(ingest_item)
+        for compiled_rule in rules:
+            rule = compiled_rule.rule
+            logger.debug('Applying rule. Item: %s . Routing Scheme: %s. Rule Name %s.' % (ingest_item.get('guid'),
+                                                                                          compiled.name,
+                                                                                          rule.get('name')))
+            compiled_rule.evaluated += 1
+            if matcher.does_match(compiled_rule.content_filter):
+                compiled_rule.matched += 1
                 logger.info('Filter matched. Item: %s. Routing Scheme: %s. Rule Name %s.' % (ingest_item.get('guid'),
-                                                                                             routing_scheme.get('name'),
+                                                                                             compiled.name,
                                                                                              rule.get('name')))
-                if rule.get('actions', {}).get('preserve_desk', False) and ingest_item.get('task', {}).get('desk'):
-                    desk = get_resource_service('desks').find_one(req=None, _id=ingest_item['task']['desk'])
+                actions = compiled_rule.actions
+                if actions.get('preserve_desk', False) and ingest_item.get('task', {}).get('desk'):
+                    desk = get_desk(ingest_item['task']['desk'])
                     if ingest_item.get('task', {}).get('stage'):
                         stage_id = ingest_item['task']['stage']
                     else:
                         stage_id = desk['incoming_stage']
                     self.__fetch(ingest_item, [{'desk': desk[config.ID_FIELD], 'stage': stage_id}])
-                    fetch_actions = [f for f in rule.get('actions', {}).get('fetch', [])
+                    fetch_actions = [f for f in actions.get('fetch', [])
                                      if f.get('desk') != ingest_item['task']['desk']]
                 else:
-                    fetch_actions = rule.get('actions', {}).get('fetch', [])
+                    fetch_actions = actions.get('fetch', [])
 
                 self.__fetch(ingest_item, fetch_actions)
-                self.__publish(ingest_item, rule.get('actions', {}).get('publish', []))
-                if rule.get('actions', {}).get('exit', False):
+                self.__publish(ingest_item, actions.get('publish', []))
+                if actions.get('exit', False):
                     logger.info('Exiting routing scheme. Item: %s . Routing Scheme: %s. '
-                                'Rule Name %s.' % (ingest_item.get('guid'), routing_scheme.get('name'),
+                                'Rule Name %s.' % (ingest_item.get('guid'), compiled.name,
                                                    rule.get('name')))
                     break
             else:
-                logger.info("Routing rule %s of Routing Scheme %s for Provider %s did not match for item %s" %
-                            (rule.get('name'), routing_scheme.get('name'),
-                             provider.get('name'), ingest_item[config.ID_FIELD]))
+                logger.debug("Routing rule %s of Routing Scheme %s for Provider %s did not match for item %s" %
+                             (rule.get('name'), compiled.name,
+                              provider.get('name'), ingest_item[config.ID_FIELD]))
 
     def _adjust_for_empty_schedules(self, routing_scheme):
         """Adjust for empty schedules.
@@ -380,46 +558,8 @@ class RoutingRuleSchemeService(BaseService):
         """
         # make it a timezone-aware object
         current_dt_utc = current_dt_utc.replace(tzinfo=pytz.utc)
-        delta_minute = timedelta(minutes=1)
-
-        scheduled_rules = []
-        for rule in rules:
-            is_scheduled = True
-            schedule = rule.get('schedule', {})
-            if schedule:
-                # adjust current time to the schedule's timezone
-                tz_name = schedule.get('time_zone')
-                schedule_tz = pytz.timezone(tz_name) if tz_name else pytz.utc
-                now_tz_schedule = current_dt_utc.astimezone(tz=schedule_tz)
-
-                # Create start and end time-of-day limits. If start time is not
-                # defined, the beginning of the day is assumed. If end time
-                # is not defined, the end of the day is assumed (excluding the
-                # midnight, since at that point a new day has already begun).
-                hour_of_day_from = schedule.get('hour_of_day_from')
-                if not hour_of_day_from:
-                    hour_of_day_from = '00:00:00'  # might be both '' or None
-                from_time = set_time(now_tz_schedule, hour_of_day_from)
-
-                hour_of_day_to = schedule.get('hour_of_day_to')
-                if hour_of_day_to:
-                    to_time = set_time(now_tz_schedule, hour_of_day_to)
-                    if hour_of_day_to[-2:] == '00':
-                        to_time = to_time + delta_minute
-                else:
-                    to_time = set_time(now_tz_schedule, '23:59:59') + delta_minute
-
-                # check if the current day of week and time of day both match
-                day_of_week_matches = Weekdays.is_scheduled_day(
-                    now_tz_schedule, schedule.get('day_of_week', []))
-                time_of_day_matches = (from_time <= now_tz_schedule < to_time)
-
-                is_scheduled = (day_of_week_matches and time_of_day_matches)
-
-            if is_scheduled:
-                scheduled_rules.append(rule)
-
-        return scheduled_rules
+        return [rule for rule in rules
+                if not rule.get('schedule') or RuleSchedule(rule['schedule']).is_scheduled(current_dt_utc)]
 
     def __fetch(self, ingest_item, destinations):
         """Fetch to item to the destinations
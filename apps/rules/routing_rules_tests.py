@@ -4,7 +4,8 @@ from unittest import mock
 
 from copy import deepcopy
 from datetime import datetime, timedelta
-from .routing_rules import Weekdays
+from superdesk.tests import TestCase
+from .routing_rules import Weekdays, CompiledRoutingScheme, RoutingRuleSchemeService
 
 
 class WeekdaysTestCase(unittest.TestCase):
@@ -344,3 +345,65 @@ class GetScheduledRoutingRulesMethodTestCase(RoutingRuleSchemeServiceTest):
         now = datetime(2015, 9, 15, 23, 59, 59, 999999)  # Tuesday
         result = self.instance._get_scheduled_routing_rules(rules, now)
         self.assertEqual(result, [])
+
+
+class CompiledRoutingSchemeTestCase(TestCase):
+
+    def setUp(self):
+        self.app.data.insert('filter_conditions', [
+            {'_id': 1, 'field': 'urgency', 'operator': 'in', 'value': '1,2', 'name': 'urgent'},
+            {'_id': 2, 'field': 'headline', 'operator': 'like', 'value': 'foo', 'name': 'foo'},
+        ])
+        self.app.data.insert('content_filters', [
+            {'_id': 10, 'name': 'urgent', 'content_filter': [{'expression': {'fc': [1]}}]},
+        ])
+        self.scheme = {
+            'name': 'scheme',
+            'rules': [
+                {
+                    'name': 'urgent foo',
+                    'filter': {'_id': 11, 'name': 'urgent foo',
+                               'content_filter': [{'expression': {'fc': [2], 'pf': [10]}}]},
+                    'actions': {'fetch': [{'desk': 'desk'}], 'exit': True},
+                },
+                {
+                    'name': 'urgent',
+                    'filter': 10,
+                    'actions': {'fetch': [{'desk': 'desk'}]},
+                },
+                {
+                    'name': 'never',
+                    'filter': None,
+                    'actions': {'fetch': [{'desk': 'desk'}]},
+                    'schedule': {'day_of_week': [], 'time_zone': 'UTC'},
+                },
+            ],
+        }
+
+    def test_compile(self):
+        compiled = CompiledRoutingScheme(self.scheme)
+        self.assertEqual({10, 11}, set(compiled.filters['content_filters']))
+        self.assertEqual({1, 2}, set(compiled.filters['filter_conditions']))
+        self.assertEqual(10, compiled.rules[1].content_filter['_id'])
+        self.assertEqual(['urgent foo', 'urgent'],
+                         [rule.name for rule in compiled.get_scheduled_rules(datetime.utcnow())])
+
+    @mock.patch.object(RoutingRuleSchemeService, '_RoutingRuleSchemeService__publish')
+    @mock.patch.object(RoutingRuleSchemeService, '_RoutingRuleSchemeService__fetch')
+    def test_apply_routing_scheme_to_items(self, fetch, publish):
+        items = [
+            {'_id': 'a', 'urgency': 1, 'headline': 'foo bar'},
+            {'_id': 'b', 'urgency': 2, 'headline': 'bar'},
+            {'_id': 'c', 'urgency': 3, 'headline': 'foo'},
+        ]
+        service = RoutingRuleSchemeService()
+        compiled = service.compile_routing_scheme(self.scheme)
+        self.assertIs(compiled, service.compile_routing_scheme(compiled))
+        failed = service.apply_routing_scheme_to_items(items, {'name': 'provider'}, compiled)
+        self.assertEqual([], failed)
+        self.assertEqual(2, fetch.call_count)
+        self.assertEqual([
+            {'name': 'urgent foo', 'evaluated': 3, 'matched': 1},
+            {'name': 'urgent', 'evaluated': 2, 'matched': 1},
+            {'name': 'never', 'evaluated': 0, 'matched': 0},
+        ], compiled.get_stats())
@@ -16,6 +16,7 @@ from flask import current_app as app
 from superdesk.notification import push_notification
 from superdesk.resource import Resource
 from superdesk.services import BaseService
+from superdesk.resource_cache import CacheGenerationMixin
 from superdesk.errors import SuperdeskApiError
 from superdesk import get_resource_service
 from eve.utils import ParsedRequest
@@ -91,7 +92,7 @@ class StagesResource(Resource):
     privileges = {'POST': 'desks', 'DELETE': 'desks', 'PATCH': 'desks'}
 
 
-class StagesService(BaseService):
+class StagesService(CacheGenerationMixin, BaseService):
     notification_key = 'stage'
 
     def on_create(self, docs):
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Compare rendition generation using single decode engine with previous implementation.
+
+Example:
+::
+
+    $ python scripts/benchmark_renditions.py photo.jpg
+    $ python scripts/benchmark_renditions.py photo.jpg --repeat=5 --workers=8
+"""
+
+import time
+import argparse
+
+from io import BytesIO
+
+from superdesk.default_settings import RENDITIONS
+from superdesk.media.media_operations import process_file_from_stream
+from superdesk.media.renditions import _resize_image, _crop_image, render_renditions
+
+CROP_SIZES = [
+    ('16-9', {'width': 1280, 'height': 720}),
+    ('4-3', {'width': 800, 'height': 600}),
+    ('3-2', {'width': 1200, 'height': 800}),
+    ('1-1', {'width': 600, 'height': 600}),
+    ('wide', {'ratio': '21:9'}),
+    ('square', {'ratio': '1:1'}),
+    ('portrait', {'width': 500, 'height': 700}),
+    ('teaser', {'width': 320}),
+]
+
+
+def get_specs():
+    specs = [('baseImage', RENDITIONS['picture']['baseImage'])]
+    specs.extend((name, spec) for name, spec in RENDITIONS['picture'].items() if name != 'baseImage')
+    specs.extend(CROP_SIZES)
+    return specs
+
+
+def render_renditions_sequential(original, specs, format):
+    """Rendition generation as done before, each rendition decodes its source again."""
+    rendered = []
+    for rendition, spec in specs:
+        cropping_data = {}
+        original.seek(0)
+        if spec.get('width') or spec.get('height'):
+            resized, width, height = _resize_image(original, (spec.get('width'), spec.get('height')), format)
+        else:
+            resized, width, height, cropping_data = _crop_image(original, format, spec.get('ratio'))
+        file_name, content_type, metadata = process_file_from_stream(resized, content_type='image/%s' % format)
+        resized.seek(0)
+        rendered.append((rendition, resized))
+        if rendition == 'baseImage':
+            original = resized
+    return rendered
+
+
+def measure(label, func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    print('{:<12} best {:.3f}s avg {:.3f}s'.format(label, min(times), sum(times) / len(times)))
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('image', help='path to image file')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    with open(args.image, 'rb') as f:
+        content = f.read()
+    specs = get_specs()
+    print('Rendering {} renditions, {} bytes image'.format(len(specs), len(content)))
+
+    before = measure('sequential', lambda: render_renditions_sequential(BytesIO(content), specs, 'jpeg'), args.repeat)
+    after = measure('engine', lambda: render_renditions(BytesIO(content), specs, 'jpeg', args.workers), args.repeat)
+    print('speedup {:.2f}x'.format(before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,9 @@
 # at https://www.sourcefabric.org/superdesk/license
 
 
+import atexit
 import superdesk
+from celery.signals import task_postrun, worker_process_shutdown
 from superdesk.celery_app import celery
 from .audit import AuditService, AuditResource
 from .commands import PurgeAudit
@@ -17,8 +19,24 @@ import logging
 
 log = logging.getLogger(__name__)
 
+#: buffer of audit service for latest initialized app
+_buffer = None
+
+
+def flush_buffer(*args, **kwargs):
+    """Write buffered audit records, called when celery task is done and on exit."""
+    if _buffer is not None:
+        _buffer.flush()
+
+
+task_postrun.connect(flush_buffer)
+worker_process_shutdown.connect(flush_buffer)
+atexit.register(flush_buffer)
+
 
 def init_app(app):
+    global _buffer
+
     endpoint_name = 'audit'
 
     service = AuditService(endpoint_name, backend=superdesk.get_backend())
@@ -28,6 +46,8 @@ def init_app(app):
     app.on_updated += service.on_generic_updated
     app.on_deleted_item += service.on_generic_deleted
 
+    _buffer = service.buffer
+
 
 @celery.task(soft_time_limit=600)
 def gc_audit():
@@ -8,8 +8,12 @@
 # AUTHORS and LICENSE files distributed with this source code, or
 # at https://www.sourcefabric.org/superdesk/license
 
+import os
+import time
 import logging
-from flask import g
+import threading
+from copy import deepcopy
+from flask import g, current_app as app, has_app_context
 from superdesk.resource import Resource
 from superdesk.services import BaseService
 
@@ -30,7 +34,74 @@ class AuditResource(Resource):
     exclude = {endpoint_name, 'activity', 'dictionaries', 'macros', 'archive_history', 'formatters'}
 
 
+class AuditBuffer:
+    """Buffer of audit records written to db in bulk.
+
+    Records are written once there are ``AUDIT_BUFFER_SIZE`` of them, or by background
+    thread every ``AUDIT_FLUSH_INTERVAL`` seconds. Use :meth:`flush` to write buffered
+    records, it's called on process exit and after every celery task.
+
+    :param service: audit service
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self._records = []
+        self._lock = threading.Lock()
+        self._app = None
+        self._thread = None
+        self._pid = None
+
+    def add(self, audit):
+        """Add audit record to buffer.
+
+        :param dict audit: audit record
+        """
+        with self._lock:
+            self._records.append(audit)
+            self._app = app._get_current_object()
+            full = len(self._records) >= self._app.config.get('AUDIT_BUFFER_SIZE', 100)
+            if not full and (self._thread is None or self._pid != os.getpid()):
+                self._start_thread()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered records."""
+        with self._lock:
+            records, self._records = self._records, []
+            flask_app = self._app
+        if not records:
+            return
+        try:
+            if has_app_context():
+                self.service.post(records)
+            else:
+                with flask_app.app_context():
+                    self.service.post(records)
+        except Exception:
+            log.exception('Failed to write {} audit records'.format(len(records)))
+
+    def _start_thread(self):
+        # thread is started again in forked process
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, args=(self._app.config.get('AUDIT_FLUSH_INTERVAL', 1), ),
+                                        daemon=True)
+        self._thread.start()
+
+    def _run(self, interval):
+        pid = self._pid
+        while pid == os.getpid():
+            time.sleep(interval)
+            self.flush()
+
+
 class AuditService(BaseService):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buffer = AuditBuffer(self)
+
     def on_generic_inserted(self, resource, docs):
         if resource in AuditResource.exclude:
             return
@@ -51,11 +122,11 @@ class AuditService(BaseService):
             'user': user_id,
             'resource': resource,
             'action': 'created',
-            'extra': docs[0],
+            'extra': self._get_extra(docs[0]),
             'audit_id': self._extract_doc_id(docs[0])
         }
 
-        self.post([audit])
+        self.buffer.add(audit)
 
     def on_generic_updated(self, resource, doc, original):
         if resource in AuditResource.exclude:
@@ -69,12 +140,12 @@ class AuditService(BaseService):
             'user': user.get('_id'),
             'resource': resource,
             'action': 'updated',
-            'extra': doc,
+            'extra': self._get_extra(doc, original),
             'audit_id': self._extract_doc_id(doc) if self._extract_doc_id(doc) else self._extract_doc_id(original)
         }
         if '_id' not in doc:
             audit['extra']['_id'] = original.get('_id', None)
-        self.post([audit])
+        self.buffer.add(audit)
 
     def on_generic_deleted(self, resource, doc):
         if resource in AuditResource.exclude:
@@ -88,10 +159,26 @@ class AuditService(BaseService):
             'user': user.get('_id'),
             'resource': resource,
             'action': 'deleted',
-            'extra': doc,
+            'extra': self._get_extra(doc),
             'audit_id': self._extract_doc_id(doc)
         }
-        self.post([audit])
+        self.buffer.add(audit)
+
+    def _get_extra(self, doc, original=None):
+        """Get audit extra for document.
+
+        Records are buffered, so it's a deep copy of the document, unless ``AUDIT_DELTA_ONLY`` is set - then
+        it only contains the id and for updates also fields which were modified.
+
+        :param doc: created or deleted document or updates
+        :param original: original document when updated
+        """
+        if not app.config.get('AUDIT_DELTA_ONLY', False):
+            return deepcopy(doc)
+        extra = {key: value for key, value in doc.items() if original is not None and original.get(key) != value}
+        if '_id' in doc:
+            extra['_id'] = doc['_id']
+        return deepcopy(extra)
 
     def _extract_doc_id(self, doc):
         """
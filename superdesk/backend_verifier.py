@@ -0,0 +1,110 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Background verification of mongo and elastic consistency.
+
+When ``BACKEND_FIND_ONE_CONSISTENCY`` is set to ``mongo``, :meth:`EveBackend.find_one`
+reads only from mongo and a sample of read items is stored in redis using :func:`sample_item`.
+:func:`verify_samples` checks those items later in batches and repairs elastic using mongo
+as the source of truth.
+"""
+
+import random
+import logging
+
+from bson import json_util
+from flask import current_app as app
+from eve.utils import config, ParsedRequest
+
+logger = logging.getLogger(__name__)
+
+SAMPLES_KEY = 'backend_verifier:samples'
+
+MISSING_IN_SEARCH = 'missing_in_search'
+MISSING_IN_MONGO = 'missing_in_mongo'
+ETAG_MISMATCH = 'etag_mismatch'
+
+
+def sample_item(resource, item_id):
+    """Store item for verification using configured sample rate.
+
+    :param resource: resource name
+    :param item_id: item id
+    """
+    if item_id is None or random.random() >= app.config.get('BACKEND_VERIFY_SAMPLE_RATE', 0):
+        return
+    try:
+        app.redis.sadd(SAMPLES_KEY, json_util.dumps([resource, item_id]))
+    except Exception as ex:
+        logger.warning('Failed to store item for verification resource=%s id=%s error=%s', resource, item_id, ex)
+
+
+def pop_samples(count):
+    """Get up to ``count`` stored samples, grouped by resource.
+
+    :param count: max number of samples
+    :return dict: list of ids per resource
+    """
+    members = app.redis.srandmember(SAMPLES_KEY, count)
+    if not members:
+        return {}
+    app.redis.srem(SAMPLES_KEY, *members)
+    samples = {}
+    for member in members:
+        resource, item_id = json_util.loads(member.decode('utf-8') if isinstance(member, bytes) else member)
+        samples.setdefault(resource, []).append(item_id)
+    return samples
+
+
+def verify_samples(backend, batch_size=500):
+    """Verify stored samples and repair elastic where it differs from mongo.
+
+    :param backend: eve backend
+    :param batch_size: max number of items to verify
+    :return list: mismatches found, dicts with ``resource``, ``_id`` and ``mismatch`` keys
+    """
+    mismatches = []
+    with backend.bulk():
+        for resource, ids in pop_samples(batch_size).items():
+            mismatches.extend(_verify_resource(backend, resource, ids))
+    for mismatch in mismatches:
+        logger.warning('Backend mismatch resource={resource} id={_id} mismatch={mismatch}'.format(**mismatch))
+    return mismatches
+
+
+def _verify_resource(backend, resource, ids):
+    if app.data._search_backend(resource) is None:
+        return []
+
+    lookup = {config.ID_FIELD: {'$in': ids}}
+    mongo_items = {item[config.ID_FIELD]: item for item in
+                   backend.get_from_mongo(resource, req=ParsedRequest(), lookup=lookup)}
+    query = {'query': {'ids': {'values': [str(_id) for _id in ids]}}, 'size': len(ids)}
+    search_items = {str(item[config.ID_FIELD]): item for item in backend.search(resource, query)}
+
+    mismatches = []
+    for _id in ids:
+        item = mongo_items.get(_id)
+        search_item = search_items.get(str(_id))
+        if item is None and search_item is None:
+            continue
+        elif search_item is None:
+            mismatch = MISSING_IN_SEARCH
+            backend.create_in_search(resource, [item])
+        elif item is None:
+            mismatch = MISSING_IN_MONGO
+            backend.remove_from_search(resource, search_item)
+        elif item.get(config.ETAG) != search_item.get(config.ETAG):
+            mismatch = ETAG_MISMATCH
+            backend.create_in_search(resource, [item])
+        else:
+            continue
+        mismatches.append({'resource': resource, config.ID_FIELD: _id, 'mismatch': mismatch})
+    return mismatches
@@ -1,12 +1,16 @@
 
+import time
 import redis
 import hermes
 import hermes.backend
 import hermes.backend.dict
 import hermes.backend.redis
+import threading
 
+from collections import OrderedDict, defaultdict
 from flask import current_app as app
 from superdesk import json_utils
+from superdesk.lock import lock, unlock
 from superdesk.logging import logger
 
 
@@ -36,6 +40,124 @@ class SuperdeskMangler(hermes.Mangler):
         return json_utils.loads(value)
 
 
+class LocalCache():
+    """Bounded in-process LRU cache with ttl.
+
+    Values are stored serialized, so callers can't modify cached objects
+    and their length is used for size accounting.
+
+    :param max_size: max total length of stored values
+    :param ttl: max number of seconds to keep a value
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        ttl = min(ttl, self.ttl) if ttl else self.ttl
+        with self._lock:
+            self._pop(key)
+            if len(value) > self.max_size or ttl <= 0:
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self.size += len(value)
+            while self.size > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def remove(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class CacheStats():
+    """Hit/miss counters and load latency per cache namespace."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record(self, namespace, result, seconds):
+        """Record single load.
+
+        :param namespace: cache namespace
+        :param result: one of ``local_hits``, ``hits``, ``misses``
+        :param seconds: time spent loading
+        """
+        with self._lock:
+            stats = self._stats[namespace]
+            stats[result] += 1
+            stats['load_time'] += seconds
+
+    def get(self):
+        with self._lock:
+            return {namespace: dict(stats) for namespace, stats in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats = defaultdict(lambda: {'local_hits': 0, 'hits': 0, 'misses': 0, 'load_time': 0.0})
+
+
+class SuperdeskCacheLock(hermes.backend.AbstractLock):
+    """Single-flight lock using :func:`superdesk.lock.lock`.
+
+    Only one worker recomputes an expired value, others wait for it and then read it
+    from cache. When waiting times out the value is computed anyway.
+    """
+
+    def __init__(self, key):
+        super().__init__(key)
+        self.locked = False
+
+    def acquire(self, wait=True):
+        timeout = app.config.get('CACHE_LOCK_TIMEOUT', 10) if wait else None
+        self.locked = lock(self.key, expire=app.config.get('CACHE_LOCK_EXPIRE', 60), timeout=timeout)
+        return self.locked
+
+    def release(self):
+        if self.locked:
+            unlock(self.key, remove=True)
+            self.locked = False
+
+
+def get_namespace(key):
+    """Get namespace of cache key, that is function name for entries."""
+    parts = key.split(':')
+    if len(parts) > 2 and parts[1] == 'entry':
+        parts = parts[2:]
+        while len(parts) > 1 and len(parts[-1]) == 16:  # strip args and tags hashes
+            parts.pop()
+        return ':'.join(parts)
+    return parts[1] if len(parts) > 1 else key
+
+
 class SuperdeskCacheBackend(hermes.backend.AbstractBackend):
     """Proxy for hermes cache backend.
 
@@ -44,8 +166,23 @@ class SuperdeskCacheBackend(hermes.backend.AbstractBackend):
 
     Later it reads ``CACHE_URL`` config to figure out if we want to use redis backend
     or memcached.
+
+    In front of it there is a local in-process tier, see :class:`LocalCache`, configured
+    via ``CACHE_LOCAL_MAX_SIZE`` and ``CACHE_LOCAL_TTL``. Local values are only invalidated
+    in the process doing the change, so local ttl should be short.
     """
 
+    def __init__(self, mangler, **kwargs):
+        super().__init__(mangler, **kwargs)
+        self.stats = CacheStats()
+
+    @property
+    def _local(self):
+        if getattr(app, 'cache_local', None) is None:
+            app.cache_local = LocalCache(app.config.get('CACHE_LOCAL_MAX_SIZE', 0),
+                                         app.config.get('CACHE_LOCAL_TTL', 0))
+        return app.cache_local
+
     @property
     def _backend(self):
         if not app:
@@ -67,20 +204,48 @@ class SuperdeskCacheBackend(hermes.backend.AbstractBackend):
         return app.cache
 
     def lock(self, key):
-        return self._backend.lock(key)
+        return SuperdeskCacheLock(self.mangler.nameLock(key))
 
     def save(self, key=None, value=None, mapping=None, ttl=None):
-        return self._backend.save(key, value, mapping, ttl)
+        res = self._backend.save(key, value, mapping, ttl)
+        for _key, _value in (mapping or {key: value}).items():
+            self._local.set(_key, self.mangler.dumps(_value), ttl)
+        return res
 
     def load(self, keys):
-        val = self._backend.load(keys)
+        if self._isScalar(keys):
+            return self._load(keys)
+        return {key: val for key, val in ((key, self._load(key)) for key in keys) if val is not None}
+
+    def _load(self, key):
+        start = time.perf_counter()
+        val = self._local.get(key)
+        if val is not None:
+            val = self.mangler.loads(val)
+            result = 'local_hits'
+        else:
+            val = self._backend.load(key)
+            if val is None:
+                result = 'misses'
+            else:
+                self._local.set(key, self.mangler.dumps(val))
+                result = 'hits'
+        self.stats.record(get_namespace(key), result, time.perf_counter() - start)
         return val
 
     def remove(self, keys):
-        return self._backend.remove(keys)
+        for key in ((keys, ) if self._isScalar(keys) else keys):
+            self._local.remove(key)
+            self._backend.remove(key)
 
     def clean(self):
+        self._local.clear()
         return self._backend.clean()
 
 
 cache = hermes.Hermes(SuperdeskCacheBackend, SuperdeskMangler, ttl=600)
+
+
+def get_cache_stats():
+    """Get cache hit/miss counters and load latency per namespace in this process."""
+    return cache.backend.stats.get()
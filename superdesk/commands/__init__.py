@@ -8,6 +8,7 @@ from .update_archived_document import *  # noqa
 from .remove_exported_files import RemoveExportedFiles  # noqa
 from .flush_elastic_index import FlushElasticIndex # noqa
 from .generate_vocabularies import GenerateVocabularies # noqa
+from .verify_backend import VerifyBackend  # noqa
 
 from superdesk.celery_app import celery
 
@@ -15,3 +16,8 @@ from superdesk.celery_app import celery
 @celery.task()
 def temp_file_expiry():
     RemoveExportedFiles()
+
+
+@celery.task(soft_time_limit=300)
+def verify_backend():
+    VerifyBackend().run()
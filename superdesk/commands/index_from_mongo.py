@@ -9,71 +9,199 @@
 # at https://www.sourcefabric.org/superdesk/license
 
 import time
+import queue
 import pymongo
+import threading
 import superdesk
 
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app as app
 from superdesk.errors import BulkIndexError
 from superdesk import config
 
+#: mongo collection used to store indexing progress per id range
+CHECKPOINTS_COLLECTION = 'index_from_mongo_checkpoints'
+
 
 class IndexFromMongo(superdesk.Command):
     """Index the specified mongo collection in the specified elastic collection/type.
 
     This will use the default APP mongo DB to read the data and the default Elastic APP index.
 
+    The ``_id`` keyspace is split into ranges which are indexed by a pool of workers,
+    each worker reads next page from mongo while the current one is sent to elastic.
+    Progress of every range is stored in mongo so that if indexing fails it can continue
+    using ``--resume`` instead of starting from scratch.
+
     Use ``-f all`` to index all collections.
 
     Example:
     ::
 
         $ python manage.py app:index_from_mongo --from=archive
+        $ python manage.py app:index_from_mongo --from=archive --workers=8 --resume
         $ python manage.py app:index_from_mongo --all
     """
 
     option_list = [
         superdesk.Option('--from', '-f', dest='collection_name'),
         superdesk.Option('--all', action='store_true', dest='all_collections'),
-        superdesk.Option('--page-size', '-p')
+        superdesk.Option('--page-size', '-p'),
+        superdesk.Option('--workers', '-w', type=int),
+        superdesk.Option('--resume', '-r', action='store_true', dest='resume'),
     ]
     default_page_size = 500
+    default_workers = 4
+
+    #: number of id ranges per worker, more ranges balance the load better
+    ranges_per_worker = 4
+
+    #: number of attempts to send a page to elastic
+    insert_attempts = 3
 
-    def run(self, collection_name, all_collections, page_size):
+    def run(self, collection_name, all_collections, page_size, workers=None, resume=False):
         if not collection_name and not all_collections:
             raise SystemExit('Specify --all to index from all collections')
         elif all_collections:
             app.data.init_elastic(app)
             resources = app.data.get_elastic_resources()
             for resource in resources:
-                self.copy_resource(resource, page_size)
+                self.copy_resource(resource, page_size, workers, resume)
         else:
-            self.copy_resource(collection_name, page_size)
+            self.copy_resource(collection_name, page_size, workers, resume)
 
     @classmethod
-    def copy_resource(cls, resource, page_size):
-        for items in cls.get_mongo_items(resource, page_size):
-            print('{} Inserting {} items'.format(time.strftime('%X %x %Z'), len(items)))
-            s = time.time()
-            success, failed = 0, 0
-
-            for i in range(1, 4):
-                try:
-                    success, failed = superdesk.app.data._search_backend(resource).bulk_insert(
-                        resource, items)
-                except Exception as ex:
-                    print('Exception thrown on insert to elastic {}', ex)
-                    time.sleep(10)
-                    continue
-                else:
-                    break
-
-            print('{} Inserted {} items in {:.3f} seconds'.format(time.strftime('%X %x %Z'), success, time.time() - s))
-            if failed:
-                print('Failed to do bulk insert of items {}. Errors: {}'.format(len(failed), failed))
-                raise BulkIndexError(resource=resource, errors=failed)
+    def copy_resource(cls, resource, page_size, workers=None, resume=False):
+        """Index all items of given resource from mongo to elastic.
+
+        :param resource: resource name
+        :param page_size: number of items sent to elastic at once
+        :param workers: number of parallel workers
+        :param resume: continue from stored checkpoints of previous run
+        """
+        workers = max(1, int(workers or cls.default_workers))
+        page_size = int(page_size) if page_size else cls.default_page_size
+        print('Indexing data from mongo/{} to elastic/{}'.format(resource, resource))
+
+        checkpoints = cls.get_checkpoints(resource) if resume else []
+        if checkpoints:
+            print('Resuming indexing of {} from {} checkpoints'.format(resource, len(checkpoints)))
+        else:
+            cls.clear_checkpoints(resource)
+            checkpoints = cls.create_checkpoints(resource, cls.get_id_ranges(resource, workers * cls.ranges_per_worker))
 
+        pending = [checkpoint for checkpoint in checkpoints if not checkpoint.get('done')]
+        total = sum(checkpoint.get('count', 0) for checkpoint in checkpoints)
+        progress = IndexProgress(resource, total, sum(checkpoint.get('indexed', 0) for checkpoint in checkpoints))
+        flask_app = app._get_current_object()
+
+        if workers == 1 or len(pending) <= 1:
+            for checkpoint in pending:
+                cls.copy_range(flask_app, resource, checkpoint, page_size, progress)
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+                futures = [executor.submit(cls.copy_range, flask_app, resource, checkpoint, page_size, progress)
+                           for checkpoint in pending]
+            for future in futures:
+                future.result()
+
+        progress.report(force=True)
+        cls.clear_checkpoints(resource)
         return 'Finished indexing collection {}'.format(resource)
 
+    @classmethod
+    def copy_range(cls, flask_app, resource, checkpoint, page_size, progress):
+        """Index items from single id range.
+
+        Pages are read from mongo in background while the previous page is being indexed,
+        after every page the checkpoint is updated.
+
+        :param flask_app: app instance
+        :param resource: resource name
+        :param checkpoint: range checkpoint
+        :param page_size: number of items sent to elastic at once
+        :param progress: progress reporter
+        """
+        with flask_app.app_context():
+            pages = prefetch(cls.get_range_items(resource, checkpoint, page_size))
+            search_backend = app.data._search_backend(resource)
+            try:
+                for items in pages:
+                    success, failed = cls.bulk_insert(search_backend, resource, items)
+                    if failed:
+                        print('Failed to do bulk insert of items {}. Errors: {}'.format(len(failed), failed))
+                        raise BulkIndexError(resource=resource, errors=failed)
+                    checkpoint['last_id'] = items[-1][config.ID_FIELD]
+                    checkpoint['indexed'] = checkpoint.get('indexed', 0) + len(items)
+                    cls.save_checkpoint(checkpoint, last_id=checkpoint['last_id'], indexed=checkpoint['indexed'])
+                    progress.add(len(items))
+            finally:
+                pages.close()
+            cls.save_checkpoint(checkpoint, done=True)
+
+    @classmethod
+    def bulk_insert(cls, search_backend, resource, items):
+        for attempt in range(1, cls.insert_attempts + 1):
+            try:
+                return search_backend.bulk_insert(resource, items)
+            except Exception as ex:
+                if attempt == cls.insert_attempts:
+                    raise
+                print('Exception thrown on insert to elastic {}'.format(ex))
+                time.sleep(2 ** attempt)
+
+    @classmethod
+    def get_id_ranges(cls, resource, count):
+        """Split ``_id`` keyspace of given resource into ranges of similar size.
+
+        Boundaries are found using ``skip`` on ``_id`` index.
+
+        :param resource: resource name
+        :param count: number of ranges
+        :return list: list of ``(lower, upper, count)`` tuples, ``None`` means unbounded
+        """
+        db = app.data.get_mongo_collection(resource)
+        total = db.count()
+        count = max(1, min(count, total // cls.default_page_size))
+        bounds = []
+        for i in range(1, count):
+            cursor = db.find({}, {config.ID_FIELD: 1}).sort(config.ID_FIELD, pymongo.ASCENDING)
+            for item in cursor.skip(i * total // count).limit(1):
+                if not bounds or bounds[-1] != item[config.ID_FIELD]:
+                    bounds.append(item[config.ID_FIELD])
+        lowers = [None] + bounds
+        uppers = bounds + [None]
+        sizes = [total // len(lowers)] * len(lowers)
+        sizes[-1] += total - sum(sizes)
+        return list(zip(lowers, uppers, sizes))
+
+    @classmethod
+    def get_range_items(cls, resource, checkpoint, page_size):
+        """Generate pages of items from given id range.
+
+        :param resource: resource name
+        :param checkpoint: range checkpoint
+        :param page_size: size of every page
+        """
+        db = app.data.get_mongo_collection(resource)
+        last_id = checkpoint.get('last_id')
+        while True:
+            id_filter = {}
+            if last_id is not None:
+                id_filter['$gt'] = last_id
+            elif checkpoint.get('lower') is not None:
+                id_filter['$gte'] = checkpoint['lower']
+            if checkpoint.get('upper') is not None:
+                id_filter['$lt'] = checkpoint['upper']
+            query = {config.ID_FIELD: id_filter} if id_filter else {}
+            items = list(db.find(query, sort=[(config.ID_FIELD, pymongo.ASCENDING)], limit=page_size))
+            if not items:
+                break
+            last_id = items[-1][config.ID_FIELD]
+            yield items
+            if len(items) < page_size:
+                break
+
     @classmethod
     def get_mongo_items(cls, mongo_collection_name, page_size):
         """Generate list of items from given mongo collection per page size.
@@ -83,20 +211,129 @@ class IndexFromMongo(superdesk.Command):
         :return: list of items
         """
         bucket_size = int(page_size) if page_size else cls.default_page_size
-        print('Indexing data from mongo/{} to elastic/{}'.format(mongo_collection_name, mongo_collection_name))
+        return cls.get_range_items(mongo_collection_name, {}, bucket_size)
 
-        db = app.data.get_mongo_collection(mongo_collection_name)
-        args = {'limit': bucket_size, 'sort': [(config.ID_FIELD, pymongo.ASCENDING)]}
-        last_id = None
-        while True:
-            if last_id:
-                args.update({'filter': {config.ID_FIELD: {'$gt': last_id}}})
-            cursor = db.find(**args)
-            if not cursor.count():
-                break
-            items = list(cursor)
-            last_id = items[-1][config.ID_FIELD]
-            yield items
+    @classmethod
+    def get_checkpoints_collection(cls):
+        return app.data.mongo.pymongo().db[CHECKPOINTS_COLLECTION]
+
+    @classmethod
+    def get_checkpoints(cls, resource):
+        return list(cls.get_checkpoints_collection().find({'resource': resource}, sort=[('index', pymongo.ASCENDING)]))
+
+    @classmethod
+    def create_checkpoints(cls, resource, ranges):
+        checkpoints = [{
+            config.ID_FIELD: '{}:{}'.format(resource, index),
+            'resource': resource,
+            'index': index,
+            'lower': lower,
+            'upper': upper,
+            'count': count,
+            'indexed': 0,
+            'last_id': None,
+            'done': False,
+        } for index, (lower, upper, count) in enumerate(ranges)]
+        if checkpoints:
+            cls.get_checkpoints_collection().insert_many(checkpoints)
+        return checkpoints
+
+    @classmethod
+    def save_checkpoint(cls, checkpoint, **updates):
+        cls.get_checkpoints_collection().update_one({config.ID_FIELD: checkpoint[config.ID_FIELD]}, {'$set': updates})
+
+    @classmethod
+    def clear_checkpoints(cls, resource):
+        cls.get_checkpoints_collection().delete_many({'resource': resource})
+
+
+class IndexProgress():
+    """Thread safe progress reporter printing indexed docs/sec.
+
+    :param resource: resource name
+    :param total: expected number of items
+    :param done: number of items indexed before
+    :param interval: min seconds between reports
+    """
+
+    def __init__(self, resource, total, done=0, interval=5):
+        self.resource = resource
+        self.total = total
+        self.done = done
+        self.indexed = 0
+        self.interval = interval
+        self.started = time.monotonic()
+        self.reported = self.started
+        self._lock = threading.Lock()
+
+    def add(self, count):
+        with self._lock:
+            self.done += count
+            self.indexed += count
+        self.report()
+
+    def report(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self.reported < self.interval:
+                return
+            self.reported = now
+            done, indexed = self.done, self.indexed
+        rate = indexed / max(now - self.started, 0.001)
+        print('{} {}: indexed {}/{} items, {:.0f} docs/s'.format(
+            time.strftime('%X %x %Z'), self.resource, done, self.total, rate))
+
+
+def prefetch(iterable, size=1):
+    """Iterate over ``iterable`` in background thread, keeping up to ``size`` items ready.
+
+    Must run within app context, which is pushed for the background thread.
+    Use ``close`` on returned generator to stop the background thread early.
+
+    :param iterable: source iterable
+    :param size: number of items to read ahead
+    """
+    flask_app = app._get_current_object()
+    buffer = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    end = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read():
+        with flask_app.app_context():
+            try:
+                for item in iterable:
+                    if not put((item, None)):
+                        return
+            except Exception as ex:
+                put((end, ex))
+                return
+            put((end, None))
+
+    def generate():
+        thread = threading.Thread(target=read, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item, error = buffer.get()
+                if error is not None:
+                    raise error
+                if item is end:
+                    return
+                yield item
+        finally:
+            stop.set()
+            thread.join()
+
+    return generate()
 
 
 superdesk.command('app:index_from_mongo', IndexFromMongo())
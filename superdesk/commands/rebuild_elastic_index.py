@@ -9,12 +9,109 @@
 # at https://www.sourcefabric.org/superdesk/license
 
 
+import time
+import pymongo
 import superdesk
 import elasticsearch
 
+from datetime import timedelta
 from flask import current_app
+from elasticsearch.helpers import scan, bulk
+from eve.utils import config
 from eve_elastic import get_es, get_indices, reindex
+from superdesk.utc import utcnow
 from superdesk.utils import get_random_string
+from superdesk.elastic_rebuild import start_rebuild, finish_rebuild, pop_deleted, bulk_index, get_resource_alias
+
+
+class Throttle():
+    """Limit number of processed documents per second.
+
+    :param max_per_second: max documents per second, ``0`` means unlimited
+    """
+
+    def __init__(self, max_per_second=0):
+        self.max_per_second = max_per_second
+        self.started = time.monotonic()
+        self.count = 0
+
+    def wait(self, count):
+        """Add processed documents and sleep if over the limit."""
+        self.count += count
+        if self.max_per_second:
+            delay = self.count / self.max_per_second - (time.monotonic() - self.started)
+            if delay > 0:
+                time.sleep(delay)
+
+
+def copy_index(es, source, target, batch_size, throttle):
+    """Copy all documents from source index into target index.
+
+    :param es: elastic client
+    :param source: source index or alias
+    :param target: target index
+    :param batch_size: number of documents per bulk request
+    :param throttle: throttle instance
+    :return int: number of copied documents
+    """
+    hits = scan(es, index=source, scroll='5m', size=batch_size,
+                fields=('_source', '_parent', '_routing', '_timestamp'))
+    copied = 0
+    batch = []
+    for hit in hits:
+        action = {'_index': target, '_type': hit['_type'], config.ID_FIELD: hit[config.ID_FIELD],
+                  '_source': hit['_source']}
+        action.update(hit.get('fields', {}))
+        batch.append(action)
+        if len(batch) >= batch_size:
+            copied += _bulk_copy(es, batch, throttle)
+            batch = []
+    if batch:
+        copied += _bulk_copy(es, batch, throttle)
+    return copied
+
+
+def _bulk_copy(es, batch, throttle):
+    success, _errors = bulk(es, batch, chunk_size=len(batch))
+    throttle.wait(len(batch))
+    return success
+
+
+def catch_up(alias, target, since, batch_size, throttle):
+    """Copy documents changed in mongo since given time and deleted documents into target index.
+
+    :param alias: live index alias
+    :param target: target index
+    :param since: min ``_updated`` timestamp
+    :param batch_size: number of documents per bulk request
+    :param throttle: throttle instance
+    :return int: number of changed documents
+    """
+    changed = 0
+    for resource in current_app.data.get_elastic_resources():
+        if get_resource_alias(resource) != alias:
+            continue
+        collection = current_app.data.get_mongo_collection(resource)
+        query = {config.LAST_UPDATED: {'$gte': since}}
+        last_id = None
+        while True:
+            if last_id is not None:
+                query[config.ID_FIELD] = {'$gt': last_id}
+            docs = list(collection.find(query, sort=[(config.ID_FIELD, pymongo.ASCENDING)], limit=batch_size))
+            if not docs:
+                break
+            bulk_index(resource, target, docs)
+            throttle.wait(len(docs))
+            changed += len(docs)
+            last_id = docs[-1][config.ID_FIELD]
+
+    deleted = {}
+    for resource, _id in pop_deleted(alias):
+        deleted.setdefault(resource, []).append({'_op_type': 'delete', config.ID_FIELD: _id})
+    for resource, actions in deleted.items():
+        bulk_index(resource, target, actions)
+        changed += len(actions)
+    return changed
 
 
 class RebuildElasticIndex(superdesk.Command):
@@ -23,19 +120,31 @@ class RebuildElasticIndex(superdesk.Command):
     It creates new index with same alias as the configured index,
     puts the new mapping and removes the old index.
 
+    With ``--online`` the old index is used until the new one is ready. Changes done
+    during the copy are written to both indexes and the ones missed are copied afterwards
+    using ``_updated`` timestamp from mongo, then alias is moved to the new index in single request.
+    Use ``--max-docs-per-second`` to limit load on elastic while rebuilding.
+
     Example:
     ::
 
         $ python manage.py app:rebuild_elastic_index
         $ python manage.py app:rebuild_elastic_index --index=contentapi
         $ python manage.py app:rebuild_elastic_index --index=superdesk
+        $ python manage.py app:rebuild_elastic_index --online --max-docs-per-second=2000
     """
 
     option_list = [
-        superdesk.Option('--index', '-i', dest='index_name')
+        superdesk.Option('--index', '-i', dest='index_name'),
+        superdesk.Option('--online', '-o', action='store_true', dest='online'),
+        superdesk.Option('--batch-size', '-b', dest='batch_size', type=int, default=500),
+        superdesk.Option('--max-docs-per-second', '-m', dest='max_docs_per_second', type=int, default=0),
     ]
 
-    def run(self, index_name=None):
+    #: max number of catch up passes before moving the alias
+    max_catch_up_passes = 5
+
+    def run(self, index_name=None, online=False, batch_size=500, max_docs_per_second=0):
         # if no index name is passed then use the configured one
         indexes = list(current_app.data.elastic._get_indexes().keys())
         if index_name and index_name in indexes:
@@ -43,6 +152,9 @@ class RebuildElasticIndex(superdesk.Command):
         elif index_name:
             raise Exception("Index {} is not configured".format(index_name))
         for index_name in indexes:
+            if online:
+                self.rebuild_online(index_name, batch_size, max_docs_per_second)
+                continue
             try:
                 print('Starting index rebuilding for index: {}'.format(index_name))
                 es = get_es(superdesk.app.config['ELASTICSEARCH_URL'])
@@ -67,5 +179,58 @@ class RebuildElasticIndex(superdesk.Command):
                 print(nfe)
             print('Index {0} rebuilt successfully.'.format(index_name))
 
+    def rebuild_online(self, index_name, batch_size=500, max_docs_per_second=0):
+        """Rebuild index while keeping the old one in use.
+
+        :param index_name: index alias
+        :param batch_size: number of documents per bulk request
+        :param max_docs_per_second: max documents written per second, ``0`` means unlimited
+        """
+        print('Starting online index rebuilding for index: {}'.format(index_name))
+        es = get_es(superdesk.app.config['ELASTICSEARCH_URL'])
+        old_name = superdesk.app.data.elastic.get_index_by_alias(index_name)
+        if old_name == index_name:
+            raise SystemExit('Index {} is not an alias, use rebuild without --online.'.format(index_name))
+
+        clone_name = index_name + '-' + get_random_string()
+        print('Creating index: ', clone_name)
+        superdesk.app.data.elastic.create_index(clone_name, superdesk.app.config['ELASTICSEARCH_SETTINGS'])
+        real_name = superdesk.app.data.elastic.get_index_by_alias(clone_name)
+        print('Putting mapping for index: ', clone_name)
+        superdesk.app.data.elastic.put_mapping(superdesk.app, clone_name)
+
+        check_interval = superdesk.app.config.get('ELASTIC_REBUILD_CHECK_INTERVAL', 5)
+        throttle = Throttle(max_docs_per_second)
+        since = utcnow() - timedelta(seconds=check_interval)
+        start_rebuild(index_name, real_name)
+        try:
+            # wait for other processes to start writing into both indexes
+            time.sleep(check_interval)
+            print('Copying documents.')
+            copied = copy_index(es, index_name, real_name, batch_size, throttle)
+            print('Copied {} documents.'.format(copied))
+            for _ in range(self.max_catch_up_passes):
+                pass_started = utcnow()
+                changed = catch_up(index_name, real_name, since, batch_size, throttle)
+                print('Copied {} documents changed during rebuild.'.format(changed))
+                since = pass_started
+                if changed < batch_size:
+                    break
+            print('Moving alias {} to index {}'.format(index_name, real_name))
+            get_indices(es).update_aliases(body={'actions': [
+                {'remove': {'index': old_name, 'alias': index_name}},
+                {'remove': {'index': real_name, 'alias': clone_name}},
+                {'add': {'index': real_name, 'alias': index_name}},
+            ]})
+        except BaseException:
+            print('Rebuilding failed, deleting index: ', real_name)
+            finish_rebuild(index_name)
+            get_indices(es).delete(real_name)
+            raise
+        finish_rebuild(index_name)
+        print('Deleting index: ', old_name)
+        get_indices(es).delete(old_name)
+        print('Index {0} rebuilt successfully.'.format(index_name))
+
 
 superdesk.command('app:rebuild_elastic_index', RebuildElasticIndex())
@@ -0,0 +1,52 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+import logging
+import superdesk
+
+from superdesk.backend_verifier import verify_samples
+from superdesk.celery_task_utils import get_lock_id
+from superdesk.lock import lock, unlock
+
+logger = logging.getLogger(__name__)
+
+
+class VerifyBackend(superdesk.Command):
+    """Verify items sampled by ``find_one`` and repair elastic if it differs from mongo.
+
+    Items are only sampled when ``BACKEND_FIND_ONE_CONSISTENCY`` is set to ``mongo``.
+
+    Example:
+    ::
+
+        $ python manage.py app:verify_backend
+        $ python manage.py app:verify_backend --batch-size=1000
+    """
+
+    option_list = [
+        superdesk.Option('--batch-size', '-b', dest='batch_size', required=False, type=int, default=500)
+    ]
+
+    def run(self, batch_size=500):
+        lock_name = get_lock_id('backend', 'verify')
+        if not lock(lock_name, expire=300):
+            logger.info('Backend verification task is already running')
+            return
+
+        try:
+            mismatches = verify_samples(superdesk.get_backend(), batch_size)
+            if mismatches:
+                logger.info('Repaired {} backend mismatches'.format(len(mismatches)))
+            return mismatches
+        finally:
+            unlock(lock_name)
+
+
+superdesk.command('app:verify_backend', VerifyBackend())
@@ -154,6 +154,17 @@ if env('ELASTIC_PORT'):
 
 ELASTICSEARCH_BACKUPS_PATH = env('ELASTICSEARCH_BACKUPS_PATH', '')
 
+#: how ``find_one`` reads search backed resources:
+#: ``search`` reads both mongo and elastic and repairs elastic on every read,
+#: ``mongo`` reads only mongo and a sample of items is verified in background
+BACKEND_FIND_ONE_CONSISTENCY = env('BACKEND_FIND_ONE_CONSISTENCY', 'search')
+
+#: ratio of items read via ``find_one`` which are verified in background when using ``mongo`` consistency
+BACKEND_VERIFY_SAMPLE_RATE = float(env('BACKEND_VERIFY_SAMPLE_RATE', 0.01))
+
+#: max seconds before other processes notice online elastic index rebuild and start writing to both indexes
+ELASTIC_REBUILD_CHECK_INTERVAL = int(env('ELASTIC_REBUILD_CHECK_INTERVAL', 5))
+
 #: elastic settings - superdesk custom filter
 ELASTICSEARCH_SETTINGS = {
     'settings': {
@@ -184,6 +195,30 @@ if env('REDIS_PORT'):
 #: cache url - superdesk will try to figure out if it's redis or memcached
 CACHE_URL = env('SUPERDESK_CACHE_URL', REDIS_URL)
 
+#: max total size of values in local in-process cache tier, ``0`` disables it
+CACHE_LOCAL_MAX_SIZE = int(env('CACHE_LOCAL_MAX_SIZE', 10 * 1024 * 1024))
+
+#: max seconds to keep value in local cache tier, changes from other processes are visible after it
+CACHE_LOCAL_TTL = int(env('CACHE_LOCAL_TTL', 5))
+
+#: max seconds to wait for other worker computing the same cache value
+CACHE_LOCK_TIMEOUT = int(env('CACHE_LOCK_TIMEOUT', 10))
+
+#: max number of threads transmitting publish queue items of a subscriber
+TRANSMIT_MAX_WORKERS = int(env('TRANSMIT_MAX_WORKERS', 4))
+
+#: max number of items transmitted to single destination at the same time, with ``1`` items are sent in order
+TRANSMIT_DESTINATION_CONCURRENCY = int(env('TRANSMIT_DESTINATION_CONCURRENCY', 1))
+
+#: max number of idle connections kept per destination
+TRANSMIT_CONNECTIONS_PER_DESTINATION = int(env('TRANSMIT_CONNECTIONS_PER_DESTINATION', 2))
+
+#: seconds after which idle destination connection is closed
+TRANSMIT_CONNECTION_MAX_IDLE = int(env('TRANSMIT_CONNECTION_MAX_IDLE', 60))
+
+#: lock backend used by ``superdesk.lock`` - ``mongo``, ``redis`` or ``memory`` (single process only)
+LOCK_BACKEND = env('LOCK_BACKEND', 'mongo')
+
 #: celery broker
 BROKER_URL = env('CELERY_BROKER_URL', REDIS_URL)
 CELERY_BROKER_URL = BROKER_URL
@@ -327,6 +362,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.legal_archive.import_legal_archive',
         'schedule': crontab(minute=30, hour=local_to_utc_hour(0))
     },
+    'backend:verify': {
+        'task': 'superdesk.commands.verify_backend',
+        'schedule': timedelta(minutes=1),
+    },
     'saved_searches:report': {
         'task': 'apps.saved_searches.report',
         'schedule': timedelta(minutes=1)
@@ -492,6 +531,14 @@ RENDITIONS = {
     }
 }
 
+#: number of threads used to encode image renditions
+RENDITIONS_WORKERS = int(env('RENDITIONS_WORKERS', 4))
+
+#: only record custom crop renditions when creating pictures and render them on first request
+RENDITIONS_LAZY = strtobool(env('RENDITIONS_LAZY', 'false'))
+
+#: max size in bytes of lazy renditions stored in media storage, least recently used are removed first
+RENDITIONS_CACHE_MAX_SIZE = int(env('RENDITIONS_CACHE_MAX_SIZE', 1024 * 1024 * 1024))
 
 #: BCRYPT work factor
 BCRYPT_GENSALT_WORK_FACTOR = 12
@@ -545,6 +592,15 @@ PUBLISHED_CONTENT_EXPIRY_MINUTES = int(env('PUBLISHED_CONTENT_EXPIRY_MINUTES', 0
 #: The number of minutes before audit content is purged
 AUDIT_EXPIRY_MINUTES = int(env('AUDIT_EXPIRY_MINUTES', 0))
 
+#: Number of audit records buffered in memory before writing them to db at once
+AUDIT_BUFFER_SIZE = int(env('AUDIT_BUFFER_SIZE', 100))
+
+#: Max seconds audit records are buffered before writing them to db
+AUDIT_FLUSH_INTERVAL = float(env('AUDIT_FLUSH_INTERVAL', 1))
+
+#: Store only id and modified fields as audit extra instead of whole document
+AUDIT_DELTA_ONLY = strtobool(env('AUDIT_DELTA_ONLY', 'false'))
+
 #: The number records to be fetched for expiry.
 MAX_EXPIRY_QUERY_LIMIT = int(env('MAX_EXPIRY_QUERY_LIMIT', 100))
 
@@ -570,9 +626,29 @@ WS_PORT = env('WSPORT', '5100')
 # Used by the  Kombu Connection. Only valid for the AMQP protocol
 WS_HEART_BEAT = int(env('WS_HEARTBEAT', '0'))
 
+#: seconds websocket server waits before sending notification to client, same notifications are sent once
+WS_COALESCE_WINDOW = float(env('WS_COALESCE_WINDOW', 0.5))
+
+#: max number of notifications waiting to be sent to single websocket client, oldest are dropped
+WS_CLIENT_MAX_PENDING = int(env('WS_CLIENT_MAX_PENDING', 100))
+
+#: seconds after which websocket client which is not receiving notifications is disconnected
+WS_SEND_TIMEOUT = int(env('WS_SEND_TIMEOUT', 10))
+
+#: seconds between checks for changes of users, desks, stages and vocabularies cached in memory
+REFERENCE_CACHE_CHECK_INTERVAL = int(env('REFERENCE_CACHE_CHECK_INTERVAL', 5))
+
 #: Defines the maximum value of Publish Sequence Number after which the value will start from 1
 MAX_VALUE_OF_PUBLISH_SEQUENCE = int(env('MAX_VALUE_OF_PUBLISH_SEQUENCE', 9999))
 
+#: Number of Publish Sequence Numbers reserved at once per subscriber and kept in memory,
+#: with values over 1 the numbers are not increasing across processes and unused ones are skipped
+PUBLISH_SEQUENCE_BLOCK_SIZE = int(env('PUBLISH_SEQUENCE_BLOCK_SIZE', 1))
+
+#: Store full item version every n versions, versions in between are stored as delta to it,
+#: use 1 to store every version in full
+VERSIONS_SNAPSHOT_INTERVAL = int(env('VERSIONS_SNAPSHOT_INTERVAL', 10))
+
 #: Defines default value for Source to be set for manually created articles
 DEFAULT_SOURCE_VALUE_FOR_MANUAL_ARTICLES = env('DEFAULT_SOURCE_VALUE_FOR_MANUAL_ARTICLES', 'Superdesk')
 
@@ -628,6 +704,13 @@ FTP_TIMEOUT = 300
 #: default amount of files which can processed during one iteration of ftp ingest
 FTP_INGEST_FILES_LIST_LIMIT = 100
 
+#: number of parallel FTP sessions used to retrieve files during one iteration of ftp ingest,
+#: files are processed one by one using single session when set to ``1``
+FTP_INGEST_CONCURRENCY = int(env('FTP_INGEST_CONCURRENCY', 1))
+
+#: number of workers parsing files retrieved via parallel FTP sessions
+FTP_INGEST_PARSE_WORKERS = int(env('FTP_INGEST_PARSE_WORKERS', 2))
+
 #: default timeout for email connections
 EMAIL_TIMEOUT = 10
 
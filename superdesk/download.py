@@ -12,10 +12,10 @@
 import logging
 import superdesk
 from superdesk.errors import SuperdeskApiError
-from werkzeug.wsgi import wrap_file
+from superdesk.media.ranges import get_media_file, get_media_response
 from .resource import Resource
 from .services import BaseService
-from flask import url_for, request, current_app as app
+from flask import url_for, current_app as app
 
 bp = superdesk.Blueprint('download_raw', __name__)
 logger = logging.getLogger(__name__)
@@ -26,17 +26,9 @@ logger = logging.getLogger(__name__)
 def download_file(id, folder=None):
     filename = '{}/{}'.format(folder, id) if folder else id
 
-    file = app.media.get(filename, 'download')
+    file = get_media_file(filename, 'download')
     if file:
-        data = wrap_file(request.environ, file, buffer_size=1024 * 256)
-        response = app.response_class(
-            data,
-            mimetype=file.content_type,
-            direct_passthrough=True)
-        response.content_length = file.length
-        response.last_modified = file.upload_date
-        response.headers['Content-Disposition'] = 'attachment; filename=\"export.zip\"'
-        return response
+        return get_media_response(file, disposition='attachment; filename=\"export.zip\"')
     raise SuperdeskApiError.notFoundError('File not found on media storage.')
 
 
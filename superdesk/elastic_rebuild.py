@@ -0,0 +1,160 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Writes to both live and new elastic index during online index rebuild.
+
+When an index rebuild is started using :func:`start_rebuild`, every process writing
+to elastic via :class:`superdesk.eve_backend.EveBackend` will also write changes
+to the new index, using :func:`mirror_actions`. Rebuilds are stored in mongo and checked
+at most every ``ELASTIC_REBUILD_CHECK_INTERVAL`` seconds, changes made before a process
+notices the rebuild must be copied later using ``_updated`` timestamp.
+"""
+
+import time
+import logging
+import threading
+
+from flask import current_app as app
+from eve.utils import config
+from elasticsearch.helpers import bulk
+
+logger = logging.getLogger(__name__)
+
+REBUILDS_COLLECTION = 'elastic_rebuilds'
+
+_cache = {'checked': None, 'targets': {}}
+_lock = threading.Lock()
+
+
+def _get_collection():
+    return app.data.mongo.pymongo().db[REBUILDS_COLLECTION]
+
+
+def _reset_cache():
+    with _lock:
+        _cache['checked'] = None
+
+
+def start_rebuild(alias, index):
+    """Start writing changes for index with given alias also into new index.
+
+    :param alias: live index alias
+    :param index: new index name
+    """
+    _get_collection().replace_one({config.ID_FIELD: alias},
+                                  {config.ID_FIELD: alias, 'index': index, 'deleted': []},
+                                  upsert=True)
+    _reset_cache()
+
+
+def finish_rebuild(alias):
+    """Stop writing changes into new index.
+
+    :param alias: live index alias
+    """
+    _get_collection().delete_one({config.ID_FIELD: alias})
+    _reset_cache()
+
+
+def pop_deleted(alias):
+    """Get documents deleted since last call.
+
+    :param alias: live index alias
+    :return list: list of ``(resource, _id)`` tuples
+    """
+    rebuild = _get_collection().find_one_and_update({config.ID_FIELD: alias}, {'$set': {'deleted': []}})
+    return [(deleted['resource'], deleted[config.ID_FIELD]) for deleted in (rebuild or {}).get('deleted', [])]
+
+
+def get_rebuild_targets():
+    """Get map of index aliases being rebuilt to new index names.
+
+    Value is cached for ``ELASTIC_REBUILD_CHECK_INTERVAL`` seconds.
+    """
+    now = time.monotonic()
+    with _lock:
+        checked = _cache['checked']
+        if checked is not None and now - checked < app.config.get('ELASTIC_REBUILD_CHECK_INTERVAL', 5):
+            return _cache['targets']
+    try:
+        targets = {rebuild[config.ID_FIELD]: rebuild['index'] for rebuild in _get_collection().find({}, {'index': 1})}
+    except Exception as ex:
+        logger.warning('Failed to get elastic rebuilds error=%s', ex)
+        return _cache['targets']
+    with _lock:
+        _cache.update(checked=now, targets=targets)
+    return targets
+
+
+def get_resource_alias(resource):
+    """Get live index alias for given resource.
+
+    :param resource: resource name
+    """
+    search_backend = app.data._search_backend(resource)
+    if search_backend is not None:
+        return search_backend._resource_index(resource)
+
+
+def mirror_actions(resource, actions):
+    """Write bulk actions also to new index if index of resource is being rebuilt.
+
+    Errors are only logged, documents are fixed later when catching up using ``_updated``.
+
+    :param resource: resource name
+    :param actions: docs to index or bulk delete actions
+    """
+    targets = get_rebuild_targets()
+    if not targets or not actions:
+        return
+    alias = get_resource_alias(resource)
+    index = targets.get(alias)
+    if not index:
+        return
+    deleted = [action[config.ID_FIELD] for action in actions if action.get('_op_type') == 'delete']
+    try:
+        if deleted:
+            datasource = app.data.datasource(resource)[0]
+            _get_collection().update_one({config.ID_FIELD: alias}, {'$push': {'deleted': {'$each': [
+                {'resource': datasource, config.ID_FIELD: _id} for _id in deleted
+            ]}}})
+        bulk_index(resource, index, actions)
+    except Exception as ex:
+        logger.warning('Failed to write to rebuilt index resource=%s index=%s error=%s', resource, index, ex)
+
+
+def bulk_index(resource, index, actions):
+    """Write bulk actions of given resource to given index.
+
+    Missing documents are ignored when deleting.
+
+    :param resource: resource name
+    :param index: index name
+    :param actions: docs to index or bulk delete actions
+    :return int: number of successful actions
+    """
+    search_backend = app.data._search_backend(resource)
+    parent_field = search_backend._get_parent_type(resource).get('field')
+    prepared = []
+    for action in actions:
+        action = dict(action)
+        action.pop('_type', None)
+        if parent_field and action.get(parent_field) and '_parent' not in action:
+            action['_parent'] = action[parent_field]
+        prepared.append(action)
+    success, errors = bulk(search_backend.elastic(resource), prepared, index=index,
+                           doc_type=app.data.datasource(resource)[0], raise_on_error=False, stats_only=False)
+    for error in errors:
+        action, info = next(iter(error.items()))
+        if action == 'delete' and info.get('status') == 404:
+            continue
+        logger.warning('Failed to write to index={} resource={} id={} error={}'.format(
+            index, resource, info.get(config.ID_FIELD), info.get('error')))
+    return success
@@ -9,8 +9,12 @@
 # at https://www.sourcefabric.org/superdesk/license
 
 
+import threading
 import eve.io.base
 
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from contextlib import contextmanager
 from flask import current_app as app, json
 from eve.utils import document_etag, config, ParsedRequest
 from eve.io.mongo import MongoJSONEncoder
@@ -19,20 +23,214 @@ from superdesk.logging import logger, item_msg
 from eve.methods.common import resolve_document_etag
 from elasticsearch.exceptions import RequestError, NotFoundError
 from superdesk.errors import SuperdeskApiError
+from superdesk.backend_verifier import sample_item
+from superdesk.elastic_rebuild import mirror_actions
+
+BULK_BATCH_SIZE = 500
+
+
+class BulkWriter():
+    """Buffers backend writes and flushes them using bulk apis.
+
+    Created via :meth:`EveBackend.bulk`. Updates and replaces are still done in mongo
+    immediately, only elastic part is buffered. Created documents are not available
+    before the flush, so don't modify them within the same bulk.
+
+    Errors from every flush are logged and collected in :attr:`errors`, each error
+    is a dict with ``resource``, ``_id``, ``action`` and ``error`` keys.
+
+    :param backend: backend instance
+    :param batch_size: flush automatically when there are this many buffered writes
+    """
+
+    def __init__(self, backend, batch_size=BULK_BATCH_SIZE):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.errors = []
+        self._reset()
+
+    def _reset(self):
+        self._created = {}  # docs to insert into mongo
+        self._indexed = {}  # docs to index in elastic
+        self._reindexed = {}  # ids to index in elastic from mongo
+        self._removed = {}  # docs to remove from elastic and mongo
+        self._size = 0
+
+    def _add(self, buffer, endpoint_name, items):
+        buffer.setdefault(endpoint_name, []).extend(items)
+        self._size += len(items)
+        if self._size >= self.batch_size:
+            self.flush()
+
+    def create(self, endpoint_name, docs):
+        """Buffer mongo insert, returns ids of docs."""
+        for doc in docs:
+            doc.setdefault(config.ID_FIELD, ObjectId())
+        self._add(self._created, endpoint_name, docs)
+        return [doc[config.ID_FIELD] for doc in docs]
+
+    def index(self, endpoint_name, docs):
+        """Buffer elastic index of given docs."""
+        self._add(self._indexed, endpoint_name, docs)
+
+    def reindex(self, endpoint_name, id):
+        """Buffer elastic index of doc with given id, using its current version from mongo."""
+        self._add(self._reindexed, endpoint_name, [id])
+
+    def remove(self, endpoint_name, docs):
+        """Buffer removal of docs from elastic and mongo."""
+        self._add(self._removed, endpoint_name, docs)
+
+    def remove_from_search(self, endpoint_name, doc):
+        """Buffer removal of doc from elastic only."""
+        self._add(self._indexed, endpoint_name, [self._delete_action(endpoint_name, doc)])
+
+    def flush(self):
+        """Write all buffered changes.
+
+        :return list: errors of this flush
+        """
+        created, indexed, reindexed, removed = self._created, self._indexed, self._reindexed, self._removed
+        self._reset()
+        errors = []
+
+        for endpoint_name, docs in created.items():
+            failed_ids = self._insert(endpoint_name, docs, errors)
+            # don't index what's not in mongo
+            if failed_ids and endpoint_name in indexed:
+                indexed[endpoint_name] = [action for action in indexed[endpoint_name]
+                                          if action.get(config.ID_FIELD) not in failed_ids]
+
+        endpoints = set(indexed) | set(reindexed) | set(removed)
+        for endpoint_name in endpoints:
+            search_backend = self.backend._lookup_backend(endpoint_name)
+            actions = [dict(doc) for doc in indexed.get(endpoint_name, [])]
+            if reindexed.get(endpoint_name) and search_backend:
+                actions.extend(self._get_reindex_actions(endpoint_name, reindexed[endpoint_name], errors))
+            removed_ids = [doc[config.ID_FIELD] for doc in removed.get(endpoint_name, [])]
+            if search_backend:
+                actions.extend(self._delete_action(endpoint_name, doc) for doc in removed.get(endpoint_name, []))
+                failed_ids = self._bulk_search(endpoint_name, search_backend, actions, errors)
+                mirror_actions(endpoint_name, actions)
+                removed_ids = [_id for _id in removed_ids if _id not in failed_ids]
+            if removed_ids:
+                self.backend._backend(endpoint_name).remove(endpoint_name, {config.ID_FIELD: {'$in': removed_ids}})
+                logger.info("Removed {} documents from {}.".format(len(removed_ids), endpoint_name))
+
+        self.errors.extend(errors)
+        return errors
+
+    def _insert(self, endpoint_name, docs, errors):
+        """Run unordered mongo insert, returns set of ids which failed."""
+        mongo = self.backend._backend(endpoint_name)
+        collection = mongo.pymongo(endpoint_name).db[self.backend._datasource(endpoint_name)]
+        try:
+            collection.insert_many(docs, ordered=False)
+        except BulkWriteError as ex:
+            failed_ids = set()
+            for write_error in ex.details.get('writeErrors', []):
+                _id = write_error.get('op', {}).get(config.ID_FIELD)
+                failed_ids.add(_id)
+                errors.append(self._error(endpoint_name, _id, 'create', write_error.get('errmsg')))
+            return failed_ids
+        except Exception as ex:
+            errors.extend(self._error(endpoint_name, doc.get(config.ID_FIELD), 'create', ex) for doc in docs)
+            return {doc.get(config.ID_FIELD) for doc in docs}
+        return set()
+
+    def _get_reindex_actions(self, endpoint_name, ids, errors):
+        ids = list(set(ids))
+        lookup = {config.ID_FIELD: {'$in': ids}}
+        docs = {doc[config.ID_FIELD]: doc for doc in
+                self.backend.get_from_mongo(endpoint_name, req=ParsedRequest(), lookup=lookup)}
+        for _id in ids:
+            doc = docs.get(_id)
+            if doc:
+                doc.pop('_type', None)
+                yield doc
+            else:  # there is no doc in mongo, remove it from elastic
+                logger.warn("Item is missing in mongo resource={} id={}".format(endpoint_name, _id))
+                errors.append(self._error(endpoint_name, _id, 'update', 'missing in mongo'))
+                yield {'_op_type': 'delete', config.ID_FIELD: _id}
+
+    def _bulk_search(self, endpoint_name, search_backend, actions, errors):
+        """Run elastic bulk request, returns set of ids which failed."""
+        if not actions:
+            return set()
+        failed_ids = set()
+        _, bulk_errors = search_backend.bulk_insert(endpoint_name, actions, raise_on_error=False)
+        for bulk_error in bulk_errors:
+            action, info = next(iter(bulk_error.items()))
+            if action == 'delete' and info.get('status') == 404:
+                logger.warning('item missing from elastic _id=%s' % (info.get(config.ID_FIELD), ))
+                continue
+            failed_ids.add(info.get(config.ID_FIELD))
+            errors.append(self._error(endpoint_name, info.get(config.ID_FIELD), action, info.get('error')))
+        return failed_ids
+
+    def _delete_action(self, endpoint_name, doc):
+        action = {'_op_type': 'delete', config.ID_FIELD: doc.get(config.ID_FIELD)}
+        parent = self.backend._get_parent(endpoint_name, doc)
+        if parent:
+            action['_parent'] = parent
+        return action
+
+    def _error(self, endpoint_name, _id, action, error):
+        logger.error('Bulk {} failed resource={} id={} error={}'.format(action, endpoint_name, _id, error))
+        return {'resource': endpoint_name, config.ID_FIELD: _id, 'action': action, 'error': str(error)}
 
 
 class EveBackend():
     """Superdesk data backend, handles mongodb/elastic data storage."""
 
+    _local = threading.local()
+
+    @contextmanager
+    def bulk(self, batch_size=BULK_BATCH_SIZE):
+        """Buffer writes done in current thread and flush those using bulk apis.
+
+        Usage::
+
+            with get_backend().bulk() as bulk:
+                service.post(docs)
+                service.delete_action(lookup)
+            errors = bulk.errors
+
+        Nested calls use the outer writer.
+
+        :param batch_size: number of buffered writes triggering a flush
+        """
+        writer = self._get_bulk()
+        if writer is not None:
+            yield writer
+            return
+        writer = self._local.bulk = BulkWriter(self, batch_size)
+        try:
+            yield writer
+        finally:
+            self._local.bulk = None
+            writer.flush()
+
+    def _get_bulk(self):
+        return getattr(self._local, 'bulk', None)
+
     def find_one(self, endpoint_name, req, **lookup):
         """Find single item.
 
+        By default it reads both mongo and elastic and repairs elastic if those differ,
+        with ``BACKEND_FIND_ONE_CONSISTENCY = 'mongo'`` it only reads mongo and items are
+        verified in background, see :mod:`superdesk.backend_verifier`.
+
         :param endpoint_name: resource name
         :param req: parsed request
         :param lookup: additional filter
         """
         backend = self._backend(endpoint_name)
         item = backend.find_one(endpoint_name, req=req, **lookup)
+        if app.config.get('BACKEND_FIND_ONE_CONSISTENCY') == 'mongo':
+            if self._lookup_backend(endpoint_name):
+                sample_item(endpoint_name, item[config.ID_FIELD] if item else lookup.get(config.ID_FIELD))
+            return item
         search_backend = self._lookup_backend(endpoint_name, fallback=True)
         if search_backend:
             # set the parent for the parent child in elastic search
@@ -46,6 +244,7 @@ class EveBackend():
                 try:
                     logger.info(item_msg('trying to add item to elastic', item))
                     search_backend.insert(endpoint_name, [item])
+                    mirror_actions(endpoint_name, [item])
                 except RequestError as e:
                     logger.error(item_msg('failed to add item into elastic error={}'.format(str(e)), item))
         return item
@@ -142,6 +341,10 @@ class EveBackend():
             if not doc.get(config.ETAG):
                 doc[config.ETAG] = document_etag(doc)
 
+        bulk = self._get_bulk()
+        if bulk is not None:
+            return bulk.create(endpoint_name, docs)
+
         backend = self._backend(endpoint_name)
         ids = backend.insert(endpoint_name, docs)
         return ids
@@ -154,7 +357,12 @@ class EveBackend():
         """
         search_backend = self._lookup_backend(endpoint_name)
         if search_backend:
+            bulk = self._get_bulk()
+            if bulk is not None:
+                bulk.index(endpoint_name, docs)
+                return
             search_backend.insert(endpoint_name, docs, **kwargs)
+            mirror_actions(endpoint_name, docs)
 
     def update(self, endpoint_name, id, updates, original):
         """Update document with given id.
@@ -210,6 +418,10 @@ class EveBackend():
                 return updates
 
         if search_backend:
+            bulk = self._get_bulk()
+            if bulk is not None:
+                bulk.reindex(endpoint_name, id)
+                return updates
 
             doc = backend.find_one(endpoint_name, req=None, _id=id)
             if not doc:  # there is no doc in mongo, remove it from elastic
@@ -219,6 +431,7 @@ class EveBackend():
                     self.remove_from_search(endpoint_name, item)
                 raise SuperdeskApiError.notFoundError()
             search_backend.update(endpoint_name, id, doc)
+            mirror_actions(endpoint_name, [dict(doc, **{config.ID_FIELD: id})])
 
         return updates
 
@@ -276,7 +489,15 @@ class EveBackend():
         """
         search_backend = self._lookup_backend(endpoint_name)
         if search_backend is not None:
+            bulk = self._get_bulk()
+            if bulk is not None:
+                doc = dict(document)
+                doc[config.ID_FIELD] = id
+                doc.pop('_type', None)
+                bulk.index(endpoint_name, [doc])
+                return
             search_backend.replace(endpoint_name, id, document)
+            mirror_actions(endpoint_name, [dict(document, **{config.ID_FIELD: id})])
 
     def delete(self, endpoint_name, lookup):
         """Delete method to delete by using mongo query syntax.
@@ -291,6 +512,10 @@ class EveBackend():
         ids = [doc[config.ID_FIELD] for doc in docs]
         removed_ids = ids
         logger.info("total documents to be removed {}".format(len(ids)))
+        bulk = self._get_bulk()
+        if bulk is not None:
+            bulk.remove(endpoint_name, docs)
+            return
         if search_backend and ids:
             removed_ids = []
             # first remove it from search backend, so it won't show up. when this is done - remove it from mongo
@@ -327,10 +552,17 @@ class EveBackend():
         :param endpoint_name
         :param dict doc: Document to delete
         """
+        bulk = self._get_bulk()
+        if bulk is not None:
+            bulk.remove_from_search(endpoint_name, doc)
+            return
         search_backend = app.data._search_backend(endpoint_name)
-        search_backend.remove(endpoint_name,
-                              {'_id': doc.get(config.ID_FIELD)},
-                              search_backend.get_parent_id(endpoint_name, doc))
+        parent = search_backend.get_parent_id(endpoint_name, doc)
+        search_backend.remove(endpoint_name, {'_id': doc.get(config.ID_FIELD)}, parent)
+        action = {'_op_type': 'delete', config.ID_FIELD: doc.get(config.ID_FIELD)}
+        if parent:
+            action['_parent'] = parent
+        mirror_actions(endpoint_name, [action])
 
     def _datasource(self, endpoint_name):
         return app.data.datasource(endpoint_name)[0]
@@ -350,6 +582,11 @@ class EveBackend():
         doc.setdefault(config.DATE_CREATED, now)
         doc.setdefault(config.LAST_UPDATED, now)
 
+    def _get_parent(self, endpoint_name, doc):
+        search_backend = self._lookup_backend(endpoint_name)
+        if search_backend:
+            return search_backend.get_parent_id(endpoint_name, doc)
+
     def _set_parent(self, endpoint_name, doc, lookup):
         """Set the parent id for parent child document in elastic"""
         search_backend = self._lookup_backend(endpoint_name)
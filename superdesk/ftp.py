@@ -14,6 +14,16 @@ def ftp_connect(config):
 
     use with `with`
 
+    :param config: dict with `host`, `username`, `password`, `path` and `passive`
+    """
+    ftp = ftp_open(config)
+    yield ftp
+    ftp.close()
+
+
+def ftp_open(config):
+    """Open ftp connection for given config, caller must close it.
+
     :param config: dict with `host`, `username`, `password`, `path` and `passive`
     """
     try:
@@ -29,5 +39,4 @@ def ftp_connect(config):
         ftp.cwd(config.get('path', '').lstrip('/'))
     if config.get('passive') is False:  # only set this when not active, it's passive by default
         ftp.set_pasv(False)
-    yield ftp
-    ftp.close()
+    return ftp
@@ -261,6 +261,10 @@ def update_provider(provider, rule_set=None, routing_scheme=None, sync=False):
         if sync:
             provider[LAST_UPDATED] = utcnow() - timedelta(days=9999) # import everything again
 
+        if routing_scheme:
+            # compile once so filters are fetched and parsed only once per run
+            routing_scheme = superdesk.get_resource_service('routing_schemes').compile_routing_scheme(routing_scheme)
+
         for items in feeding_service.update(provider, update):
             ingest_items(items, provider, feeding_service, rule_set, routing_scheme)
             if items:
@@ -429,47 +433,117 @@ def ingest_cancel(item, feeding_service):
         ingest_service.patch(relative['_id'], update)
 
 
+class IngestBatch():
+    """Shared state of items ingested together.
+
+    Existing items with guids of ingested items and their associations are fetched using
+    single query, new items are written using bulk backend writer and routing is applied
+    once all items are written.
+
+    :param ingest_service: ingest service
+    :param items: items to be ingested
+    """
+
+    def __init__(self, ingest_service, items):
+        self.writer = None
+        self.items = {}
+        self.created = {}
+        self.routing = []
+        self._pending = set()
+
+        guids = set()
+        for item in items:
+            guids.add(item[GUID_FIELD])
+            guids.update(assoc['guid'] for assoc in (item.get('associations') or {}).values()
+                         if assoc and assoc.get('guid'))
+        if guids:
+            for doc in ingest_service.get_from_mongo(req=None, lookup={GUID_FIELD: {'$in': list(guids)}}):
+                self.items.setdefault(doc[GUID_FIELD], doc)
+
+    def find(self, guid):
+        """Find existing item by guid.
+
+        :param guid: item guid
+        """
+        item = self.items.get(guid)
+        if item is not None and guid in self._pending:
+            # item with same guid is ingested again within batch, it must be saved before update
+            self.writer.flush()
+            self._pending.clear()
+        return item
+
+    def add(self, item):
+        """Register item created within batch.
+
+        :param item: created item
+        """
+        self.items[item[GUID_FIELD]] = item
+        self.created[item[superdesk.config.ID_FIELD]] = item[GUID_FIELD]
+        self._pending.add(item[GUID_FIELD])
+
+    def route(self, item, routing_scheme):
+        """Apply routing scheme once item is saved.
+
+        :param item: ingested item
+        :param routing_scheme: routing scheme
+        """
+        self.routing.append((item[superdesk.config.ID_FIELD], routing_scheme))
+
+
 def ingest_items(items, provider, feeding_service, rule_set=None, routing_scheme=None):
     all_items = filter_expired_items(provider, items)
     items_dict = {doc[GUID_FIELD]: doc for doc in all_items}
     items_in_package = []
     failed_items = set()
     created_ids = []
+    ingest_collection = feeding_service.service if hasattr(feeding_service, 'service') else 'ingest'
+    ingest_service = superdesk.get_resource_service(ingest_collection)
+    batch = IngestBatch(ingest_service, all_items)
     for item in [doc for doc in all_items if doc.get(ITEM_TYPE) == CONTENT_TYPE.COMPOSITE]:
         items_in_package = [ref['residRef'] for group in item.get('groups', [])
                             for ref in group.get('refs', []) if 'residRef' in ref]
 
-    for item in [doc for doc in all_items if doc.get(ITEM_TYPE) != CONTENT_TYPE.COMPOSITE]:
-        ingested, ids = ingest_item(item, provider, feeding_service, rule_set,
-                                    routing_scheme=routing_scheme if not item[GUID_FIELD] in items_in_package else None)
-        if ingested:
-            created_ids = created_ids + ids
-        else:
-            failed_items.add(item[GUID_FIELD])
-    for item in [doc for doc in all_items if doc.get(ITEM_TYPE) == CONTENT_TYPE.COMPOSITE]:
-        for ref in [ref for group in item.get('groups', [])
-                    for ref in group.get('refs', []) if 'residRef' in ref]:
-            if ref['residRef'] in failed_items:
+    with superdesk.get_backend().bulk() as writer:
+        batch.writer = writer
+        for item in [doc for doc in all_items if doc.get(ITEM_TYPE) != CONTENT_TYPE.COMPOSITE]:
+            ingested, ids = ingest_item(item, provider, feeding_service, rule_set,
+                                        routing_scheme=routing_scheme if not item[GUID_FIELD] in items_in_package
+                                        else None, batch=batch)
+            if ingested:
+                created_ids = created_ids + ids
+            else:
                 failed_items.add(item[GUID_FIELD])
+        for item in [doc for doc in all_items if doc.get(ITEM_TYPE) == CONTENT_TYPE.COMPOSITE]:
+            for ref in [ref for group in item.get('groups', [])
+                        for ref in group.get('refs', []) if 'residRef' in ref]:
+                if ref['residRef'] in failed_items:
+                    failed_items.add(item[GUID_FIELD])
+                    continue
+
+                ref.setdefault('location', 'ingest')
+                itemRendition = items_dict.get(ref['residRef'], {}).get('renditions')
+                if itemRendition:
+                    ref.setdefault('renditions', itemRendition)
+                ref[GUID_FIELD] = ref['residRef']
+                if items_dict.get(ref['residRef']):
+                    ref['residRef'] = items_dict.get(ref['residRef'], {}).get(superdesk.config.ID_FIELD)
+            if item[GUID_FIELD] in failed_items:
                 continue
+            ingested, ids = ingest_item(item, provider, feeding_service, rule_set, routing_scheme, batch=batch)
+            if ingested:
+                created_ids = created_ids + ids
+            else:
+                failed_items.add(item[GUID_FIELD])
+    batch.writer = None
+
+    if writer.errors:
+        failed_ids = {error[superdesk.config.ID_FIELD] for error in writer.errors}
+        failed_items.update(batch.created[_id] for _id in failed_ids if _id in batch.created)
+        created_ids = [_id for _id in created_ids if _id not in failed_ids]
+
+    apply_batch_routing(batch, ingest_service, provider, failed_items)
 
-            ref.setdefault('location', 'ingest')
-            itemRendition = items_dict.get(ref['residRef'], {}).get('renditions')
-            if itemRendition:
-                ref.setdefault('renditions', itemRendition)
-            ref[GUID_FIELD] = ref['residRef']
-            if items_dict.get(ref['residRef']):
-                ref['residRef'] = items_dict.get(ref['residRef'], {}).get(superdesk.config.ID_FIELD)
-        if item[GUID_FIELD] in failed_items:
-            continue
-        ingested, ids = ingest_item(item, provider, feeding_service, rule_set, routing_scheme)
-        if ingested:
-            created_ids = created_ids + ids
-        else:
-            failed_items.add(item[GUID_FIELD])
     # sync mongo with ingest after all changes
-    ingest_collection = feeding_service.service if hasattr(feeding_service, 'service') else 'ingest'
-    ingest_service = superdesk.get_resource_service(ingest_collection)
     updated_items = ingest_service.find({'_id': {'$in': created_ids}}, max_results=len(created_ids))
     app.data._search_backend(ingest_collection).bulk_insert(ingest_collection, list(updated_items))
     if failed_items:
@@ -477,14 +551,39 @@ def ingest_items(items, provider, feeding_service, rule_set=None, routing_scheme
     return failed_items
 
 
-def ingest_item(item, provider, feeding_service, rule_set=None, routing_scheme=None):
+def apply_batch_routing(batch, ingest_service, provider, failed_items):
+    """Apply routing schemes to items ingested in batch.
+
+    :param batch: ingest batch
+    :param ingest_service: ingest service
+    :param provider: ingest provider
+    :param failed_items: guids of failed items, items failing routing are added
+    """
+    if not batch.routing:
+        return
+    routing_schemes = dict(batch.routing)
+    routed_items = ingest_service.find({'_id': {'$in': list(routing_schemes)}}, max_results=len(routing_schemes))
+    schemes = {}
+    for routed in routed_items:
+        scheme = routing_schemes[routed[superdesk.config.ID_FIELD]]
+        schemes.setdefault(id(scheme), (scheme, []))[1].append(routed)
+    routing_service = superdesk.get_resource_service('routing_schemes')
+    for scheme, items in schemes.values():
+        failed = routing_service.apply_routing_scheme_to_items(items, provider, scheme)
+        failed_items.update(item[GUID_FIELD] for item in failed)
+
+
+def ingest_item(item, provider, feeding_service, rule_set=None, routing_scheme=None, batch=None):
     items_ids = []
     try:
         ingest_collection = feeding_service.service if hasattr(feeding_service, 'service') else 'ingest'
         ingest_service = superdesk.get_resource_service(ingest_collection)
 
         # determine if we already have this item
-        old_item = ingest_service.find_one(guid=item[GUID_FIELD], req=None)
+        if batch is not None:
+            old_item = batch.find(item[GUID_FIELD])
+        else:
+            old_item = ingest_service.find_one(guid=item[GUID_FIELD], req=None)
 
         if not old_item:
             item.setdefault(superdesk.config.ID_FIELD, generate_guid(type=GUID_NEWSML))
@@ -528,16 +627,18 @@ def ingest_item(item, provider, feeding_service, rule_set=None, routing_scheme=N
             # wire up the id of the associated feature media to the ingested one
             guid = assoc.get('guid')
             if guid:
-                lookup = {'guid': guid}
-                ingested = ingest_service.get_from_mongo(req=None, lookup=lookup)
-                if ingested.count() >= 1:
-                    assoc['_id'] = ingested[0]['_id']
-                    for rendition in ingested[0].get('renditions', {}):  # add missing renditions
+                if batch is not None:
+                    ingested = batch.find(guid)
+                else:
+                    ingested = next(iter(ingest_service.get_from_mongo(req=None, lookup={'guid': guid})), None)
+                if ingested:
+                    assoc['_id'] = ingested['_id']
+                    for rendition in ingested.get('renditions', {}):  # add missing renditions
                         assoc['renditions'].setdefault(
                             rendition,
-                            ingested[0]['renditions'][rendition])
+                            ingested['renditions'][rendition])
                 else:  # there is no such item in the system - ingest it
-                    status, ids = ingest_item(assoc, provider, feeding_service, rule_set)
+                    status, ids = ingest_item(assoc, provider, feeding_service, rule_set, batch=batch)
                     if status:
                         assoc['_id'] = ids[0]
                         items_ids.extend(ids)
@@ -549,6 +650,8 @@ def ingest_item(item, provider, feeding_service, rule_set=None, routing_scheme=N
             item.update(old_item)
             item.update(updates)
             items_ids.append(item['_id'])
+            if batch is not None:
+                batch.items[item[GUID_FIELD]] = item
             # if the feed is versioned and this is not a new version
             if 'version' in item and 'version' in old_item and item.get('version') == old_item.get('version'):
                 new_version = False
@@ -557,12 +660,18 @@ def ingest_item(item, provider, feeding_service, rule_set=None, routing_scheme=N
                 ingest_service.set_ingest_provider_sequence(item, provider)
             try:
                 items_ids.extend(ingest_service.post_in_mongo([item]))
+                if batch is not None:
+                    batch.add(item)
             except HTTPException as e:
                 logger.error('Exception while persisting item in %s collection: %s', ingest_collection, e)
 
         if routing_scheme and new_version:
-            routed = ingest_service.find_one(_id=item[superdesk.config.ID_FIELD], req=None)
-            superdesk.get_resource_service('routing_schemes').apply_routing_scheme(routed, provider, routing_scheme)
+            if batch is not None:
+                batch.route(item, routing_scheme)
+            else:
+                routed = ingest_service.find_one(_id=item[superdesk.config.ID_FIELD], req=None)
+                superdesk.get_resource_service('routing_schemes').apply_routing_scheme(routed, provider,
+                                                                                       routing_scheme)
 
     except Exception as ex:
         logger.exception(ex)
@@ -12,8 +12,12 @@
 import os
 import ftplib
 import logging
+import itertools
 import tempfile
+import threading
 
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 
 from flask import current_app as app
@@ -23,7 +27,7 @@ from superdesk.utc import utc
 from superdesk.etree import etree
 from superdesk.io.feeding_services import FeedingService
 from superdesk.errors import IngestFtpError
-from superdesk.ftp import ftp_connect
+from superdesk.ftp import ftp_connect, ftp_open
 
 try:
     from urllib.parse import urlparse
@@ -211,9 +215,16 @@ class FTPFeedingService(FeedingService):
         self._log_msg("Sort {} files. Exec time: {:.4f} secs.".format(len(files), self._timer.stop('sort_files')))
         return files
 
-    def _retrieve_and_parse(self, ftp, config, filename, provider, registered_parser):
-        self._timer.start('retrieve_parse')
-        items = []
+    def _retrieve(self, ftp, config, filename):
+        """Download file into local ``dest_path``.
+
+        :param ftp: FTP instance to use
+        :param config: provider config
+        :param filename: name of the file to download
+        :return str: local file path
+        """
+        timer_key = 'retrieve_{}'.format(filename)
+        self._timer.start(timer_key)
 
         if 'dest_path' not in config:
             config['dest_path'] = tempfile.mkdtemp(prefix='superdesk_ingest_')
@@ -224,7 +235,7 @@ class FTPFeedingService(FeedingService):
                 ftp.retrbinary('RETR %s' % filename, f.write)
                 self._log_msg(
                     "Download finished. Exec time: {:.4f} secs. Size: {} bytes. File: {}.".format(
-                        self._timer.split('retrieve_parse'),
+                        self._timer.stop(timer_key),
                         os.path.getsize(local_file_path),
                         filename
                     )
@@ -232,7 +243,7 @@ class FTPFeedingService(FeedingService):
             except ftplib.all_errors:
                 self._log_msg(
                     "Download failed. Exec time: {:.4f} secs. File: {}.".format(
-                        self._timer.stop('retrieve_parse'),
+                        self._timer.stop(timer_key),
                         filename
                     )
                 )
@@ -240,6 +251,20 @@ class FTPFeedingService(FeedingService):
                 raise Exception('Exception retrieving file from FTP server ({filename})'.format(
                                 filename=filename))
 
+        return local_file_path
+
+    def _parse(self, local_file_path, filename, provider, registered_parser):
+        """Parse downloaded file.
+
+        :param local_file_path: path of downloaded file
+        :param filename: name of the file on FTP server
+        :param provider: ingest provider
+        :param registered_parser: feed parser registered for provider
+        :return list: list with parsed items
+        """
+        timer_key = 'parse_{}'.format(filename)
+        self._timer.start(timer_key)
+
         if isinstance(registered_parser, XMLFeedParser):
             xml = etree.parse(local_file_path).getroot()
             parser = self.get_feed_parser(provider, xml)
@@ -250,7 +275,7 @@ class FTPFeedingService(FeedingService):
 
         self._log_msg(
             "Parsing finished. Exec time: {:.4f} secs. File: {}.".format(
-                self._timer.stop('retrieve_parse'),
+                self._timer.stop(timer_key),
                 filename
             )
         )
@@ -258,8 +283,96 @@ class FTPFeedingService(FeedingService):
         if isinstance(parsed, dict):
             parsed = [parsed]
 
-        items.append(parsed)
-        return items
+        return [parsed]
+
+    def _retrieve_and_parse(self, ftp, config, filename, provider, registered_parser):
+        local_file_path = self._retrieve(ftp, config, filename)
+        return self._parse(local_file_path, filename, provider, registered_parser)
+
+    def _process_files(self, ftp, config, files_to_process, provider, registered_parser):
+        """Retrieve and parse files one by one using given FTP connection.
+
+        Yields ``(filename, file_modify, items, error)`` for every file in order.
+        """
+        for filename, file_modify in files_to_process:
+            try:
+                yield filename, file_modify, self._retrieve_and_parse(ftp, config, filename, provider,
+                                                                      registered_parser), None
+            except Exception as e:
+                yield filename, file_modify, None, e
+
+    def _process_files_concurrently(self, config, files_to_process, provider, registered_parser, sessions):
+        """Retrieve files using ``sessions`` parallel FTP connections and parse them using worker pool.
+
+        Number of files retrieved ahead is limited, results are yielded in the same order
+        as files are listed so ``last_processed_file_modify`` can be updated only after all previous
+        files are done. Yields ``(filename, file_modify, items, error)`` for every file.
+        """
+        flask_app = app._get_current_object()
+        parse_workers = max(1, app.config.get('FTP_INGEST_PARSE_WORKERS', 2))
+        window = sessions + parse_workers
+        local = threading.local()
+        connections = []
+        connections_lock = threading.Lock()
+
+        def retrieve(filename):
+            with flask_app.app_context():
+                if getattr(local, 'ftp', None) is None:
+                    local.ftp = ftp_open(config)
+                    with connections_lock:
+                        connections.append(local.ftp)
+                try:
+                    return self._retrieve(local.ftp, config, filename)
+                except Exception:
+                    # connection might be broken, open new one for next file
+                    local.ftp = None
+                    raise
+
+        def parse(local_file_path, filename):
+            with flask_app.app_context():
+                return self._parse(local_file_path, filename, provider, registered_parser)
+
+        def submit(filename):
+            result = Future()
+
+            def on_parsed(future):
+                try:
+                    result.set_result(future.result())
+                except Exception as ex:
+                    result.set_exception(ex)
+
+            def on_retrieved(future):
+                try:
+                    parse_pool.submit(parse, future.result(), filename).add_done_callback(on_parsed)
+                except Exception as ex:
+                    result.set_exception(ex)
+
+            retrieve_pool.submit(retrieve, filename).add_done_callback(on_retrieved)
+            return result
+
+        files = iter(files_to_process)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=parse_workers) as parse_pool, \
+                ThreadPoolExecutor(max_workers=sessions) as retrieve_pool:
+            try:
+                for filename, file_modify in itertools.islice(files, window):
+                    pending.append((filename, file_modify, submit(filename)))
+                while pending:
+                    filename, file_modify, result = pending.popleft()
+                    try:
+                        items, error = result.result(), None
+                    except Exception as e:
+                        items, error = None, e
+                    for next_filename, next_file_modify in itertools.islice(files, 1):
+                        pending.append((next_filename, next_file_modify, submit(next_filename)))
+                    yield filename, file_modify, items, error
+            finally:
+                retrieve_pool.shutdown(wait=True)
+                for connection in connections:
+                    try:
+                        connection.close()
+                    except ftplib.all_errors:
+                        pass
 
     def _update(self, provider, update):
         config = provider.get('config', {})
@@ -318,16 +431,23 @@ class FTPFeedingService(FeedingService):
 
                 # process files
                 self._timer.start('start_processing')
-                for filename, file_modify in files_to_process:
-                    try:
-                        items += self._retrieve_and_parse(ftp, config, filename, provider, registered_parser)
+                sessions = app.config.get('FTP_INGEST_CONCURRENCY', 1)
+                if sessions > 1 and len(files_to_process) > 1:
+                    processed = self._process_files_concurrently(config, files_to_process, provider,
+                                                                 registered_parser, sessions)
+                else:
+                    processed = self._process_files(ftp, config, files_to_process, provider, registered_parser)
+
+                for filename, file_modify, parsed, error in processed:
+                    if error is None:
+                        items += parsed
                         update['private'] = {'last_processed_file_modify': file_modify}
 
                         if do_move:
                             move_dest_file_path = os.path.join(move_path, filename)
                             self._move(ftp, filename, move_dest_file_path)
-                    except Exception as e:
-                        logger.error("Error while parsing {filename}: {msg}".format(filename=filename, msg=e))
+                    else:
+                        logger.error("Error while parsing {filename}: {msg}".format(filename=filename, msg=error))
 
                         if do_move:
                             move_dest_file_path_error = os.path.join(move_path_error, filename)
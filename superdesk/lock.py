@@ -1,7 +1,11 @@
 
 import os
 import re
+import math
+import time
 import socket
+import itertools
+import threading
 
 from mongolock import MongoLock
 from werkzeug.local import LocalProxy
@@ -28,9 +32,146 @@ class SuperdeskMongoLock(MongoLock):
         else:
             return super().release(key, owner)
 
+    def remove_unused(self):
+        return self.collection.delete_many({'$or': [{'_id': re.compile('^item_move'), 'locked': False},
+                                           {'_id': re.compile('^item_lock'), 'locked': False}]}).deleted_count
+
+
+class RedisLock():
+    """Redis lock backend.
+
+    Every successful lock gets a fencing token, which is increasing per key.
+    Waiting for a lock is done using blocking pop on a list which is pushed on release,
+    so there is no polling. Released locks are always removed.
+
+    :param client: redis client
+    """
+
+    prefix = 'lock:'
+
+    _lock_script = """
+        local ok
+        if ARGV[2] == '0' then
+            ok = redis.call('set', KEYS[1], ARGV[1], 'NX')
+        else
+            ok = redis.call('set', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2])
+        end
+        if ok then
+            return redis.call('incr', KEYS[2])
+        end
+        return 0
+    """
+
+    _release_script = """
+        if redis.call('get', KEYS[1]) == ARGV[1] then
+            redis.call('del', KEYS[1])
+            redis.call('lpush', KEYS[2], 1)
+            redis.call('expire', KEYS[2], 10)
+            return 1
+        end
+        return 0
+    """
+
+    _touch_script = """
+        if redis.call('get', KEYS[1]) == ARGV[1] then
+            if ARGV[2] == '0' then
+                return redis.call('persist', KEYS[1])
+            end
+            return redis.call('pexpire', KEYS[1], ARGV[2])
+        end
+        return 0
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def lock(self, key, owner, timeout=None, expire=None):
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            token = self.client.eval(self._lock_script, 2, self._key(key), self._key(key, 'fence'),
+                                     owner, int((expire or 0) * 1000))
+            if token:
+                return token
+            remaining = deadline - time.monotonic() if deadline else 0
+            if remaining <= 0:
+                return False
+            ttl = self.client.pttl(self._key(key))
+            if ttl and ttl > 0:
+                remaining = min(remaining, ttl / 1000)
+            self.client.blpop(self._key(key, 'released'), timeout=max(1, math.ceil(remaining)))
+
+    def release(self, key, owner, remove=False):
+        return self.client.eval(self._release_script, 2, self._key(key), self._key(key, 'released'), owner)
+
+    def touch(self, key, owner, expire=None):
+        return self.client.eval(self._touch_script, 1, self._key(key), owner, int((expire or 0) * 1000))
+
+    def remove_unused(self):
+        return 0
+
+    def _key(self, key, suffix=None):
+        return self.prefix + key + (':' + suffix if suffix else '')
+
+
+class MemoryLock():
+    """In-process lock backend.
+
+    Only usable with single process, eg. for development or tests.
+    Fencing tokens and waiting work like in :class:`RedisLock`.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._tokens = itertools.count(1)
+        self._condition = threading.Condition()
+
+    def lock(self, key, owner, timeout=None, expire=None):
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                current = self._locks.get(key)
+                if current is None or (current[1] and current[1] <= now):
+                    self._locks[key] = (owner, now + expire if expire else None)
+                    return next(self._tokens)
+                remaining = deadline - now if deadline else 0
+                if remaining <= 0:
+                    return False
+                if current[1]:
+                    remaining = min(remaining, current[1] - now)
+                self._condition.wait(remaining)
+
+    def release(self, key, owner, remove=False):
+        with self._condition:
+            current = self._locks.get(key)
+            if current and current[0] == owner:
+                del self._locks[key]
+                self._condition.notify_all()
+                return 1
+            return 0
+
+    def touch(self, key, owner, expire=None):
+        with self._condition:
+            current = self._locks.get(key)
+            if current and current[0] == owner:
+                self._locks[key] = (owner, time.monotonic() + expire if expire else None)
+                return 1
+            return 0
+
+    def remove_unused(self):
+        return 0
+
+
+_memory_lock = MemoryLock()
+
 
 def _get_lock():
-    """Get mongolock instance using app mongodb."""
+    """Get lock backend configured via ``LOCK_BACKEND``."""
+    backend = app.config.get('LOCK_BACKEND', 'mongo')
+    if backend == 'redis':
+        return RedisLock(app.redis)
+    elif backend == 'memory':
+        return _memory_lock
     app.register_resource('_lock', _lock_resource_settings)  # setup dummy resource for locks
     return SuperdeskMongoLock(client=app.data.mongo.pymongo('_lock').db)
 
@@ -49,6 +190,8 @@ def lock(task, host=None, expire=300, timeout=None):
     :param host: current host id
     :param expire: lock ttl in seconds
     :param timeout: how long should it wait if task is locked
+    :return: falsy value if task is locked already, otherwise ``True`` for mongo backend
+             or fencing token for redis and memory backends
     """
     if not host:
         host = get_host()
@@ -75,11 +218,25 @@ def unlock(task, host=None, remove=False):
     return _lock.release(task, host, remove)
 
 
+def touch(task, host=None, expire=300):
+    """Renew lock ttl, so long running task can keep its lock.
+
+    Lock can be only renewed by host which locked it.
+
+    :param task: task name
+    :param host: current host id
+    :param expire: new lock ttl in seconds
+    """
+    if not host:
+        host = get_host()
+    logger.debug('renewing lock task=%s host=%s' % (task, host))
+    return _lock.touch(task, host, expire=expire)
+
+
 def remove_locks():
     """
     Removes item related locks that are not in use
     :return:
     """
-    result = _lock.collection.delete_many({'$or': [{'_id': re.compile('^item_move'), 'locked': False},
-                                          {'_id': re.compile('^item_lock'), 'locked': False}]})
-    logger.info('unused item locks deleted count={}'.format(result.deleted_count))
+    count = _lock.remove_unused()
+    logger.info('unused item locks deleted count={}'.format(count))
@@ -10,6 +10,7 @@
 
 from .media_references import MediaReferencesResource
 from .media_editor import MediaEditorService, MediaEditorResource
+from .rendition_cache import RenditionCacheService, RenditionCacheResource
 from superdesk.services import BaseService
 import superdesk
 
@@ -22,3 +23,7 @@ def init_app(app):
     endpoint_name = 'media_editor'
     service = MediaEditorService(endpoint_name, backend=superdesk.get_backend())
     MediaEditorResource(endpoint_name, app=app, service=service)
+
+    endpoint_name = 'rendition_cache'
+    service = RenditionCacheService(endpoint_name, backend=superdesk.get_backend())
+    RenditionCacheResource(endpoint_name, app=app, service=service)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""HTTP range requests support for media files.
+
+Media storages can implement ``open`` returning media file without fetching its content
+and ``read_range`` returning iterator of bytes for given range of media file,
+storages without those use ``get`` and :func:`read_file_range`.
+"""
+
+import uuid
+
+from flask import request, current_app as app
+from werkzeug.http import parse_range_header, http_date
+from werkzeug.wsgi import wrap_file
+
+BUFFER_SIZE = 1024 * 256
+
+
+def read_file_range(media_file, start, end, buffer_size=BUFFER_SIZE):
+    """Read range of seekable file.
+
+    :param media_file: file like object
+    :param int start: first byte position
+    :param int end: last byte position (inclusive)
+    :param int buffer_size: max size of yielded chunks
+    """
+    media_file.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        data = media_file.read(min(buffer_size, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+        yield data
+
+
+def get_media_file(media_id, resource):
+    """Get media file for request, only file info is fetched for satisfiable range requests.
+
+    :param media_id: media id
+    :param resource: resource name
+    """
+    if request.headers.get('Range') and hasattr(app.media, 'open'):
+        media_file = app.media.open(media_id, resource)
+        if media_file is None or get_ranges(media_file) is not None:
+            return media_file
+    return app.media.get(media_id, resource)
+
+
+def read_range(media_file, start, end):
+    """Read range of media file using media storage if it supports it.
+
+    :param media_file: media file
+    :param int start: first byte position
+    :param int end: last byte position (inclusive)
+    """
+    if hasattr(app.media, 'read_range'):
+        return app.media.read_range(media_file, start, end)
+    return read_file_range(media_file, start, end)
+
+
+def get_ranges(media_file):
+    """Get list of requested ranges for media file.
+
+    :param media_file: media file
+    :return: ``None`` if whole file should be sent, list of ``(start, end)`` tuples otherwise,
+             empty if ranges are not satisfiable
+    """
+    header = request.headers.get('Range')
+    if not header or not _is_if_range_valid(media_file):
+        return None
+    parsed = parse_range_header(header)
+    if parsed is None or parsed.units != 'bytes':
+        return None
+    length = media_file.length
+    ranges = []
+    for start, stop in parsed.ranges:
+        if start < 0:  # suffix range
+            start = max(0, length + start)
+            stop = length
+        elif stop is None or stop > length:
+            stop = length
+        if start < stop:
+            ranges.append((start, stop - 1))
+    return ranges
+
+
+def _is_if_range_valid(media_file):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range.strip('"') == media_file.md5
+    return media_file.upload_date is not None and if_range == http_date(media_file.upload_date)
+
+
+def get_media_response(media_file, disposition='inline', cache_for=None):
+    """Get response for media file, with support for single and multiple byte ranges.
+
+    :param media_file: media file from media storage
+    :param disposition: content disposition header
+    :param int cache_for: number of seconds response can be cached for
+    """
+    ranges = get_ranges(media_file)
+    if ranges is None:
+        body = wrap_file(request.environ, media_file, buffer_size=BUFFER_SIZE)
+        response = app.response_class(body, mimetype=media_file.content_type, direct_passthrough=True)
+        response.content_length = media_file.length
+    elif not ranges:
+        response = app.response_class(status=416)
+        response.headers['Content-Range'] = 'bytes */{}'.format(media_file.length)
+        return response
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        body = read_range(media_file, start, end)
+        response = app.response_class(body, status=206, mimetype=media_file.content_type, direct_passthrough=True)
+        response.content_length = end - start + 1
+        response.headers['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, media_file.length)
+    else:
+        boundary = uuid.uuid4().hex
+        parts = [(_get_part_header(boundary, media_file, start, end), start, end) for start, end in ranges]
+        closing = '\r\n--{}--\r\n'.format(boundary).encode('ascii')
+        body = _get_multipart_body(media_file, parts, closing)
+        response = app.response_class(body, status=206,
+                                      mimetype='multipart/byteranges; boundary={}'.format(boundary),
+                                      direct_passthrough=True)
+        response.content_length = sum(len(header) + end - start + 1 for header, start, end in parts) + len(closing)
+
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.last_modified = media_file.upload_date
+    if media_file.md5:
+        response.set_etag(media_file.md5)
+    if cache_for:
+        response.cache_control.max_age = cache_for
+        response.cache_control.s_max_age = cache_for
+        response.cache_control.public = True
+    response.make_conditional(request)
+    response.headers['Content-Disposition'] = disposition
+    return response
+
+
+def _get_part_header(boundary, media_file, start, end):
+    return '\r\n--{}\r\nContent-Type: {}\r\nContent-Range: bytes {}-{}/{}\r\n\r\n'.format(
+        boundary, media_file.content_type, start, end, media_file.length).encode('ascii')
+
+
+def _get_multipart_body(media_file, parts, closing):
+    for header, start, end in parts:
+        yield header
+        yield from read_range(media_file, start, end)
+    yield closing
@@ -0,0 +1,115 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+import hmac
+import logging
+
+from io import BytesIO
+from flask import current_app as app
+from superdesk.resource import Resource
+from superdesk.services import BaseService
+from superdesk.utc import utcnow
+from .image import fix_orientation
+from .renditions import render_renditions, get_lazy_rendition_key, get_lazy_rendition_signature
+
+logger = logging.getLogger(__name__)
+
+
+class RenditionCacheResource(Resource):
+    schema = {
+        # key of lazy rendition, see :func:`get_lazy_rendition_key`
+        'key': {
+            'type': 'string',
+            'required': True,
+        },
+        # media of rendered rendition
+        'media': {
+            'type': 'string',
+        },
+        'size': {
+            'type': 'integer',
+        },
+        'last_used': {
+            'type': 'datetime',
+        },
+    }
+    internal_resource = True
+    mongo_indexes = {
+        'key_1': ([('key', 1)], {'unique': True}),
+        'last_used_1': [('last_used', 1)],
+    }
+
+
+class RenditionCacheService(BaseService):
+    """Renders lazy renditions and keeps them in media storage.
+
+    Total size of stored renditions is limited by ``RENDITIONS_CACHE_MAX_SIZE``,
+    least recently used ones are removed first when it's exceeded.
+    """
+
+    def is_valid(self, lazy, signature):
+        """Test if lazy rendition signature is valid.
+
+        :param dict lazy: lazy rendition info
+        :param signature: signature from rendition url
+        """
+        return hmac.compare_digest(get_lazy_rendition_signature(lazy), signature or '')
+
+    def get_rendition(self, lazy):
+        """Get media file for lazy rendition, render it if not in cache.
+
+        :param dict lazy: lazy rendition info
+        :return: media file or ``None`` if source media is missing
+        """
+        key = get_lazy_rendition_key(lazy)
+        cached = self.find_and_modify(query={'key': key}, update={'$set': {'last_used': utcnow()}}, new=True)
+        if cached:
+            media_file = app.media.get(cached['media'], 'upload')
+            if media_file:
+                return media_file
+            self.delete_action({'key': key})
+
+        source = app.media.get(lazy['media'], 'upload')
+        if source is None:
+            return None
+
+        spec = {key: lazy[key] for key in ('width', 'height', 'ratio') if lazy.get(key)}
+        _, output = render_renditions(fix_orientation(BytesIO(source.read())), [('lazy', spec)], lazy['format'])[0]
+        media_id = app.media.put(output['content'], filename=output['file_name'],
+                                 content_type=output['content_type'], metadata=output['metadata'])
+        try:
+            self.post([{'key': key, 'media': str(media_id), 'size': len(output['content'].getvalue()),
+                        'last_used': utcnow()}])
+        except Exception:
+            # rendered in parallel by another request
+            logger.info('Lazy rendition {} is already stored'.format(key))
+            app.media.delete(media_id)
+            return self.get_rendition(lazy)
+
+        self.evict()
+        return app.media.get(media_id, 'upload')
+
+    def evict(self, max_size=None):
+        """Remove least recently used renditions if total size exceeds max size.
+
+        :param int max_size: max size of renditions in bytes, uses ``RENDITIONS_CACHE_MAX_SIZE`` if not set
+        """
+        if max_size is None:
+            max_size = app.config.get('RENDITIONS_CACHE_MAX_SIZE', 0)
+        collection = app.data.mongo.pymongo(resource=self.datasource).db[self.datasource]
+        total = next(collection.aggregate([{'$group': {'_id': None, 'size': {'$sum': '$size'}}}]), {}).get('size', 0)
+        if total <= max_size:
+            return
+        for cached in collection.find({}, {'media': 1, 'size': 1}).sort('last_used', 1):
+            app.media.delete(cached['media'])
+            collection.delete_one({'_id': cached['_id']})
+            total -= cached.get('size') or 0
+            if total <= max_size:
+                break
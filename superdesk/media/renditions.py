@@ -11,16 +11,21 @@
 from __future__ import absolute_import
 from PIL import Image
 from io import BytesIO
+import hmac
+import hashlib
 import logging
 from copy import deepcopy
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
 from flask import current_app as app
 from .media_operations import process_file_from_stream
 from .media_operations import crop_image
 from .media_operations import download_file_from_url
 from .media_operations import process_file
+from .media_operations import _get_cropping_data
 from .image import fix_orientation
 from eve.utils import config
-from superdesk import get_resource_service
+from superdesk.resource_cache import get_vocabulary
 from superdesk.filemeta import set_filemeta
 
 
@@ -79,33 +84,203 @@ def generate_renditions(original, media_id, inserted, file_type, content_type,
     specs = list(rendition_config.items())
     if base_image:
         specs.insert(0, ('baseImage', base_image))
-    for rendition, rsize in specs:
-        cropping_data = {}
-        # reset
-        original.seek(0)
-        # create the rendition (can be based on ratio or pixels)
-        if rsize.get('width') or rsize.get('height'):
-            resized, width, height = _resize_image(original, (rsize.get('width'), rsize.get('height')), ext)
-        elif rsize.get('ratio'):
-            resized, width, height, cropping_data = _crop_image(original, ext, rsize.get('ratio'))
-        rend_content_type = 'image/%s' % ext
-        file_name, rend_content_type, metadata = process_file_from_stream(resized, content_type=rend_content_type)
-        resized.seek(0)
+    # custom crops are only recorded in lazy mode and rendered on first request
+    lazy_specs = []
+    if app.config.get('RENDITIONS_LAZY'):
+        lazy_specs = [(rendition, spec) for rendition, spec in specs
+                      if rendition in custom_renditions and rendition not in config.RENDITIONS['picture']]
+        lazy_renditions = {rendition for rendition, _ in lazy_specs}
+        specs = [(rendition, spec) for rendition, spec in specs if rendition not in lazy_renditions]
+    original.seek(0)
+    for rendition, output in render_renditions(original, specs, ext):
         folder = 'temp' if temporary else None
-        _id = app.media.put(resized, filename=file_name,
-                            content_type=rend_content_type,
+        _id = app.media.put(output['content'], filename=output['file_name'],
+                            content_type=output['content_type'],
                             folder=folder,
-                            metadata=metadata if insert_metadata else None)
+                            metadata=output['metadata'] if insert_metadata else None)
         inserted.append(_id)
-        renditions[rendition] = {'href': url_for_media(_id, rend_content_type), 'media': _id,
-                                 'mimetype': 'image/%s' % ext, 'width': width, 'height': height}
+        renditions[rendition] = {'href': url_for_media(_id, output['content_type']), 'media': _id,
+                                 'mimetype': 'image/%s' % ext, 'width': output['width'], 'height': output['height']}
         # add the cropping data if exist
-        renditions[rendition].update(cropping_data)
-        if rendition == 'baseImage':  # use baseImage for other renditions once we have it
-            original = resized
+        renditions[rendition].update(output['cropping_data'])
+    # lazy renditions are made from baseImage like others
+    source = renditions.get('baseImage', rend)
+    for rendition, spec in lazy_specs:
+        renditions[rendition] = get_lazy_rendition(source['media'], source['width'], source['height'], spec, ext)
     return renditions
 
 
+def get_lazy_rendition(media_id, width, height, spec, format):
+    """Get rendition which will be rendered on first request.
+
+    Rendition contains ``lazy`` dict with source media id and spec,
+    its ``href`` points to ``upload_raw`` endpoint which renders it using :class:`RenditionCacheService`.
+
+    :param media_id: id of source media
+    :param int width: source width
+    :param int height: source height
+    :param dict spec: rendition spec
+    :param str format: format of rendition
+    :return dict: rendition
+    """
+    if _get_spec_size(spec):
+        rendition_width, rendition_height = _get_resize_size(width, height, _get_spec_size(spec))
+        cropping_data = {}
+    else:
+        rendition_width, rendition_height, cropping_data = _get_ratio_cropping_data(width, height, spec['ratio'])
+    lazy = {key: spec[key] for key in ('width', 'height', 'ratio') if spec.get(key)}
+    lazy.update({'media': str(media_id), 'format': format})
+    rendition = {'href': get_lazy_rendition_url(lazy), 'mimetype': 'image/%s' % format,
+                 'width': rendition_width, 'height': rendition_height, 'lazy': lazy}
+    rendition.update(cropping_data)
+    return rendition
+
+
+def get_lazy_rendition_key(lazy):
+    """Get unique key for lazy rendition.
+
+    :param dict lazy: lazy rendition info
+    """
+    return ':'.join(str(lazy.get(key) or '') for key in ('media', 'format', 'width', 'height', 'ratio'))
+
+
+def get_lazy_rendition_signature(lazy):
+    """Get signature of lazy rendition, so only recorded renditions can be rendered.
+
+    :param dict lazy: lazy rendition info
+    """
+    key = get_lazy_rendition_key(lazy).encode('utf-8')
+    return hmac.new(app.config['SECRET_KEY'].encode('utf-8'), key, hashlib.sha1).hexdigest()
+
+
+def get_lazy_rendition_url(lazy):
+    """Get url of ``upload_raw`` endpoint rendering lazy rendition.
+
+    :param dict lazy: lazy rendition info
+    """
+    params = [(key, lazy[key]) for key in ('format', 'width', 'height', 'ratio') if lazy.get(key)]
+    params.append(('signature', get_lazy_rendition_signature(lazy)))
+    return '%s/upload-raw-rendition/%s?%s' % (app.config['SERVER_URL'].rstrip('/'), lazy['media'], urlencode(params))
+
+
+def render_renditions(original, specs, format, workers=None):
+    """Render renditions for given specs decoding the original only once.
+
+    JPEG images are decoded using draft mode directly to the smallest size needed,
+    ``baseImage`` rendition (if first in specs) is used as source for other renditions
+    and resized renditions are made from a pyramid of downscaled images.
+    Encoding of outputs runs in a thread pool of ``RENDITIONS_WORKERS`` threads.
+
+    :param BytesIO original: original image byte stream
+    :param list specs: list of ``(rendition, spec)`` tuples
+    :param str format: format of renditions (e.g. jpeg, png)
+    :param int workers: number of encoding threads, uses ``RENDITIONS_WORKERS`` config if not set
+    :return: list of ``(rendition, output)`` tuples in specs order, output is a dict with
+             ``content``, ``file_name``, ``content_type``, ``metadata``, ``width``, ``height``
+             and ``cropping_data`` keys
+    """
+    if workers is None:
+        workers = app.config.get('RENDITIONS_WORKERS', 4)
+    specs = [(rendition, spec) for rendition, spec in specs if _get_spec_size(spec) or spec.get('ratio')]
+    if not specs:
+        return []
+
+    img = Image.open(original)
+    width, height = img.size
+    base_spec = specs[0][1] if specs[0][0] == 'baseImage' and _get_spec_size(specs[0][1]) else None
+
+    # decode jpeg only to the size we need
+    if base_spec:
+        draft_size = _get_resize_size(width, height, _get_spec_size(base_spec))
+    elif not any(spec.get('ratio') for _, spec in specs):
+        sizes = [_get_resize_size(width, height, _get_spec_size(spec)) for _, spec in specs]
+        draft_size = (max(size[0] for size in sizes), max(size[1] for size in sizes))
+    else:
+        draft_size = None
+    if draft_size and img.format == 'JPEG':
+        img.draft(img.mode, draft_size)
+    img.load()
+
+    jobs = []
+    source = img
+    if base_spec:
+        base_size = _get_resize_size(width, height, _get_spec_size(base_spec))
+        source = img.resize(base_size, Image.ANTIALIAS)
+        width, height = base_size
+        jobs.append((specs[0][0], None, None, base_size, {}))
+        specs = specs[1:]
+
+    resize_sizes = []
+    for rendition, spec in specs:
+        if _get_spec_size(spec):
+            size = _get_resize_size(width, height, _get_spec_size(spec))
+            jobs.append((rendition, 'resize', size, size, {}))
+            resize_sizes.append(size)
+        else:
+            crop_width, crop_height, cropping_data = _get_ratio_cropping_data(width, height, spec['ratio'])
+            jobs.append((rendition, 'crop', _get_cropping_data(cropping_data), (crop_width, crop_height),
+                         cropping_data))
+
+    # resize from the smallest level of pyramid which is still bigger than rendition
+    levels = _get_pyramid(source, resize_sizes)
+
+    def render(operation, argument, size, cropping_data):
+        if operation == 'crop':
+            output = source.crop(argument)
+        elif operation == 'resize':
+            output = _get_pyramid_level(levels, argument).resize(argument, Image.ANTIALIAS)
+        else:
+            output = source
+        content = _save_image(output, format, **({} if cropping_data else {'quality': 85}))
+        file_name, content_type, metadata = process_file_from_stream(content, content_type='image/%s' % format)
+        content.seek(0)
+        return {'content': content, 'file_name': file_name, 'content_type': content_type, 'metadata': metadata,
+                'width': size[0], 'height': size[1], 'cropping_data': cropping_data}
+
+    if workers > 1 and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [(job[0], executor.submit(render, *job[1:])) for job in jobs]
+            return [(rendition, future.result()) for rendition, future in futures]
+    return [(job[0], render(*job[1:])) for job in jobs]
+
+
+def _get_spec_size(spec):
+    if spec.get('width') or spec.get('height'):
+        return (spec.get('width'), spec.get('height'))
+
+
+def _get_pyramid(img, sizes):
+    """Get list of images, each level half the size of previous one, big enough for all sizes."""
+    levels = [img]
+    if not sizes:
+        return levels
+    min_width = min(size[0] for size in sizes)
+    min_height = min(size[1] for size in sizes)
+    while levels[-1].size[0] // 2 >= min_width * 2 and levels[-1].size[1] // 2 >= min_height * 2:
+        level = levels[-1]
+        levels.append(level.resize((level.size[0] // 2, level.size[1] // 2), Image.ANTIALIAS))
+    return levels
+
+
+def _get_pyramid_level(levels, size):
+    """Get smallest level of pyramid which is at least twice the size."""
+    for level in reversed(levels):
+        if level.size[0] >= size[0] * 2 and level.size[1] >= size[1] * 2:
+            return level
+    return levels[0]
+
+
+def _save_image(img, format, **kwargs):
+    out = BytesIO()
+    try:
+        img.save(out, format, **kwargs)
+    except IOError:
+        out = BytesIO()
+        img.convert('RGB').save(out, format, **kwargs)
+    out.seek(0)
+    return out
+
+
 def can_generate_custom_crop_from_original(width, height, crop):
     """Checks whether custom crop can be generated or not
 
@@ -160,6 +335,19 @@ def _crop_image(content, format, ratio):
     """
     img = Image.open(content)
     width, height = img.size
+    new_width, new_height, cropping_data = _get_ratio_cropping_data(width, height, ratio)
+    crop, out = crop_image(content, file_name='crop.for.rendition', cropping_data=cropping_data, image_format=format)
+    return out, new_width, new_height, cropping_data
+
+
+def _get_ratio_cropping_data(width, height, ratio):
+    """Get size and centered cropping data for given ratio.
+
+    :param int width: image width
+    :param int height: image height
+    :param ratio: ratio to apply, '16:9', '1:1' etc...
+    :return: tuple of new width, new height and cropping data
+    """
     if type(ratio) not in [float, int]:
         ratio = ratio.split(':')
         ratio = int(ratio[0]) / int(ratio[1])
@@ -181,8 +369,7 @@ def _crop_image(content, format, ratio):
             'CropTop': 0,
             'CropBottom': new_height,
         }
-    crop, out = crop_image(content, file_name='crop.for.rendition', cropping_data=cropping_data, image_format=format)
-    return out, new_width, new_height, cropping_data
+    return new_width, new_height, cropping_data
 
 
 def to_int(x):
@@ -211,6 +398,21 @@ def _resize_image(content, size, format='png', keepProportions=True):
     assert isinstance(size, tuple)
     img = Image.open(content)
     width, height = img.size
+    new_width, new_height = _get_resize_size(width, height, size, keepProportions)
+    resized = img.resize((new_width, new_height), Image.ANTIALIAS)
+    out = _save_image(resized, format, quality=85)
+    return out, new_width, new_height
+
+
+def _get_resize_size(width, height, size, keepProportions=True):
+    """Get size of image resized to given size.
+
+    :param int width: image width
+    :param int height: image height
+    :param tuple size: tuple of width, height
+    :param bool keepProportions: if true keep image proportions
+    :return: tuple of new width and new height
+    """
     new_width, new_height = [to_int(x) for x in size]
     if keepProportions:
         if new_width is None and new_height is None:
@@ -231,16 +433,7 @@ def _resize_image(content, size, format='png', keepProportions=True):
                 new_height = int(int(new_width) / original_ratio)
             else:
                 new_width = int(new_height * original_ratio)
-    resized = img.resize((new_width, new_height), Image.ANTIALIAS)
-    out = BytesIO()
-    try:
-        resized.save(out, format, quality=85)
-    except IOError:
-        out = BytesIO()
-        resized = resized.convert('RGB')
-        resized.save(out, format, quality=85)
-    out.seek(0)
-    return out, new_width, new_height
+    return new_width, new_height
 
 
 def get_renditions_spec(without_internal_renditions=False, no_custom_crops=False):
@@ -259,11 +452,11 @@ def get_renditions_spec(without_internal_renditions=False, no_custom_crops=False
 
     if not no_custom_crops:
         # load custom renditions sizes
-        custom_crops = get_resource_service('vocabularies').find_one(req=None, _id='crop_sizes')
+        custom_crops = get_vocabulary('crop_sizes')
         if custom_crops:
             for crop in custom_crops.get('items'):
                 if crop.get('is_active'):
-                    rendition_spec[crop['name']] = crop
+                    rendition_spec[crop['name']] = dict(crop)
     return rendition_spec
 
 
@@ -0,0 +1,115 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+import time
+import logging
+import threading
+
+from contextlib import contextmanager
+from flask import current_app as app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+#: default max seconds connection can be idle, used outside of app context
+MAX_IDLE = 60
+
+#: default max number of idle connections per key, used outside of app context
+PER_DESTINATION = 2
+
+
+class ConnectionPool():
+    """Pool of reusable transmitter connections.
+
+    Connections are grouped by key, which should identify destination (host, credentials, ...).
+    A connection is used by single caller at a time and returned to the pool when done,
+    if there is an error while using it it gets closed instead.
+
+    :param connect: function creating new connection, gets ``key`` as param
+    :param close: function closing connection
+    :param check: function returning ``True`` if idle connection is still usable
+    :param max_idle: max seconds connection can be idle, defaults to ``TRANSMIT_CONNECTION_MAX_IDLE`` config
+    :param per_destination: max number of idle connections per key,
+        defaults to ``TRANSMIT_CONNECTIONS_PER_DESTINATION`` config
+    """
+
+    def __init__(self, connect, close, check=None, max_idle=None, per_destination=None):
+        self._connect = connect
+        self._close = close
+        self._check = check
+        self._max_idle = max_idle
+        self._per_destination = per_destination
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self, key, *args):
+        """Get connection for given key.
+
+        Use with ``with``, extra ``args`` are passed to connect function.
+
+        :param key: connection key
+        """
+        conn = self._get_idle(key) or self._connect(*args)
+        try:
+            yield conn
+        except Exception:
+            self._close_quietly(conn)
+            raise
+        else:
+            self._put_idle(key, conn)
+
+    def clear(self):
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn, _ in connections:
+                self._close_quietly(conn)
+
+    def _config(self, value, key, default):
+        if value is not None:
+            return value
+        if has_app_context():
+            return app.config.get(key, default)
+        return default
+
+    def _get_idle(self, key):
+        max_age = self._config(self._max_idle, 'TRANSMIT_CONNECTION_MAX_IDLE', MAX_IDLE)
+        while True:
+            with self._lock:
+                try:
+                    conn, used = self._idle.get(key, []).pop()
+                except IndexError:
+                    return None
+            if used + max_age > time.monotonic() and (self._check is None or self._is_usable(conn)):
+                return conn
+            self._close_quietly(conn)
+
+    def _put_idle(self, key, conn):
+        with self._lock:
+            connections = self._idle.setdefault(key, [])
+            per_destination = self._config(self._per_destination, 'TRANSMIT_CONNECTIONS_PER_DESTINATION',
+                                           PER_DESTINATION)
+            if len(connections) < per_destination:
+                connections.append((conn, time.monotonic()))
+                return
+        self._close_quietly(conn)
+
+    def _is_usable(self, conn):
+        try:
+            return self._check(conn)
+        except Exception:
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            self._close(conn)
+        except Exception as ex:
+            logger.debug('Failed to close connection error=%s', ex)
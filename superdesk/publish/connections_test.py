@@ -0,0 +1,43 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+import unittest
+
+from unittest import mock
+from superdesk.publish.connections import ConnectionPool
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+
+    def test_reuse_without_app_context(self):
+        close = mock.Mock()
+        pool = ConnectionPool(object, close)
+        with pool.connection('foo') as conn:
+            pass
+        with pool.connection('foo') as reused:
+            self.assertIs(conn, reused)
+        close.assert_not_called()
+
+    def test_per_destination(self):
+        close = mock.Mock()
+        pool = ConnectionPool(object, close, per_destination=1)
+        with pool.connection('foo') as first:
+            with pool.connection('foo') as second:
+                self.assertIsNot(first, second)
+        close.assert_called_once_with(first)
+
+    def test_max_idle(self):
+        close = mock.Mock()
+        pool = ConnectionPool(object, close, max_idle=0)
+        with pool.connection('foo') as conn:
+            pass
+        with pool.connection('foo') as other:
+            self.assertIsNot(conn, other)
+        close.assert_called_once_with(conn)
@@ -9,6 +9,7 @@
 # at https://www.sourcefabric.org/superdesk/license
 
 import logging
+import superdesk
 from lxml import etree
 from superdesk.metadata.item import ITEM_TYPE, CONTENT_TYPE, FORMATS, FORMAT
 from superdesk.etree import parse_html
@@ -32,6 +33,11 @@ class FormatterRegistry(type):
 class Formatter(metaclass=FormatterRegistry):
     """Base Formatter class for all types of Formatters like News ML 1.2, News ML G2, NITF, etc."""
 
+    #: Set to ``True`` if formatted output doesn't depend on subscriber, destination or codes.
+    #: Output of such formatter is rendered only once per item using :meth:`format_body`
+    #: and then :meth:`stamp` is called for every subscriber to generate published sequence number.
+    subscriber_invariant = False
+
     def __init__(self):
         self.can_preview = False
         self.can_export = False
@@ -42,6 +48,29 @@ class Formatter(metaclass=FormatterRegistry):
         """Formats the article and returns the transformed string"""
         raise NotImplementedError()
 
+    def format_body(self, article, subscriber):
+        """Formats the article output shared by all subscribers.
+
+        Only used if :attr:`subscriber_invariant` is set.
+
+        :param dict article: article to format
+        :param dict subscriber: first subscriber getting the output
+        :return list: list of formatted items
+        """
+        raise NotImplementedError()
+
+    def stamp(self, formatted_items, subscriber, codes=None):
+        """Stamps output of :meth:`format_body` for given subscriber.
+
+        :param list formatted_items: output of :meth:`format_body`
+        :param dict subscriber: subscriber
+        :param list codes: selector codes
+        :return list: list of ``(published_seq_num, formatted_item)`` tuples
+        """
+        subscribers_service = superdesk.get_resource_service('subscribers')
+        return [(subscribers_service.generate_sequence_number(subscriber), formatted_item)
+                for formatted_item in formatted_items]
+
     def export(self, article, subscriber, codes=None):
         """Formats the article and returns the output string for export"""
         raise NotImplementedError()
@@ -41,6 +41,7 @@ from superdesk.metadata.item import ITEM_TYPE, CONTENT_TYPE, EMBARGO, GUID_FIELD
 from superdesk.metadata.packages import RESIDREF, GROUP_ID, GROUPS, ROOT_GROUP, REFS
 from superdesk.utils import json_serialize_datetime_objectId
 from superdesk.media.renditions import get_renditions_spec
+from superdesk.resource_cache import get_vocabulary, get_users
 from apps.archive.common import get_utc_schedule
 from superdesk import text_utils
 
@@ -108,17 +109,28 @@ class NINJSFormatter(Formatter):
         'size': 'size',
     })
 
+    #: ninjs output is the same for all subscribers, subclasses using subscriber
+    #: in :meth:`_transform_to_ninjs` must set it to ``False``
+    subscriber_invariant = True
+
     def __init__(self):
         self.format_type = 'ninjs'
         self.can_preview = True
         self.can_export = True
 
     def format(self, article, subscriber, codes=None):
-        try:
-            pub_seq_num = superdesk.get_resource_service('subscribers').generate_sequence_number(subscriber)
+        return self.stamp(self.format_body(article, subscriber), subscriber, codes)
 
+    def format_body(self, article, subscriber):
+        try:
             ninjs = self._transform_to_ninjs(article, subscriber)
-            return [(pub_seq_num, json.dumps(ninjs, default=json_serialize_datetime_objectId))]
+            return [json.dumps(ninjs, default=json_serialize_datetime_objectId)]
+        except Exception as ex:
+            raise FormatterError.ninjsFormatterError(ex, subscriber)
+
+    def stamp(self, formatted_items, subscriber, codes=None):
+        try:
+            return super().stamp(formatted_items, subscriber, codes)
         except Exception as ex:
             raise FormatterError.ninjsFormatterError(ex, subscriber)
 
@@ -422,12 +434,14 @@ class NINJSFormatter(Formatter):
     def _format_authors(self, article):
         users_service = superdesk.get_resource_service('users')
         vocabularies_service = superdesk.get_resource_service('vocabularies')
-        job_titles_voc = vocabularies_service.find_one(None, _id='job_titles')
-        if job_titles_voc and 'items' in job_titles_voc:
-            job_titles_voc['items'] = vocabularies_service.get_locale_vocabulary(
-                job_titles_voc.get('items'), article.get('language'))
-        job_titles_map = {v['qcode']: v['name'] for v in job_titles_voc['items']} if job_titles_voc is not None else {}
-
+        job_titles_voc = get_vocabulary('job_titles')
+        job_titles_map = {}
+        if job_titles_voc is not None:
+            job_titles = vocabularies_service.get_locale_vocabulary(
+                job_titles_voc.get('items') or [], article.get('language'))
+            job_titles_map = {v['qcode']: v['name'] for v in job_titles}
+
+        users = get_users([author['parent'] for author in article['authors'] if author.get('parent')])
         authors = []
         for author in article['authors']:
             try:
@@ -440,9 +454,8 @@ class NINJSFormatter(Formatter):
                     logger.warning("unknown user")
                     user = {}
             else:
-                try:
-                    user = next(users_service.find({'_id': user_id}))
-                except StopIteration:
+                user = users.get(str(user_id))
+                if user is None:
                     logger.warning("unknown user: {user_id}".format(user_id=user_id))
                     user = {}
 
@@ -12,6 +12,8 @@ import logging
 import superdesk
 import superdesk.publish
 
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from eve.utils import config, ParsedRequest
 from flask import current_app as app
@@ -55,6 +57,7 @@ def publish():
             return
 
         try:
+            log_queue_metrics()
             for retries in [False, True]:  # first publish pending, retries after
                 subs = get_queue_subscribers(retries=retries)
                 for sub in subs:
@@ -80,6 +83,41 @@ def _get_queue_lookup(retries=False):
     }
 
 
+def get_queue_metrics():
+    """Get depth and lag of publish queue per destination.
+
+    Lag is the age of the oldest pending or retrying item in seconds.
+
+    :return list: dicts with ``subscriber_id``, ``destination``, ``state``, ``depth`` and ``lag``
+    """
+    pipeline = [
+        {'$match': {'state': {'$in': [QueueState.PENDING.value, QueueState.RETRYING.value]}}},
+        {'$group': {
+            '_id': {'subscriber_id': '$subscriber_id', 'destination': '$destination.name', 'state': '$state'},
+            'depth': {'$sum': 1},
+            'oldest': {'$min': '$_created'},
+        }},
+    ]
+    now = utcnow()
+    metrics = []
+    for group in app.data.mongo.pymongo(resource=PUBLISH_QUEUE).db[PUBLISH_QUEUE].aggregate(pipeline):
+        metric = dict(group[config.ID_FIELD])
+        metric['depth'] = group['depth']
+        metric['lag'] = (now - group['oldest']).total_seconds() if group.get('oldest') else 0
+        metrics.append(metric)
+    return metrics
+
+
+def log_queue_metrics():
+    metrics = get_queue_metrics()
+    for metric in metrics:
+        logger.debug('Publish queue subscriber={subscriber_id} destination={destination} state={state} '
+                     'depth={depth} lag={lag:.0f}s'.format(**metric))
+    if metrics:
+        logger.info('Publish queue depth={} lag={:.0f}s'.format(
+            sum(metric['depth'] for metric in metrics), max(metric['lag'] for metric in metrics)))
+
+
 def get_queue_subscribers(retries=False):
     lookup = _get_queue_lookup(retries)
     return app.data.mongo.pymongo(resource=PUBLISH_QUEUE).db[PUBLISH_QUEUE].distinct('subscriber_id', lookup)
@@ -105,17 +143,56 @@ def transmit_subscriber_items(subscriber, retries=False):
 
     try:
         queue_items = get_queue_items(retries, subscriber)
-        for queue_item in queue_items:
-            args = [queue_item[config.ID_FIELD]]
-            kwargs = {'is_async': is_async}
-            if is_async:
-                transmit_item.apply_async(args=args, kwargs=kwargs)
-            else:
-                transmit_item.apply(args=args, kwargs=kwargs, throw=True)
+        if is_async:
+            for queue_item in queue_items:
+                transmit_item.apply_async(args=[queue_item[config.ID_FIELD]], kwargs={'is_async': is_async})
+        else:
+            transmit_destination_items(queue_items)
     finally:
         unlock(lock_name)
 
 
+def get_destination_key(queue_item):
+    destination = queue_item.get('destination') or {}
+    return str(queue_item.get('subscriber_id')), destination.get('name'), destination.get('delivery_type')
+
+
+def transmit_destination_items(queue_items):
+    """Transmit queue items grouping them by destination and running destinations concurrently.
+
+    Items for a destination are transmitted in order using up to ``TRANSMIT_DESTINATION_CONCURRENCY``
+    threads, there are at most ``TRANSMIT_MAX_WORKERS`` threads in total.
+
+    :param queue_items: list of queue items
+    """
+    destinations = OrderedDict()
+    for queue_item in queue_items:
+        destinations.setdefault(get_destination_key(queue_item), []).append(queue_item[config.ID_FIELD])
+
+    concurrency = max(1, app.config.get('TRANSMIT_DESTINATION_CONCURRENCY', 1))
+    lanes = []
+    for ids in destinations.values():
+        lanes.extend(ids[i::concurrency] for i in range(min(concurrency, len(ids))))
+
+    max_workers = min(app.config.get('TRANSMIT_MAX_WORKERS', 4), len(lanes))
+    flask_app = app._get_current_object()
+    if max_workers <= 1:
+        for lane in lanes:
+            _transmit_lane(flask_app, lane)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_transmit_lane, flask_app, lane) for lane in lanes]
+    for future in futures:
+        future.result()
+
+
+def _transmit_lane(flask_app, queue_item_ids):
+    with flask_app.app_context():
+        for queue_item_id in queue_item_ids:
+            transmit_item.apply(args=[queue_item_id], kwargs={'is_async': False}, throw=True)
+
+
 @celery.task(soft_time_limit=300)
 def transmit_item(queue_item_id, is_async=False):
     publish_queue_service = get_resource_service(PUBLISH_QUEUE)
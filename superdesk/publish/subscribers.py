@@ -18,6 +18,7 @@ from eve.utils import ParsedRequest, config
 from superdesk.utils import ListCursor
 from superdesk.resource import Resource, build_custom_hateoas
 from superdesk.services import BaseService
+from superdesk.resource_cache import CacheGenerationMixin
 from superdesk.errors import SuperdeskApiError
 from superdesk.publish import subscriber_types, SUBSCRIBER_TYPES  # NOQA
 from flask import current_app as app
@@ -125,7 +126,7 @@ class SubscribersResource(Resource):
     privileges = {'POST': 'subscribers', 'PATCH': 'subscribers'}
 
 
-class SubscribersService(BaseService):
+class SubscribersService(CacheGenerationMixin, BaseService):
     def get(self, req, lookup):
         if req is None:
             req = ParsedRequest()
@@ -298,8 +299,9 @@ class SubscribersService(BaseService):
             min_seq_number = subscriber['sequence_num_settings']['min']
             max_seq_number = subscriber['sequence_num_settings']['max']
 
-        return get_resource_service('sequences').get_next_sequence_number(
+        return get_resource_service('sequences').get_next_sequence_number_from_block(
             key_name='subscribers_{_id})'.format(_id=subscriber[config.ID_FIELD]),
+            block_size=app.config.get('PUBLISH_SEQUENCE_BLOCK_SIZE', 1),
             max_seq_number=max_seq_number,
             min_seq_number=min_seq_number
         )
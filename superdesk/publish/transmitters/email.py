@@ -11,8 +11,10 @@
 import json
 
 from flask import current_app as app
+from superdesk import get_resource_service
 from superdesk.emails import send_email
 from superdesk.publish import register_transmitter
+from superdesk.publish.connections import ConnectionPool
 from superdesk.publish.publish_service import PublishService
 from superdesk.errors import PublishEmailError
 from superdesk.media.media_operations import get_watermark
@@ -26,6 +28,19 @@ errors = [PublishEmailError.emailError().get_error_description()]
 logger = logging.getLogger(__name__)
 
 
+def smtp_connect():
+    connection = app.mail.connect()
+    connection.__enter__()
+    return connection
+
+
+def smtp_check(connection):
+    return connection.host is None or connection.host.noop()[0] == 250
+
+
+smtp_pool = ConnectionPool(smtp_connect, lambda connection: connection.__exit__(None, None, None), smtp_check)
+
+
 class EmailPublishService(PublishService):
     """Email Transmitter
 
@@ -64,8 +79,8 @@ class EmailPublishService(PublishService):
                 # Get the rendition that has been nominated for attaching to the email
                 rendition = config.get('media_rendition', '')
                 media_item = item.get('renditions', {}).get(rendition)
-                if media_item and rendition:
-                    media = app.media.get(media_item['media'], resource='upload')
+                media = self._get_rendition_media(media_item) if media_item and rendition else None
+                if media is not None:
                     im = Image.open(media)
                     if config.get('watermark', False):
                         im = get_watermark(im)
@@ -78,16 +93,32 @@ class EmailPublishService(PublishService):
                                                   headers=[('Content-ID', cid)]))
 
             # sending email synchronously
-            send_email(subject=subject,
-                       sender=admins[0],
-                       recipients=recipients,
-                       text_body=text_body,
-                       html_body=html_body,
-                       bcc=bcc,
-                       attachments=attachments)
+            smtp_key = tuple(app.config.get(key) for key in ('MAIL_SERVER', 'MAIL_PORT', 'MAIL_USERNAME'))
+            with smtp_pool.connection(smtp_key) as connection:
+                send_email(subject=subject,
+                           sender=admins[0],
+                           recipients=recipients,
+                           text_body=text_body,
+                           html_body=html_body,
+                           bcc=bcc,
+                           attachments=attachments,
+                           connection=connection)
 
         except Exception as ex:
             raise PublishEmailError.emailError(ex, queue_item.get('destination'))
 
+    def _get_rendition_media(self, rendition):
+        """Get media file for rendition, lazy renditions are rendered if not cached.
+
+        :param dict rendition: rendition info
+        """
+        if rendition.get('lazy') and not rendition.get('media'):
+            media = get_resource_service('rendition_cache').get_rendition(rendition['lazy'])
+        else:
+            media = app.media.get(rendition.get('media'), resource='upload')
+        if media is None:
+            logger.warning('Missing media for rendition {}'.format(rendition))
+        return media
+
 
 register_transmitter('email', EmailPublishService(), errors)
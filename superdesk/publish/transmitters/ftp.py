@@ -8,8 +8,9 @@
 # AUTHORS and LICENSE files distributed with this source code, or
 # at https://www.sourcefabric.org/superdesk/license
 
-from superdesk.ftp import ftp_connect
+from superdesk.ftp import ftp_open
 from superdesk.publish import register_transmitter
+from superdesk.publish.connections import ConnectionPool
 from io import BytesIO
 from superdesk.publish.publish_service import get_publish_service, PublishService
 from superdesk.errors import PublishFtpError
@@ -22,6 +23,9 @@ except ImportError:
     from urlparse import urlparse
 
 
+ftp_pool = ConnectionPool(ftp_open, lambda ftp: ftp.close(), lambda ftp: ftp.voidcmd('NOOP'))
+
+
 class FTPPublishService(PublishService):
     """FTP Publish Service.
 
@@ -50,7 +54,8 @@ class FTPPublishService(PublishService):
         config = queue_item.get('destination', {}).get('config', {})
 
         try:
-            with ftp_connect(config) as ftp:
+            key = tuple(config.get(field) for field in ('host', 'username', 'password', 'path', 'passive'))
+            with ftp_pool.connection(key, config) as ftp:
                 filename = get_publish_service().get_filename(queue_item)
                 b = BytesIO(queue_item['encoded_item'])
                 ftp.storbinary("STOR " + filename, b)
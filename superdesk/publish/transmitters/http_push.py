@@ -13,8 +13,10 @@ import hmac
 import logging
 import requests
 
-from superdesk import app
+from urllib.parse import urlparse
+from superdesk import app, get_resource_service
 from superdesk.publish import register_transmitter
+from superdesk.publish.connections import ConnectionPool
 
 from superdesk.errors import PublishHTTPPushError, PublishHTTPPushServerError, PublishHTTPPushClientError
 from superdesk.publish.publish_queue import PUBLISHED_IN_PACKAGE
@@ -23,6 +25,9 @@ from superdesk.publish.publish_service import PublishService
 errors = [PublishHTTPPushError.httpPushError().get_error_description()]
 logger = logging.getLogger(__name__)
 
+#: keep-alive sessions per host
+session_pool = ConnectionPool(requests.Session, lambda session: session.close())
+
 
 class HTTPPushService(PublishService):
     """HTTP Publish Service.
@@ -90,7 +95,8 @@ class HTTPPushService(PublishService):
     def _push_item(self, destination, data):
         resource_url = self._get_resource_url(destination)
         headers = self._get_headers(data, destination, self.headers)
-        response = requests.post(resource_url, data=data, headers=headers)
+        with session_pool.connection(self._get_session_key(resource_url)) as session:
+            response = session.post(resource_url, data=data, headers=headers)
 
         # need to rethrow exception as a superdesk exception for now for notifiers.
         try:
@@ -120,6 +126,13 @@ class HTTPPushService(PublishService):
             for _, rendition in renditions.items():
                 rendition.pop('href', None)
                 rendition.setdefault('mimetype', rendition.get('original', {}).get('mimetype', item.get('mimetype')))
+                if rendition.get('lazy') and not rendition.get('media'):
+                    # render lazy rendition so it can be pushed like the others
+                    media_file = get_resource_service('rendition_cache').get_rendition(rendition['lazy'])
+                    if media_file is None:
+                        logger.warning('Missing source media for lazy rendition {}'.format(rendition['lazy']))
+                        continue
+                    rendition['media'] = str(media_file._id)
                 media[rendition['media']] = rendition
             for attachment in item.get('attachments', []):
                 media.update({attachment['media']: {
@@ -153,14 +166,14 @@ class HTTPPushService(PublishService):
         mimetype = getattr(media, 'content_type', 'image/jpeg')
         data = {'media_id': str(media._id)}
         files = {'media': (str(media._id), media, mimetype)}
-        s = requests.Session()
         assets_url = self._get_assets_url(destination)
         request = requests.Request('POST', assets_url)
         prepped = request.prepare()
         prepped.prepare_body(data, files)
         headers = self._get_headers(prepped.body, destination, prepped.headers)
         prepped.prepare_headers(headers)
-        response = s.send(prepped)
+        with session_pool.connection(self._get_session_key(assets_url)) as session:
+            response = session.send(prepped)
         if response.status_code not in (200, 201):
             self._raise_publish_error(
                 response.status_code,
@@ -182,7 +195,8 @@ class HTTPPushService(PublishService):
         @return: bool
         """
         assets_url = self._get_assets_url(destination, media_id)
-        response = requests.get(assets_url)
+        with session_pool.connection(self._get_session_key(assets_url)) as session:
+            response = session.get(assets_url)
         if response.status_code not in (requests.codes.ok, requests.codes.not_found):  # @UndefinedVariable
             self._raise_publish_error(
                 response.status_code,
@@ -220,6 +234,10 @@ class HTTPPushService(PublishService):
     def _get_resource_url(self, destination):
         return destination.get('config', {}).get('resource_url')
 
+    def _get_session_key(self, url):
+        url_parts = urlparse(url)
+        return url_parts.scheme, url_parts.netloc
+
     def _raise_publish_error(self, status_code, e, destination=None):
         if status_code >= 400 and status_code < 500:
             raise PublishHTTPPushClientError.httpPushError(e, destination)
@@ -0,0 +1,278 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+"""Process-wide cache for small resources which are read often but modified rarely.
+
+Every cached resource has a generation counter stored in ``sequences`` collection,
+which is incremented on every write done via service using :class:`CacheGenerationMixin`.
+:class:`ResourceCache` checks generations of all its resources using single query
+and only reloads those which were modified since last check.
+
+:class:`ReferenceCache` caches single documents of reference resources (users, desks,
+stages and vocabularies) loaded on demand, use its accessors like :func:`get_user`.
+"""
+
+import time
+import logging
+
+from flask import current_app as app
+from eve.utils import config
+from superdesk import get_resource_service
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'resource_cache_{}'
+
+
+def bump_generation(resource):
+    """Increment generation of given resource.
+
+    Generation is a tuple of sequence ``_id`` and ``sequence_number``, so it changes
+    even if the sequence gets removed and created again.
+
+    :param resource: resource name
+    :return tuple: new generation
+    """
+    sequence = get_resource_service('sequences').find_and_modify(
+        query={'key': GENERATION_KEY.format(resource)},
+        update={'$inc': {'sequence_number': 1}},
+        upsert=True,
+        new=True,
+    )
+    return sequence[config.ID_FIELD], sequence.get('sequence_number')
+
+
+def get_generations(resources):
+    """Get current generations of given resources.
+
+    :param resources: list of resource names
+    :return dict: generation per resource, missing if resource was never modified
+    """
+    keys = {GENERATION_KEY.format(resource): resource for resource in resources}
+    sequences = get_resource_service('sequences').find({'key': {'$in': list(keys)}})
+    return {keys[seq['key']]: (seq[config.ID_FIELD], seq.get('sequence_number')) for seq in sequences}
+
+
+class CacheGenerationMixin:
+    """Service mixin which increments resource generation after every write.
+
+    Documents of the resource cached by :class:`ReferenceCache` in current process are dropped immediately.
+    """
+
+    def create(self, docs, **kwargs):
+        ids = super().create(docs, **kwargs)
+        self._bump_generation()
+        return ids
+
+    def update(self, id, updates, original):
+        res = super().update(id, updates, original)
+        self._bump_generation()
+        return res
+
+    def system_update(self, id, updates, original):
+        res = super().system_update(id, updates, original)
+        self._bump_generation()
+        return res
+
+    def replace(self, id, document, original):
+        res = super().replace(id, document, original)
+        self._bump_generation()
+        return res
+
+    def delete(self, lookup):
+        res = super().delete(lookup)
+        self._bump_generation()
+        return res
+
+    def _bump_generation(self):
+        bump_generation(self.datasource)
+        get_reference_cache().invalidate(self.datasource)
+
+
+class ResourceCache:
+    """Cache of all documents of given resources.
+
+    Call :meth:`refresh` to check for changes, eg. once per task run, and
+    :meth:`get` to get cached documents. Documents are shared within process
+    so must not be modified.
+
+    :param resources: list of resource names, their services should use :class:`CacheGenerationMixin`
+    """
+
+    def __init__(self, resources):
+        self.resources = tuple(resources)
+        self._docs = {}
+        self._generations = {}
+
+    def refresh(self):
+        """Reload resources modified since last refresh.
+
+        :return set: names of reloaded resources
+        """
+        generations = get_generations(self.resources)
+        reloaded = set()
+        for resource in self.resources:
+            generation = generations.get(resource)
+            if generation is None:
+                # never modified, start tracking it now
+                generation = bump_generation(resource)
+            elif resource in self._docs and generation == self._generations.get(resource):
+                continue
+            logger.debug('Loading %s into resource cache', resource)
+            service = get_resource_service(resource)
+            self._docs[resource] = {doc[config.ID_FIELD]: doc for doc in service.get_from_mongo(req=None, lookup={})}
+            self._generations[resource] = generation
+            reloaded.add(resource)
+        return reloaded
+
+    def get(self, resource):
+        """Get cached documents of given resource.
+
+        :param resource: resource name
+        :return dict: documents by id
+        """
+        if resource not in self._docs:
+            self.refresh()
+        return self._docs[resource]
+
+
+#: resources cached by :class:`ReferenceCache`
+REFERENCE_RESOURCES = ('users', 'desks', 'stages', 'vocabularies')
+
+
+class ReferenceCache:
+    """Cache of reference documents loaded by id when needed.
+
+    Generations of cached resources are checked at most every ``REFERENCE_CACHE_CHECK_INTERVAL``
+    seconds and documents of modified resources are dropped. Missing documents are not cached.
+    Documents are shared within app so must not be modified.
+
+    Number of hits and misses is counted per resource, see :meth:`get_stats`.
+
+    :param resources: list of resource names, their services should use :class:`CacheGenerationMixin`
+    """
+
+    def __init__(self, resources=REFERENCE_RESOURCES):
+        self.resources = tuple(resources)
+        self._docs = {resource: {} for resource in self.resources}
+        self._generations = {}
+        self._checked = None
+        self.hits = {resource: 0 for resource in self.resources}
+        self.misses = {resource: 0 for resource in self.resources}
+
+    def check(self):
+        """Drop documents of resources modified since last check."""
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < app.config.get('REFERENCE_CACHE_CHECK_INTERVAL', 5):
+            return
+        generations = get_generations(self.resources)
+        for resource in self.resources:
+            generation = generations.get(resource)
+            if generation is None:
+                # never modified, start tracking it now
+                generation = bump_generation(resource)
+            if generation != self._generations.get(resource):
+                self._docs[resource] = {}
+                self._generations[resource] = generation
+        self._checked = now
+
+    def invalidate(self, resource):
+        """Drop cached documents of given resource.
+
+        :param resource: resource name
+        """
+        if resource in self._docs:
+            self._docs[resource] = {}
+
+    def get(self, resource, _id):
+        """Get document by id.
+
+        :param resource: resource name
+        :param _id: document id
+        :return: document or ``None`` if not found
+        """
+        if not _id:
+            return None
+        return self.get_many(resource, [_id]).get(str(_id))
+
+    def get_many(self, resource, ids):
+        """Get documents for given ids, missing ones are fetched using single query.
+
+        :param resource: resource name
+        :param ids: document ids
+        :return dict: documents found by string id
+        """
+        self.check()
+        docs = self._docs[resource]
+        found = {}
+        missing = {}
+        for _id in ids:
+            if not _id:
+                continue
+            key = str(_id)
+            doc = docs.get(key)
+            if doc is not None:
+                found[key] = doc
+            else:
+                missing[key] = _id
+        self.hits[resource] += len(found)
+        self.misses[resource] += len(missing)
+        if missing:
+            lookup = {config.ID_FIELD: {'$in': list(missing.values())}}
+            for doc in get_resource_service(resource).get_from_mongo(req=None, lookup=lookup):
+                key = str(doc[config.ID_FIELD])
+                docs[key] = found[key] = doc
+        return found
+
+    def get_stats(self):
+        """Get number of hits, misses, hit rate and cached documents per resource."""
+        stats = {}
+        for resource in self.resources:
+            hits, misses = self.hits[resource], self.misses[resource]
+            stats[resource] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0,
+                'size': len(self._docs[resource]),
+            }
+        return stats
+
+
+def get_reference_cache():
+    """Get reference cache of current app."""
+    cache = app.extensions.get('superdesk_reference_cache')
+    if cache is None:
+        cache = app.extensions.setdefault('superdesk_reference_cache', ReferenceCache())
+    return cache
+
+
+def get_user(_id):
+    """Get user by id, returns ``None`` if not found."""
+    return get_reference_cache().get('users', _id)
+
+
+def get_users(ids):
+    """Get users by string id."""
+    return get_reference_cache().get_many('users', ids)
+
+
+def get_desk(_id):
+    """Get desk by id, returns ``None`` if not found."""
+    return get_reference_cache().get('desks', _id)
+
+
+def get_stage(_id):
+    """Get stage by id, returns ``None`` if not found."""
+    return get_reference_cache().get('stages', _id)
+
+
+def get_vocabulary(_id):
+    """Get vocabulary by id, returns ``None`` if not found."""
+    return get_reference_cache().get('vocabularies', _id)
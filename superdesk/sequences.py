@@ -1,5 +1,7 @@
 import superdesk
+import threading
 import traceback
+from collections import deque
 from superdesk import get_resource_service
 from .resource import Resource
 from .services import BaseService
@@ -8,6 +10,10 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+#: sequence numbers reserved by this process and not used yet
+_blocks = {}
+_blocks_lock = threading.Lock()
+
 
 def init_app(app):
     endpoint_name = 'sequences'
@@ -49,25 +55,80 @@ class SequencesService(BaseService):
         :param min_seq_num: default 1, init value, sequence will start from the NEXT one
         :returns: sequence number
         """
+        return self.get_next_sequence_numbers(key_name, 1, max_seq_number, min_seq_number)[0]
+
+    def get_next_sequence_numbers(
+        self,
+        key_name,
+        count,
+        max_seq_number=None,
+        min_seq_number=1
+    ):
+        """
+        Reserves block of ``count`` consecutive Sequence Numbers using single atomic update.
+
+        Numbers over ``max_seq_number`` continue from ``min_seq_number``, so the block
+        might wrap around. Stored sequence number is then reset, but only if it was not
+        changed meanwhile - in such case the process which changed it resets it.
+
+        :param key: key to identify the sequence
+        :param count: number of sequence numbers to reserve
+        :param max_seq_num: default None, maximal possible value, None means no upper limit
+        :param min_seq_num: default 1, init value, sequence will start from the NEXT one
+        :returns: list of sequence numbers
+        """
         if not key_name:
             logger.error('Empty sequence key is used: {}'.format('\n'.join(traceback.format_stack())))
             raise KeyError('Sequence key cannot be empty')
 
         target_resource = get_resource_service('sequences')
-        sequence_number = target_resource.find_and_modify(
+        last_number = target_resource.find_and_modify(
             query={'key': key_name},
-            update={'$inc': {'sequence_number': 1}},
+            update={'$inc': {'sequence_number': count}},
             upsert=True,
             new=True
         ).get('sequence_number')
 
-        if max_seq_number:
-            if sequence_number > max_seq_number:
-                target_resource.find_and_modify(
-                    query={'key': key_name},
-                    update={'sequence_number': min_seq_number},
-                    upsert=True)
+        numbers = list(range(last_number - count + 1, last_number + 1))
+        if max_seq_number and last_number > max_seq_number:
+            numbers = [self._wrap_sequence_number(number, max_seq_number, min_seq_number) for number in numbers]
+            target_resource.find_and_modify(
+                query={'key': key_name, 'sequence_number': last_number},
+                update={'$set': {'sequence_number': numbers[-1]}})
+
+        return numbers
 
-                sequence_number = min_seq_number
+    def _wrap_sequence_number(self, number, max_seq_number, min_seq_number):
+        if number <= max_seq_number:
+            return number
+        return min_seq_number + (number - max_seq_number - 1) % (max_seq_number - min_seq_number + 1)
+
+    def get_next_sequence_number_from_block(
+        self,
+        key_name,
+        block_size,
+        max_seq_number=None,
+        min_seq_number=1
+    ):
+        """
+        Get Sequence Number from block reserved by this process.
+
+        Using blocks avoids a db write for every number, but numbers are not increasing
+        across processes and numbers not used when process exits are skipped.
+
+        :param key: key to identify the sequence
+        :param block_size: number of sequence numbers reserved at once, ``1`` disables blocks
+        :param max_seq_num: default None, maximal possible value, None means no upper limit
+        :param min_seq_num: default 1, init value, sequence will start from the NEXT one
+        :returns: sequence number
+        """
+        if block_size <= 1:
+            return self.get_next_sequence_number(key_name, max_seq_number, min_seq_number)
 
-        return sequence_number
+        block_key = (key_name, max_seq_number, min_seq_number)
+        with _blocks_lock:
+            block = _blocks.get(block_key)
+            if not block:
+                block = _blocks[block_key] = deque(
+                    self.get_next_sequence_numbers(key_name, block_size, max_seq_number, min_seq_number))
+            return block.popleft()
@@ -23,6 +23,7 @@ from eve.io.media import MediaStorage
 from mimetypes import guess_extension
 
 from superdesk.media.media_operations import download_file_from_url
+from superdesk.media.ranges import read_file_range, BUFFER_SIZE
 from superdesk.utc import query_datetime
 
 logger = logging.getLogger(__name__)
@@ -34,12 +35,15 @@ class AmazonObjectWrapper(BytesIO):
     def __init__(self, s3_object, name, metadata):
         super().__init__()
 
-        s3_body = s3_object['Body']
-        blocksize = 65636
-        buf = s3_body.read(amt=blocksize)
-        while len(buf) > 0:
-            self.write(buf)
+        # there is no body for objects from ``head_object``
+        s3_body = s3_object.get('Body')
+        self.loaded = s3_body is not None
+        if self.loaded:
+            blocksize = 65636
             buf = s3_body.read(amt=blocksize)
+            while len(buf) > 0:
+                self.write(buf)
+                buf = s3_body.read(amt=blocksize)
 
         self.seek(0)
         self.content_type = s3_object['ContentType']
@@ -139,6 +143,33 @@ class AmazonMediaStorage(MediaStorage):
             return None
         return None
 
+    def open(self, id_or_filename, resource=None):
+        """Get the file info without downloading its content.
+
+        Returns None if no file was found.
+        """
+        id_or_filename = str(id_or_filename)
+        try:
+            obj = self.call('head_object', Key=id_or_filename)
+            if obj:
+                metadata = self.extract_metadata_from_headers(obj['Metadata'])
+                return AmazonObjectWrapper(obj, id_or_filename, metadata)
+        except Exception:
+            return None
+        return None
+
+    def read_range(self, media_file, start, end):
+        """Read range of the file, using ranged GET if its content was not downloaded.
+
+        :param media_file: file returned by ``get`` or ``open``
+        :param int start: first byte position
+        :param int end: last byte position (inclusive)
+        """
+        if media_file.loaded:
+            return read_file_range(media_file, start, end)
+        obj = self.call('get_object', Key=media_file.name, Range='bytes={}-{}'.format(start, end))
+        return iter(lambda: obj['Body'].read(amt=BUFFER_SIZE), b'')
+
     def get_all_keys(self):
         """Return the list of all keys from the bucket."""
         all_keys = []
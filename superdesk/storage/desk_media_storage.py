@@ -15,6 +15,7 @@ import bson
 import gridfs
 import os.path
 from eve.io.mongo.media import GridFSMediaStorage
+from superdesk.media.ranges import read_file_range
 
 
 logger = logging.getLogger(__name__)
@@ -61,7 +62,27 @@ class SuperdeskGridFSMediaStorage(GridFSMediaStorage):
         """
         return self.app.download_url(str(media_id))
 
+    def open(self, _id, resource=None):
+        """Get media file without reading its content, GridFS files are read lazily.
+
+        :param _id: media id
+        :param resource: resource name
+        """
+        return self.get(_id, resource)
+
+    def read_range(self, media_file, start, end):
+        """Read range of media file, only chunks containing the range are fetched.
+
+        :param media_file: media file returned by ``get`` or ``open``
+        :param int start: first byte position
+        :param int end: last byte position (inclusive)
+        """
+        return read_file_range(media_file, start, end)
+
     def fetch_rendition(self, rendition):
+        if rendition.get('lazy') and not rendition.get('media'):
+            from superdesk import get_resource_service
+            return get_resource_service('rendition_cache').get_rendition(rendition['lazy'])
         return self.get(rendition.get('media'), 'upload')
 
     def put(self, content, filename=None, content_type=None, metadata=None, resource=None, folder=None, **kwargs):
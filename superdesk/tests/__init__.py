@@ -96,6 +96,8 @@ def update_config(conf):
     conf['ARCHIVED_MAX_POOL_SIZE'] = 1
     conf['LEGAL_ARCHIVE_MAX_POOL_SIZE'] = 1
     conf['PUBLISH_ASSOCIATED_ITEMS'] = True
+    conf['REFERENCE_CACHE_CHECK_INTERVAL'] = 0
+    conf['AUDIT_BUFFER_SIZE'] = 1
 
     # misc
     conf['GEONAMES_USERNAME'] = 'superdesk_dev'
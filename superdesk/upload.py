@@ -13,11 +13,11 @@ import logging
 import superdesk
 from eve.utils import config
 from superdesk.errors import SuperdeskApiError
-from werkzeug.wsgi import wrap_file
 from .resource import Resource
 from .services import BaseService
 from flask import request, current_app as app, redirect
 from superdesk.media.renditions import generate_renditions, delete_file_on_error
+from superdesk.media.ranges import get_media_file, get_media_response
 from superdesk.media.media_operations import (
     download_file_from_url, download_file_from_encoded_str,
     process_file_from_stream, crop_image, decode_metadata,
@@ -40,24 +40,25 @@ def get_upload_as_data_uri_bc(media_id):
 def get_upload_as_data_uri(media_id):
     if not request.args.get('resource'):
         media_id = app.media.getFilename(media_id)
-        media_file = app.media.get(media_id, 'upload')
+        media_file = get_media_file(media_id, 'upload')
     else:
-        media_file = app.media.get(media_id, request.args['resource'])
+        media_file = get_media_file(media_id, request.args['resource'])
     if media_file:
-        data = wrap_file(request.environ, media_file, buffer_size=1024 * 256)
-        response = app.response_class(
-            data,
-            mimetype=media_file.content_type,
-            direct_passthrough=True)
-        response.content_length = media_file.length
-        response.last_modified = media_file.upload_date
-        response.set_etag(media_file.md5)
-        response.cache_control.max_age = cache_for
-        response.cache_control.s_max_age = cache_for
-        response.cache_control.public = True
-        response.make_conditional(request)
-        response.headers['Content-Disposition'] = 'inline'
-        return response
+        return get_media_response(media_file, cache_for=cache_for)
+    raise SuperdeskApiError.notFoundError('File not found on media storage.')
+
+
+@bp.route('/upload-raw-rendition/<path:media_id>', methods=['GET'])
+def get_lazy_rendition(media_id):
+    """Render lazy rendition on first request, see :func:`superdesk.media.renditions.get_lazy_rendition`."""
+    lazy = {key: request.args[key] for key in ('format', 'width', 'height', 'ratio') if request.args.get(key)}
+    lazy['media'] = media_id
+    service = superdesk.get_resource_service('rendition_cache')
+    if not lazy.get('format') or not service.is_valid(lazy, request.args.get('signature')):
+        raise SuperdeskApiError.notFoundError('Rendition not found.')
+    media_file = service.get_rendition(lazy)
+    if media_file:
+        return get_media_response(media_file, cache_for=cache_for)
     raise SuperdeskApiError.notFoundError('File not found on media storage.')
 
 
@@ -16,6 +16,7 @@ from eve.utils import config
 from superdesk.activity import add_activity, ACTIVITY_CREATE, ACTIVITY_UPDATE
 from superdesk.metadata.item import SIGN_OFF
 from superdesk.services import BaseService
+from superdesk.resource_cache import CacheGenerationMixin
 from superdesk.utils import is_hashed, get_hash, compare_preferences
 from superdesk import get_resource_service
 from superdesk.emails import send_user_status_changed_email, send_activate_account_email
@@ -130,7 +131,7 @@ def get_sign_off(user):
     return user[SIGN_OFF]
 
 
-class UsersService(BaseService):
+class UsersService(CacheGenerationMixin, BaseService):
 
     def __is_invalid_operation(self, user, updates, method):
         """Checks if the requested 'PATCH' or 'DELETE' operation is Invalid.
@@ -20,6 +20,7 @@ from superdesk import privilege
 from superdesk.notification import push_notification
 from superdesk.resource import Resource
 from superdesk.services import BaseService
+from superdesk.resource_cache import CacheGenerationMixin
 from superdesk.users import get_user_from_request
 from superdesk.utc import utcnow
 from superdesk.errors import SuperdeskApiError
@@ -151,7 +152,7 @@ class VocabulariesResource(Resource):
     mongo_indexes = {'field_type': [('field_type', 1)]}
 
 
-class VocabulariesService(BaseService):
+class VocabulariesService(CacheGenerationMixin, BaseService):
 
     system_keys = set(DEFAULT_SCHEMA.keys()).union(set(DEFAULT_EDITOR.keys()))
 
@@ -16,6 +16,9 @@ import asyncio
 import websockets
 import signal
 
+from fnmatch import fnmatchcase
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
 from datetime import timedelta
 from threading import Thread
 from kombu import Queue, Exchange, Connection
@@ -23,7 +26,7 @@ from kombu.mixins import ConsumerMixin
 from kombu.pools import producers
 from superdesk.utc import utcnow
 from superdesk.utils import get_random_string
-from superdesk.default_settings import celery_queue, WS_HEART_BEAT
+from superdesk.default_settings import celery_queue, WS_HEART_BEAT, WS_CLIENT_MAX_PENDING, WS_SEND_TIMEOUT
 from flask import json
 
 
@@ -102,7 +105,7 @@ class SocketMessageConsumer(SocketBrokerClient, ConsumerMixin):
 
         :param string url: Broker URL
         :param string host: host name running the websocket server
-        :param callback: callback function to call on message arrival
+        :param callback: callback function to call on message arrival, it's called from consumer thread
         """
         super().__init__(url, exchange_name)
         self.callback = callback
@@ -123,13 +126,8 @@ class SocketMessageConsumer(SocketBrokerClient, ConsumerMixin):
         :param kombu.Message message: Message object
         """
         try:
-            try:
-                loop = asyncio.get_event_loop()
-            except Exception:
-                loop = asyncio.new_event_loop()
-
             logger.info('Queue: {}. Broadcasting message {}'.format(self.queue_name, body))
-            loop.run_until_complete(self.callback(body))
+            self.callback(body)
         except Exception:
             logger.exception('Dropping event. Failed to send message {}.'.format(body))
         try:
@@ -149,18 +147,140 @@ class SocketMessageConsumer(SocketBrokerClient, ConsumerMixin):
         logger.info('consumer terminated successfully')
 
 
+#: notification extra keys containing desk ids
+DESK_KEYS = ('desk', 'desk_id', 'desks', 'new_desk', 'old_desk', 'from_desk', 'to_desk')
+
+#: notification extra keys containing ids of users the notification is meant for
+USER_KEYS = ('user_id', '_dest')
+
+
+def _get_ids(extra, keys):
+    """Get set of ids stored in notification extra under given keys."""
+    ids = set()
+    for key in keys:
+        value = extra.get(key)
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        for value in values:
+            if isinstance(value, dict):
+                value = value.get('user_id')
+            if value:
+                ids.add(str(value))
+    return ids
+
+
+class ClientSubscription:
+    """Notifications client is interested in and messages waiting to be sent to it.
+
+    Client can limit events using names or patterns like ``item:*`` and scope notifications
+    by desk and user ids. Notifications without any desk or user ids are not filtered by scope.
+
+    Messages with same event and payload waiting to be sent are coalesced, if there are
+    more than ``max_pending`` messages the oldest ones are dropped.
+
+    :param websocket: websocket protocol instance
+    :param max_pending: max number of messages waiting to be sent
+    """
+
+    def __init__(self, websocket, max_pending=WS_CLIENT_MAX_PENDING):
+        self.websocket = websocket
+        self.max_pending = max_pending
+        self.events = None
+        self.desks = None
+        self.users = None
+        self.pending = OrderedDict()
+        self.sending = False
+        self.flush_scheduled = False
+        self.coalesced = 0
+        self.dropped = 0
+
+    def update(self, data):
+        """Set subscription from client message or url query.
+
+        :param dict data: dict with ``events``, ``desks`` and ``users`` lists, missing key means all
+        """
+        for key in ('events', 'desks', 'users'):
+            values = data.get(key)
+            if isinstance(values, str):
+                values = [value for value in values.split(',') if value]
+            setattr(self, key, {str(value) for value in values} if values is not None else None)
+
+    def matches(self, message_data):
+        """Test if client is subscribed to given notification.
+
+        :param dict message_data: notification
+        """
+        event = message_data.get('event', '')
+        if self.events is not None and not any(fnmatchcase(event, pattern) for pattern in self.events):
+            return False
+        extra = message_data.get('extra') or {}
+        for scope, keys in ((self.desks, DESK_KEYS), (self.users, USER_KEYS)):
+            if scope is not None:
+                ids = _get_ids(extra, keys)
+                if ids and not ids.intersection(scope):
+                    return False
+        return True
+
+    def push(self, key, message):
+        """Add message to be sent, replacing pending message with same key.
+
+        :param key: coalescing key
+        :param message: message string
+        """
+        if self.pending.pop(key, None) is not None:
+            self.coalesced += 1
+        self.pending[key] = message
+        while len(self.pending) > self.max_pending:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+
+    @asyncio.coroutine
+    def flush(self, timeout=WS_SEND_TIMEOUT):
+        """Send pending messages.
+
+        Only one flush is sending at a time, messages added meanwhile are sent by it.
+
+        :param timeout: max seconds to wait for single send
+        """
+        self.flush_scheduled = False
+        if self.sending:
+            return
+        self.sending = True
+        try:
+            while self.pending and self.websocket.open:
+                _key, message = self.pending.popitem(last=False)
+                sent = self.websocket.send(message)
+                if asyncio.iscoroutine(sent) or isinstance(sent, asyncio.Future):
+                    yield from asyncio.wait_for(sent, timeout)
+        finally:
+            self.sending = False
+
+
 class SocketCommunication:
     """
     Responsible for websocket comms.
+
+    Clients can send ``{"subscribe": {"events": [...], "desks": [...], "users": [...]}}``
+    message or use same keys in url query (comma separated) to receive only matching notifications.
+
+    :param coalesce_window: seconds to wait before sending notification to client,
+        same notifications received meanwhile are sent only once
+    :param send_timeout: seconds after which slow client is disconnected
+    :param max_pending: max number of messages waiting to be sent per client
     """
 
     clients = set()
 
-    def __init__(self, host, port, broker_url, exchange_name=None):
+    def __init__(self, host, port, broker_url, exchange_name=None, coalesce_window=0,
+                 send_timeout=WS_SEND_TIMEOUT, max_pending=WS_CLIENT_MAX_PENDING):
         self.host = host
         self.port = port
         self.broker_url = broker_url
         self.exchange_name = exchange_name
+        self.coalesce_window = coalesce_window
+        self.send_timeout = send_timeout
+        self.max_pending = max_pending
+        self.loop = None
+        self.subscriptions = {}
         self.messages = {}
         self.event_interval = {
             'ingest:update': 5,
@@ -188,12 +308,82 @@ class SocketCommunication:
             pings += 1
             yield from websocket.send(json.dumps({'ping': pings, 'clients': len(websocket.ws_server.websockets)}))
 
+    @asyncio.coroutine
+    def _client_recv_loop(self, websocket):
+        """Receive subscription messages from client.
+
+        :param websocket: websocket protocol instance
+        """
+        while True:
+            try:
+                message = yield from websocket.recv()
+            except websockets.exceptions.ConnectionClosed:
+                break
+            try:
+                data = json.loads(message)
+                if isinstance(data, dict) and isinstance(data.get('subscribe'), dict):
+                    self._get_subscription(websocket).update(data['subscribe'])
+                    self._log('client subscribed to {}'.format(data['subscribe']), websocket)
+            except ValueError:
+                self._log('invalid client message', websocket)
+
+    def _get_subscription(self, websocket):
+        subscription = self.subscriptions.get(websocket)
+        if subscription is None:
+            subscription = self.subscriptions[websocket] = ClientSubscription(websocket, self.max_pending)
+        return subscription
+
+    @asyncio.coroutine
+    def _flush(self, subscription):
+        """Send pending messages to client, disconnect it if it is too slow.
+
+        :param subscription: client subscription
+        """
+        try:
+            yield from subscription.flush(self.send_timeout)
+        except asyncio.TimeoutError:
+            logger.warning('Closing slow client, dropped {} messages.'.format(len(subscription.pending)))
+            subscription.pending.clear()
+            self.clients.discard(subscription.websocket)
+            self.subscriptions.pop(subscription.websocket, None)
+            closed = subscription.websocket.close()
+            if asyncio.iscoroutine(closed):
+                asyncio.ensure_future(closed)
+        except Exception:
+            logger.debug('Failed to send message to client.')
+
+    def _get_loop(self):
+        return self.loop or asyncio.get_event_loop()
+
+    def _start_flush(self, subscription):
+        asyncio.ensure_future(self._flush(subscription), loop=self._get_loop())
+
+    def _schedule_flush(self, subscription):
+        if subscription.flush_scheduled:
+            return
+        subscription.flush_scheduled = True
+        self._get_loop().call_later(self.coalesce_window, self._start_flush, subscription)
+
+    def broadcast_threadsafe(self, message, timeout=WS_SEND_TIMEOUT):
+        """Broadcast message from other thread using server loop.
+
+        Waits until the message is queued for clients.
+
+        :param message: message as it was received - no encoding/decoding.
+        :param timeout: max seconds to wait for the server loop
+        """
+        asyncio.run_coroutine_threadsafe(self.broadcast(message), self.loop).result(timeout)
+
     @asyncio.coroutine
     def broadcast(self, message):
-        """Broadcast message to all clients.
+        """Broadcast message to all subscribed clients.
 
         If event is in `event_interval` it will only send such event every x seconds.
 
+        Messages are sent to clients in background without waiting, client which is still sending
+        previous messages gets new ones queued. With ``coalesce_window`` the messages are sent after the window.
+        Must run on server loop.
+
         :param message: message as it was received - no encoding/decoding.
         """
         message_data = json.loads(message)
@@ -210,12 +400,19 @@ class SocketCommunication:
             self.messages[message_id] = message_created
 
         logger.debug('broadcast %s' % message)
+        extra = message_data.get('extra') or {}
+        key = (message_id, json.dumps(extra, sort_keys=True))
         for websocket in self.clients.copy():
-            try:
-                if websocket.open:
-                    yield from websocket.send(message)
-            except Exception:
-                yield
+            if not websocket.open:
+                continue
+            subscription = self._get_subscription(websocket)
+            if not subscription.matches(message_data):
+                continue
+            subscription.push(key, message)
+            if self.coalesce_window:
+                self._schedule_flush(subscription)
+            elif not subscription.sending:
+                self._start_flush(subscription)
 
     @asyncio.coroutine
     def _server_loop(self, websocket):
@@ -252,9 +449,15 @@ class SocketCommunication:
             self._log('server done', websocket)
         else:
             self._log('client open', websocket)
+            query = parse_qs(urlparse(path).query)
+            self._get_subscription(websocket).update({key: values[0] for key, values in query.items()
+                                                      if key in ('events', 'desks', 'users')})
             self.clients.add(websocket)
+            recv_task = asyncio.ensure_future(self._client_recv_loop(websocket))
             yield from self._client_loop(websocket)
-            self.clients.remove(websocket)
+            recv_task.cancel()
+            self.clients.discard(websocket)
+            self.subscriptions.pop(websocket, None)
             self._log('client done', websocket)
 
     def run_server(self):
@@ -263,14 +466,14 @@ class SocketCommunication:
         :param config: config dictionary
         """
         try:
-            loop = asyncio.get_event_loop()
+            loop = self.loop = asyncio.get_event_loop()
             server = loop.run_until_complete(websockets.serve(self._connection_handler,
                                                               self.host, self.port))
             loop.add_signal_handler(signal.SIGTERM, loop.stop)
             logger.info('listening on %s:%s' % (self.host, self.port))
             consumer = None
             # create socket message consumer
-            consumer = SocketMessageConsumer(self.broker_url, self.broadcast, self.exchange_name)
+            consumer = SocketMessageConsumer(self.broker_url, self.broadcast_threadsafe, self.exchange_name)
             consumer_thread = Thread(target=consumer.run)
             consumer_thread.start()
             loop.run_forever()
@@ -13,6 +13,7 @@
 import logging
 import logging.handlers
 from superdesk.websockets_comms import SocketCommunication
+from superdesk.default_settings import WS_COALESCE_WINDOW, WS_SEND_TIMEOUT, WS_CLIENT_MAX_PENDING
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +28,10 @@ def create_server(config):
         port = int(config['WS_PORT'])
         broker_url = config['BROKER_URL']
         exchange_name = config.get('WEBSOCKET_EXCHANGE')
-        comms = SocketCommunication(host, port, broker_url, exchange_name)
+        comms = SocketCommunication(host, port, broker_url, exchange_name,
+                                    coalesce_window=float(config.get('WS_COALESCE_WINDOW', WS_COALESCE_WINDOW)),
+                                    send_timeout=int(config.get('WS_SEND_TIMEOUT', WS_SEND_TIMEOUT)),
+                                    max_pending=int(config.get('WS_CLIENT_MAX_PENDING', WS_CLIENT_MAX_PENDING)))
         comms.run_server()
     except Exception:
         logger.exception('Failed to start the WebSocket server.')
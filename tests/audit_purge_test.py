@@ -1,6 +1,8 @@
 
+from flask import g
 from superdesk.tests import TestCase
-from superdesk.audit import PurgeAudit
+from celery.signals import task_postrun
+from superdesk.audit import PurgeAudit, flush_buffer
 from superdesk import get_resource_service
 
 
@@ -17,3 +19,62 @@ class AuditTestCase(TestCase):
 
         PurgeAudit().run()
         self.assertEqual(get_resource_service('audit').find({}).count(), 1)
+
+
+class AuditBufferTestCase(TestCase):
+
+    def setUp(self):
+        self.service = get_resource_service('audit')
+        self.addCleanup(self.app.config.update, {key: self.app.config[key] for key in (
+            'AUDIT_BUFFER_SIZE', 'AUDIT_FLUSH_INTERVAL', 'AUDIT_DELTA_ONLY')})
+        self.app.config['AUDIT_BUFFER_SIZE'] = 3
+        self.app.config['AUDIT_FLUSH_INTERVAL'] = 3600
+
+    def test_write_in_bulk(self):
+        with self.app.test_request_context():
+            g.user = {'_id': 'user'}
+            self.service.on_generic_inserted('desks', [{'_id': 'd1', 'name': 'foo'}])
+            self.service.on_generic_updated('desks', {'name': 'bar'}, {'_id': 'd1', 'name': 'foo'})
+            self.assertEqual(0, self.service.find({}).count())
+
+            self.service.on_generic_deleted('desks', {'_id': 'd1', 'name': 'bar'})
+            self.assertEqual(3, self.service.find({}).count())
+
+            self.service.on_generic_inserted('desks', [{'_id': 'd2', 'name': 'foo'}])
+            self.service.buffer.flush()
+            self.assertEqual(4, self.service.find({}).count())
+
+    def test_delta_only(self):
+        self.app.config['AUDIT_DELTA_ONLY'] = True
+        with self.app.test_request_context():
+            g.user = {'_id': 'user'}
+            updates = {'name': 'bar', 'desk_type': 'production'}
+            self.service.on_generic_inserted('desks', [{'_id': 'd1', 'name': 'foo', 'desk_type': 'production'}])
+            self.service.on_generic_updated('desks', updates, {'_id': 'd1', 'name': 'foo', 'desk_type': 'production'})
+            self.service.buffer.flush()
+            self.assertNotIn('_id', updates)
+
+        audits = {audit['action']: audit for audit in self.service.find({})}
+        self.assertEqual({'_id': 'd1'}, audits['created']['extra'])
+        self.assertEqual({'_id': 'd1', 'name': 'bar'}, audits['updated']['extra'])
+
+    def test_buffered_extra_is_copy(self):
+        with self.app.test_request_context():
+            g.user = {'_id': 'user'}
+            doc = {'_id': 'd1', 'name': 'foo', 'members': [{'user': 'u1'}]}
+            self.service.on_generic_inserted('desks', [doc])
+            doc['members'].append({'user': 'u2'})
+            self.service.buffer.flush()
+
+        audit = next(iter(self.service.find({})))
+        self.assertEqual([{'user': 'u1'}], audit['extra']['members'])
+
+    def test_flush_handler_registered_once(self):
+        self.assertEqual(1, len([receiver for receiver in task_postrun.receivers
+                                 if receiver[0][0] == id(flush_buffer)]))
+
+        with self.app.test_request_context():
+            g.user = {'_id': 'user'}
+            self.service.on_generic_inserted('desks', [{'_id': 'd1', 'name': 'foo'}])
+            flush_buffer()
+        self.assertEqual(1, self.service.find({}).count())
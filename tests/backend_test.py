@@ -12,6 +12,7 @@ from superdesk.tests import TestCase
 from superdesk import get_backend
 from superdesk.utc import utcnow
 from datetime import timedelta
+from superdesk.backend_verifier import verify_samples, SAMPLES_KEY, MISSING_IN_SEARCH, MISSING_IN_MONGO
 
 
 class BackendTestCase(TestCase):
@@ -55,3 +56,76 @@ class BackendTestCase(TestCase):
             date1 = doc_old[self.app.config['DATE_CREATED']]
             date2 = doc_new[self.app.config['DATE_CREATED']]
             self.assertEqual(date1, date2)
+
+    def test_bulk_create_update_delete(self):
+        backend = get_backend()
+        with self.app.app_context():
+            with backend.bulk() as bulk:
+                ids = backend.create('ingest', [{'name': 'foo'}, {'name': 'bar'}])
+                self.assertIsNone(backend.find_one('ingest', None, _id=ids[0]))
+            self.assertEqual([], bulk.errors)
+            self.assertEqual(2, backend.find('ingest', {}).count())
+
+            doc = backend.find_one('ingest', None, _id=ids[0])
+            with backend.bulk():
+                backend.update('ingest', ids[0], {'name': 'baz'}, doc)
+                backend.delete('ingest', {'_id': ids[1]})
+                self.assertIsNotNone(backend.find_one('ingest', None, _id=ids[1]))
+            self.assertEqual('baz', backend.search('ingest', {'query': {'match_all': {}}})[0]['name'])
+            self.assertIsNone(backend.find_one('ingest', None, _id=ids[1]))
+
+    def test_bulk_failed_create_keeps_other_index_actions(self):
+        backend = get_backend()
+        with self.app.app_context():
+            ids = backend.create('ingest', [{'name': 'foo'}, {'name': 'bar'}])
+            doc = backend.find_one('ingest', None, _id=ids[1])
+            with backend.bulk() as bulk:
+                backend.create('ingest', [{'_id': ids[0], 'name': 'duplicate'}])
+                backend.remove_from_search('ingest', doc)
+            self.assertEqual(['create'], [error['action'] for error in bulk.errors])
+            items = list(backend.search('ingest', {'query': {'match_all': {}}}))
+            self.assertEqual([(str(ids[0]), 'foo')], [(str(item['_id']), item['name']) for item in items])
+
+    def test_bulk_partly_failed_create(self):
+        backend = get_backend()
+        with self.app.app_context():
+            ids = backend.create('ingest', [{'name': 'foo'}])
+            with backend.bulk() as bulk:
+                new_ids = backend.create('ingest', [{'_id': ids[0], 'name': 'duplicate'}, {'name': 'bar'}])
+            self.assertEqual([('create', ids[0])], [(error['action'], error['_id']) for error in bulk.errors])
+            self.assertEqual('bar', backend.find_one('ingest', None, _id=new_ids[1])['name'])
+            items = list(backend.search('ingest', {'query': {'match_all': {}}}))
+            self.assertEqual(['bar', 'foo'], sorted(item['name'] for item in items))
+
+    def test_bulk_batch_size(self):
+        backend = get_backend()
+        with self.app.app_context():
+            with backend.bulk(batch_size=3):
+                ids = backend.create('ingest', [{'name': 'foo'}])
+                self.assertIsNone(backend.find_one('ingest', None, _id=ids[0]))
+                backend.create('ingest', [{'name': 'bar'}])
+                self.assertIsNotNone(backend.find_one('ingest', None, _id=ids[0]))
+
+    def test_find_one_mongo_consistency(self):
+        backend = get_backend()
+        self.addCleanup(self.app.config.update, {
+            'BACKEND_FIND_ONE_CONSISTENCY': self.app.config['BACKEND_FIND_ONE_CONSISTENCY'],
+            'BACKEND_VERIFY_SAMPLE_RATE': self.app.config['BACKEND_VERIFY_SAMPLE_RATE'],
+        })
+        self.app.config['BACKEND_FIND_ONE_CONSISTENCY'] = 'mongo'
+        self.app.config['BACKEND_VERIFY_SAMPLE_RATE'] = 1
+        with self.app.app_context():
+            self.app.redis.delete(SAMPLES_KEY)
+            missing_in_search = backend.create_in_mongo('ingest', [{'name': 'foo'}])[0]
+            missing_in_mongo = backend.create('ingest', [{'name': 'bar'}])[0]
+            backend._backend('ingest').remove('ingest', {'_id': missing_in_mongo})
+
+            self.assertIsNotNone(backend.find_one('ingest', None, _id=missing_in_search))
+            self.assertIsNone(backend.find_one('ingest', None, _id=missing_in_mongo))
+
+            mismatches = verify_samples(backend)
+            self.assertEqual({MISSING_IN_SEARCH, MISSING_IN_MONGO}, {m['mismatch'] for m in mismatches})
+            self.assertEqual([], verify_samples(backend))
+
+            items = backend.search('ingest', {'query': {'match_all': {}}})
+            self.assertEqual([str(missing_in_search)], [str(item['_id']) for item in items])
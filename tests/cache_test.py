@@ -2,7 +2,7 @@
 import random
 from time import sleep
 
-from superdesk.cache import cache
+from superdesk.cache import cache, get_cache_stats, LocalCache
 from superdesk.tests import TestCase
 from bson import ObjectId
 
@@ -60,3 +60,28 @@ class CacheTestCase(TestCase):
 
         users = get_users()
         self.assertEqual(users, get_users())
+
+    def test_cache_stats(self):
+        cache.clean()
+        cache.backend.stats.reset()
+        foo.identity('stats')
+        foo.identity('stats')
+        stats = get_cache_stats()['Foo:identity']
+        self.assertGreaterEqual(stats['misses'], 1)
+        self.assertEqual(1, stats['local_hits'])
+
+    def test_local_cache(self):
+        local = LocalCache(max_size=10, ttl=5)
+        local.set('a', 'aaaa')
+        local.set('b', 'bbbb')
+        self.assertEqual('aaaa', local.get('a'))
+        local.set('c', 'cccc')
+        self.assertIsNone(local.get('b'), 'least recently used is evicted')
+        self.assertEqual(8, local.size)
+        local.set('d', 'd' * 11)
+        self.assertIsNone(local.get('d'), 'too big')
+        local.set('e', 'e', ttl=-1)
+        self.assertIsNone(local.get('e'))
+        local.clear()
+        self.assertEqual(0, local.size)
+        self.assertEqual(0, len(local))
@@ -2,6 +2,7 @@
 from unittest.mock import patch
 from superdesk.tests import TestCase
 from apps.publish.enqueue.enqueue_service import EnqueueService
+from superdesk.publish.formatters.ninjs_formatter import NINJSFormatter
 
 
 class NoTakesEnqueueTestCase(TestCase):
@@ -32,3 +33,60 @@ class NoTakesEnqueueTestCase(TestCase):
                 self.service.resend(doc, subscribers)
                 resend.assert_called_with(doc, subscribers, subscriber_codes, {})
                 content_api.assert_called_with(doc, [])
+
+    def test_queue_transmission_formats_once_for_invariant_formatter(self):
+        doc = {'_id': 'test', 'item_id': 'test', 'type': 'text', 'headline': 'test', '_current_version': 1}
+        destination = {'name': 'ninjs', 'format': 'ninjs', 'delivery_type': 'ftp', 'config': {}}
+        subscribers = [{'_id': 'sub%d' % i, 'name': 'sub%d' % i, 'subscriber_type': 'digital',
+                        'destinations': [destination.copy()]} for i in range(3)]
+        with patch.object(NINJSFormatter, 'format_body', return_value=['{}']) as format_body:
+            no_formatters, queued = self.service.queue_transmission(doc, subscribers)
+        self.assertEqual([], no_formatters)
+        self.assertTrue(queued)
+        self.assertEqual(1, format_body.call_count)
+        queue_items = list(self.app.data.find_all('publish_queue'))
+        self.assertEqual(3, len(queue_items))
+        self.assertEqual({'sub0', 'sub1', 'sub2'}, {item['subscriber_id'] for item in queue_items})
+        self.assertEqual({'{}'}, {item['formatted_item'] for item in queue_items})
+
+    def test_queue_transmission_saves_queue_items_in_bulk(self):
+        doc = {'_id': 'test', 'item_id': 'test', 'type': 'text', 'headline': 'test', '_current_version': 1}
+        destination = {'name': 'ninjs', 'format': 'ninjs', 'delivery_type': 'ftp', 'config': {}}
+        subscribers = [{'_id': 'sub%d' % i, 'name': 'sub%d' % i, 'subscriber_type': 'digital',
+                        'destinations': [destination.copy()]} for i in range(3)]
+        with patch('apps.publish.enqueue.enqueue_service.get_resource_service') as get_service:
+            self.service.queue_transmission(doc, subscribers)
+        get_service.return_value.post.assert_called_once()
+        self.assertEqual(3, len(get_service.return_value.post.call_args[0][0]))
+
+    def test_filter_subscribers_evaluates_shared_product_once(self):
+        self.app.data.insert('subscribers', [
+            {'name': 'digi2', 'subscriber_type': 'digital', 'products': self.product_ids},
+        ])
+        subscribers = [s for s in self.app.data.find_all('subscribers')]
+        self.service.get_filters()
+        doc = {'_id': 'test', 'type': 'text', 'headline': 'test'}
+        with patch.object(self.service, 'conforms_content_filter', return_value=True) as conforms:
+            filtered, codes = self.service.filter_subscribers(doc, subscribers, None)
+            self.service.filter_subscribers(doc, subscribers, None)
+        self.assertEqual(2, len(filtered))
+        self.assertEqual(2, conforms.call_count)
+        plan = self.service.subscriber_plan
+        self.assertIs(plan, self.service.get_subscriber_plan(subscribers))
+
+    def test_filter_subscribers_codes_in_products_order(self):
+        product_ids = self.app.data.insert('products', [
+            {'name': 'foo', 'codes': 'foo'},
+            {'name': 'bar', 'codes': 'bar,baz'},
+            {'name': 'baz', 'codes': 'baz'},
+        ])
+        self.app.data.insert('subscribers', [
+            {'name': 'ordered', 'subscriber_type': 'digital', 'codes': 'sub',
+             'products': [product_ids[2], product_ids[0], product_ids[1]]},
+        ])
+        subscribers = [s for s in self.app.data.find_all('subscribers') if s['name'] == 'ordered']
+        self.service.get_filters()
+        doc = {'_id': 'test', 'type': 'text', 'headline': 'test'}
+        with patch.object(self.service, 'conforms_content_filter', return_value=True):
+            filtered, codes = self.service.filter_subscribers(doc, subscribers, None)
+        self.assertEqual(['sub', 'baz', 'foo', 'bar'], codes[subscribers[0]['_id']])
@@ -0,0 +1,83 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+import threading
+
+from unittest.mock import MagicMock, patch
+
+from superdesk.tests import TestCase
+from superdesk.errors import BulkIndexError
+from superdesk.commands.index_from_mongo import IndexFromMongo, prefetch
+
+
+class IndexFromMongoTestCase(TestCase):
+
+    def setUp(self):
+        self.ids = ['item-{:03d}'.format(i) for i in range(50)]
+        self.app.data.get_mongo_collection('archive').insert_many([{'_id': _id} for _id in self.ids])
+        self.indexed = []
+        self.fail_on = set()
+        self.lock = threading.Lock()
+        self.search_backend = MagicMock()
+        self.search_backend.bulk_insert.side_effect = self.bulk_insert
+
+    def bulk_insert(self, resource, items):
+        ids = [item['_id'] for item in items]
+        with self.lock:
+            if self.fail_on.intersection(ids):
+                self.fail_on.difference_update(ids)
+                return 0, [{'index': {'error': 'failed'}}]
+            self.indexed.extend(ids)
+        return len(items), []
+
+    def copy_resource(self, resume=False):
+        with patch.object(self.app.data, '_search_backend', return_value=self.search_backend), \
+                patch.object(IndexFromMongo, 'default_page_size', 5):
+            return IndexFromMongo.copy_resource('archive', 5, workers=3, resume=resume)
+
+    def test_id_ranges(self):
+        with patch.object(IndexFromMongo, 'default_page_size', 5):
+            ranges = IndexFromMongo.get_id_ranges('archive', 4)
+        self.assertEqual(4, len(ranges))
+        self.assertIsNone(ranges[0][0])
+        self.assertIsNone(ranges[-1][1])
+        self.assertEqual(50, sum(count for _lower, _upper, count in ranges))
+        for previous, current in zip(ranges, ranges[1:]):
+            self.assertEqual(previous[1], current[0])
+
+    def test_copy_resource(self):
+        self.copy_resource()
+        self.assertEqual(self.ids, sorted(self.indexed))
+        self.assertEqual([], IndexFromMongo.get_checkpoints('archive'))
+
+    def test_resume_after_failure(self):
+        self.fail_on.add('item-027')
+        with self.assertRaises(BulkIndexError):
+            self.copy_resource()
+        self.assertNotIn('item-027', self.indexed)
+        self.assertTrue(IndexFromMongo.get_checkpoints('archive'))
+
+        indexed_before = len(self.indexed)
+        self.copy_resource(resume=True)
+        self.assertEqual(self.ids, sorted(self.indexed))
+        self.assertLess(len(self.indexed) - indexed_before, len(self.ids))
+        self.assertEqual([], IndexFromMongo.get_checkpoints('archive'))
+
+    def test_prefetch(self):
+        self.assertEqual([1, 2, 3], list(prefetch(iter([1, 2, 3]))))
+
+        def failing():
+            yield 1
+            raise ValueError('failed')
+
+        pages = prefetch(failing())
+        self.assertEqual(1, next(pages))
+        with self.assertRaises(ValueError):
+            next(pages)
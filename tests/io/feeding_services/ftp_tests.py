@@ -14,6 +14,7 @@ import glob
 import os
 import shutil
 import tempfile
+import time
 from unittest import mock
 import datetime
 import pytz
@@ -406,3 +407,43 @@ class FTPTestCase(TestCase):
         )
 
         self.assertEqual(mock_ftp.rename.call_count, 16)
+
+    @mock.patch.object(ftp, 'ftp_open')
+    @mock.patch.object(ftp, 'ftp_connect', new_callable=FakeFTP)
+    @mock.patch.object(ftp.FTPFeedingService, 'get_feed_parser', FakeFeedParser())
+    @mock.patch.object(ftp.FTPFeedingService, '_parse')
+    @mock.patch.object(ftp.FTPFeedingService, '_retrieve')
+    def test_concurrent_processing(self, retrieve, parse, ftp_connect, ftp_open):
+        """Test that files retrieved in parallel are committed and moved in order"""
+        self.app.config['FTP_INGEST_CONCURRENCY'] = 3
+
+        def retrieve_file(ftp, config, filename):
+            time.sleep(0.01 if int(filename[9:-4]) % 2 else 0)
+            return filename
+
+        def parse_file(path, filename, *args):
+            if filename == 'filename_2.xml':
+                raise Exception('Test exception')
+            return [[{'guid': filename}]]
+
+        retrieve.side_effect = retrieve_file
+        parse.side_effect = parse_file
+        update = {}
+        provider = copy.deepcopy(PROVIDER)
+        service = ftp.FTPFeedingService()
+        items = service.update(provider, update)
+
+        self.assertEqual([[{'guid': filename}] for filename, _ in FakeFTP.files if filename != 'filename_2.xml'],
+                         list(items))
+        self.assertEqual(
+            update['private']['last_processed_file_modify'],
+            datetime.datetime.strptime('20170517164756', '%Y%m%d%H%M%S').replace(tzinfo=utc)
+        )
+        mock_ftp = ftp_connect.return_value.__enter__.return_value
+        self.assertEqual(
+            [call[0] for call in mock_ftp.rename.call_args_list],
+            [(filename, '{}/{}'.format('error' if filename == 'filename_2.xml' else 'dest_move', filename))
+             for filename, _ in FakeFTP.files]
+        )
+        self.assertLessEqual(ftp_open.call_count, 3)
+        self.assertTrue(ftp_open.return_value.close.called)
@@ -0,0 +1,109 @@
+import time
+import threading
+
+from superdesk.tests import TestCase
+from superdesk.lock import lock, unlock, touch, MemoryLock, RedisLock
+
+
+class MemoryLockTestCase(TestCase):
+
+    def test_lock_api(self):
+        self.addCleanup(self.app.config.update, {'LOCK_BACKEND': self.app.config['LOCK_BACKEND']})
+        self.app.config['LOCK_BACKEND'] = 'memory'
+        token = lock('memory-test', expire=10)
+        self.assertTrue(token)
+        self.assertFalse(lock('memory-test', expire=10))
+        self.assertTrue(touch('memory-test', expire=20))
+        unlock('memory-test')
+        self.assertGreater(lock('memory-test', expire=10), token, 'fencing token is increasing')
+        unlock('memory-test')
+
+    def test_expire(self):
+        backend = MemoryLock()
+        self.assertTrue(backend.lock('foo', 'a', expire=0.1))
+        self.assertFalse(backend.lock('foo', 'b'))
+        time.sleep(0.2)
+        self.assertTrue(backend.lock('foo', 'b'))
+        self.assertFalse(backend.touch('foo', 'a'), 'only owner can renew')
+        self.assertFalse(backend.release('foo', 'a'), 'only owner can release')
+
+    def test_wait_for_release(self):
+        backend = MemoryLock()
+        backend.lock('foo', 'a', expire=60)
+        threading.Timer(0.1, backend.release, args=('foo', 'a')).start()
+        start = time.monotonic()
+        self.assertTrue(backend.lock('foo', 'b', timeout=5))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertFalse(backend.lock('foo', 'c', timeout=0.1))
+
+
+class RedisLockTestCase(TestCase):
+
+    key = 'redis-lock-test'
+
+    def setUp(self):
+        self.redis = self.app.redis
+        self.backend = RedisLock(self.redis)
+        keys = [self.backend._key(self.key), self.backend._key(self.key, 'fence'),
+                self.backend._key(self.key, 'released')]
+        self.redis.delete(*keys)
+        self.addCleanup(self.redis.delete, *keys)
+
+    def test_lock_api(self):
+        self.addCleanup(self.app.config.update, {'LOCK_BACKEND': self.app.config['LOCK_BACKEND']})
+        self.app.config['LOCK_BACKEND'] = 'redis'
+        token = lock(self.key, expire=10)
+        self.assertTrue(token)
+        self.assertFalse(lock(self.key, expire=10))
+        self.assertTrue(touch(self.key, expire=20))
+        self.assertTrue(unlock(self.key))
+        self.assertGreater(lock(self.key, expire=10), token, 'fencing token is increasing')
+        unlock(self.key)
+
+    def test_fencing_token(self):
+        first = self.backend.lock(self.key, 'a', expire=10)
+        self.assertEqual(1, self.backend.release(self.key, 'a'))
+        second = self.backend.lock(self.key, 'b', expire=10)
+        self.assertEqual(first + 1, second)
+        self.assertEqual(b'b', self.redis.get(self.backend._key(self.key)))
+
+    def test_release_only_by_owner(self):
+        self.assertTrue(self.backend.lock(self.key, 'a', expire=10))
+        self.assertEqual(0, self.backend.release(self.key, 'b'))
+        self.assertFalse(self.backend.lock(self.key, 'b'))
+        self.assertEqual(1, self.backend.release(self.key, 'a'))
+        self.assertIsNone(self.redis.get(self.backend._key(self.key)), 'released lock is removed')
+        released = self.backend._key(self.key, 'released')
+        self.assertEqual(1, self.redis.llen(released))
+        self.assertLessEqual(self.redis.ttl(released), 10)
+
+    def test_expire(self):
+        self.assertTrue(self.backend.lock(self.key, 'a', expire=0.1))
+        self.assertGreater(self.redis.pttl(self.backend._key(self.key)), 0)
+        self.assertFalse(self.backend.lock(self.key, 'b'))
+        time.sleep(0.2)
+        self.assertTrue(self.backend.lock(self.key, 'b', expire=10))
+        self.assertEqual(0, self.backend.release(self.key, 'a'), 'expired owner can not release')
+
+    def test_touch(self):
+        self.assertTrue(self.backend.lock(self.key, 'a', expire=1))
+        self.assertEqual(0, self.backend.touch(self.key, 'b', expire=60), 'only owner can renew')
+        self.assertLessEqual(self.redis.pttl(self.backend._key(self.key)), 1000)
+        self.assertEqual(1, self.backend.touch(self.key, 'a', expire=60))
+        self.assertGreater(self.redis.pttl(self.backend._key(self.key)), 1000)
+        self.assertEqual(1, self.backend.touch(self.key, 'a', expire=None))
+        self.assertEqual(-1, self.redis.pttl(self.backend._key(self.key)), 'lock without expiry')
+
+    def test_wait_for_release(self):
+        self.backend.lock(self.key, 'a', expire=60)
+        threading.Timer(0.1, self.backend.release, args=(self.key, 'a')).start()
+        start = time.monotonic()
+        self.assertTrue(self.backend.lock(self.key, 'b', timeout=5, expire=10))
+        self.assertLess(time.monotonic() - start, 2, 'waiting is woken up by release')
+        self.assertFalse(self.backend.lock(self.key, 'c', timeout=0.1))
+
+    def test_wait_for_expiry(self):
+        self.backend.lock(self.key, 'a', expire=0.5)
+        start = time.monotonic()
+        self.assertTrue(self.backend.lock(self.key, 'b', timeout=5, expire=10))
+        self.assertLess(time.monotonic() - start, 3, 'waiting is limited by lock ttl')
@@ -9,13 +9,15 @@
 # at https://www.sourcefabric.org/superdesk/license
 
 from unittest import mock
+from PIL import Image
 from nose.tools import assert_raises
 
 from superdesk.tests import TestCase
 from superdesk.media.crop import CropService
 from superdesk.errors import SuperdeskApiError
 from superdesk.media.media_operations import crop_image
-from superdesk.media.renditions import _resize_image, get_renditions_spec, can_generate_custom_crop_from_original
+from superdesk.media.renditions import _resize_image, get_renditions_spec, can_generate_custom_crop_from_original, \
+    render_renditions
 from apps.prepopulate.app_populate import populate_table_json
 
 from ..media import get_picture_fixture
@@ -171,6 +173,27 @@ class CropTestCase(TestCase):
             resized, width, height = _resize_image(imgfile, ('200', None), 'jpeg')
             self.assertEqual(150, height)
 
+    def test_render_renditions(self):
+        img = get_picture_fixture()
+        specs = [('baseImage', {'width': 400, 'height': 400}), ('thumbnail', {'width': '100'}),
+                 ('square', {'ratio': '1:1'}), ('viewImage', {'width': 200, 'height': 200})]
+        with open(img, 'rb') as imgfile:
+            rendered = render_renditions(imgfile, specs, 'jpeg', workers=2)
+            imgfile.seek(0)
+            _, width, height = _resize_image(imgfile, (400, 400), 'jpeg')
+
+        self.assertEqual(['baseImage', 'thumbnail', 'square', 'viewImage'], [rendition for rendition, _ in rendered])
+        base = rendered[0][1]
+        self.assertEqual((width, height), (base['width'], base['height']))
+        self.assertEqual(100, rendered[1][1]['width'])
+        self.assertEqual(min(width, height), rendered[2][1]['width'])
+        self.assertEqual(rendered[2][1]['width'], rendered[2][1]['height'])
+        cropping_data = rendered[2][1]['cropping_data']
+        self.assertEqual(cropping_data['CropRight'] - cropping_data['CropLeft'], rendered[2][1]['width'])
+        for _, output in rendered:
+            self.assertEqual('image/jpeg', output['content_type'])
+            self.assertEqual((output['width'], output['height']), Image.open(output['content']).size)
+
     def test_get_rendition_spec_no_custom_crop(self):
         renditions = get_renditions_spec(no_custom_crops=True)
         for crop in self.crop_sizes.get('items'):
@@ -0,0 +1,82 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+from io import BytesIO
+from urllib.parse import urlparse
+from PIL import Image
+from flask import current_app as app
+
+from superdesk import get_resource_service
+from superdesk.tests import TestCase
+from superdesk.upload import url_for_media
+from superdesk.media.renditions import generate_renditions, get_renditions_spec
+from apps.prepopulate.app_populate import populate_table_json
+
+from ..media import get_picture_fixture
+
+
+class LazyRenditionsTestCase(TestCase):
+
+    crop_sizes = {
+        '_id': 'crop_sizes',
+        'display_name': 'Image Crop Sizes',
+        'type': 'manageable',
+        'items': [
+            {'is_active': True, 'name': '2-1', 'width': 200, 'height': 100},
+            {'is_active': True, 'name': 'square', 'ratio': '1:1'},
+        ]
+    }
+
+    def setUp(self):
+        populate_table_json('vocabularies', [self.crop_sizes])
+        self.addCleanup(self.app.config.update, {'RENDITIONS_LAZY': self.app.config['RENDITIONS_LAZY']})
+        self.app.config['RENDITIONS_LAZY'] = True
+
+    def generate_renditions(self):
+        with open(get_picture_fixture(), 'rb') as f:
+            media_id = app.media.put(f, filename='original.jpg', content_type='image/jpeg')
+            f.seek(0)
+            return generate_renditions(BytesIO(f.read()), media_id, [], 'image', 'image/jpeg',
+                                       get_renditions_spec(), url_for_media)
+
+    def get(self, href):
+        url = urlparse(href)
+        return self.app.test_client().get('{}?{}'.format(url.path, url.query))
+
+    def test_custom_crops_are_lazy(self):
+        renditions = self.generate_renditions()
+        self.assertIn('media', renditions['thumbnail'])
+        self.assertNotIn('media', renditions['2-1'])
+        self.assertEqual(renditions['baseImage']['media'], renditions['2-1']['lazy']['media'])
+        self.assertEqual(renditions['square']['width'], renditions['square']['height'])
+
+        for name in ('2-1', 'square'):
+            response = self.get(renditions[name]['href'])
+            self.assertEqual(200, response.status_code)
+            self.assertEqual((renditions[name]['width'], renditions[name]['height']),
+                             Image.open(BytesIO(response.get_data())).size)
+
+        self.get(renditions['square']['href'])
+        self.assertEqual(2, get_resource_service('rendition_cache').find({}).count())
+
+    def test_invalid_signature(self):
+        renditions = self.generate_renditions()
+        response = self.get(renditions['2-1']['href'].replace('width=200', 'width=2000'))
+        self.assertEqual(404, response.status_code)
+
+    def test_evict(self):
+        renditions = self.generate_renditions()
+        self.get(renditions['2-1']['href'])
+        self.get(renditions['square']['href'])
+        service = get_resource_service('rendition_cache')
+        service.evict(max_size=service.find_one(req=None, key={'$regex': ':1:1$'})['size'])
+        cached = list(service.find({}))
+        self.assertEqual(1, len(cached))
+        self.assertTrue(cached[0]['key'].endswith(':1:1'))
@@ -0,0 +1,96 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+from io import BytesIO
+from unittest import mock
+from urllib.parse import urlparse
+
+from superdesk.tests import TestCase
+
+DATA = b'0123456789' * 100
+
+
+class GetOnlyMediaStorage():
+    """Media storage without ``open`` and ``read_range``."""
+
+    def __init__(self, media):
+        self.media = media
+
+    def get(self, media_id, resource=None):
+        return self.media.get(media_id, resource)
+
+    def getFilename(self, media_id):
+        return self.media.getFilename(media_id)
+
+
+class RangeRequestsTestCase(TestCase):
+
+    def setUp(self):
+        media_id = self.app.media.put(BytesIO(DATA), filename='data.txt', content_type='text/plain')
+        self.url = urlparse(self.app.media.url_for_media(media_id)).path
+
+    def get(self, **headers):
+        return self.app.test_client().get(self.url, headers=headers)
+
+    def test_full(self):
+        response = self.get()
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('bytes', response.headers['Accept-Ranges'])
+        self.assertEqual(DATA, response.get_data())
+
+    def test_single_range(self):
+        response = self.get(Range='bytes=10-19')
+        self.assertEqual(206, response.status_code)
+        self.assertEqual('bytes 10-19/1000', response.headers['Content-Range'])
+        self.assertEqual(DATA[10:20], response.get_data())
+
+        response = self.get(Range='bytes=-5')
+        self.assertEqual(206, response.status_code)
+        self.assertEqual(DATA[-5:], response.get_data())
+
+        response = self.get(Range='bytes=995-')
+        self.assertEqual('bytes 995-999/1000', response.headers['Content-Range'])
+        self.assertEqual(DATA[995:], response.get_data())
+
+    def test_multiple_ranges(self):
+        response = self.get(Range='bytes=0-1,500-509')
+        self.assertEqual(206, response.status_code)
+        self.assertTrue(response.mimetype.startswith('multipart/byteranges'))
+        body = response.get_data()
+        self.assertEqual(len(body), response.content_length)
+        self.assertIn(b'Content-Range: bytes 0-1/1000\r\n\r\n01\r\n', body)
+        self.assertIn(b'Content-Range: bytes 500-509/1000\r\n\r\n0123456789\r\n', body)
+
+    def test_not_satisfiable(self):
+        response = self.get(Range='bytes=2000-3000')
+        self.assertEqual(416, response.status_code)
+        self.assertEqual('bytes */1000', response.headers['Content-Range'])
+
+    def test_if_range(self):
+        etag = self.get().headers['ETag']
+        self.assertEqual(206, self.get(Range='bytes=0-1', **{'If-Range': etag}).status_code)
+        response = self.get(Range='bytes=0-1', **{'If-Range': '"foo"'})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(DATA, response.get_data())
+
+    def test_invalid_unit(self):
+        response = self.get(Range='items=0-1')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(DATA, response.get_data())
+
+    def test_storage_without_range_support(self):
+        with mock.patch.object(self.app, 'media', GetOnlyMediaStorage(self.app.media)):
+            response = self.get(Range='bytes=10-19')
+            self.assertEqual(206, response.status_code)
+            self.assertEqual(DATA[10:20], response.get_data())
+
+            response = self.get(Range='bytes=0-1,500-509')
+            self.assertEqual(206, response.status_code)
+            self.assertIn(b'\r\n\r\n0123456789\r\n', response.get_data())
@@ -9,11 +9,11 @@
 # at https://www.sourcefabric.org/superdesk/license
 
 import mimetypes
-from superdesk.publish.transmitters.email import EmailPublishService
+from superdesk.publish.transmitters.email import EmailPublishService, smtp_pool
 from superdesk.tests import TestCase
 from superdesk.publish import init_app
 import os
-from unittest.mock import Mock, call
+from unittest.mock import Mock, call, patch
 
 
 class MockMediaFS:
@@ -44,6 +44,9 @@ class MockMail:
         self.send = Mock()
         self.send.side_effect = self._send
 
+    def connect(self):
+        return MockConnection(self)
+
     def _send(self, message):
         if message.subject != 'Test Subject':
             raise ValueError('Unexpected Subjet')
@@ -51,6 +54,20 @@ class MockMail:
             raise Exception('Wrong number of attachments')
 
 
+class MockConnection:
+
+    host = None
+
+    def __init__(self, mail):
+        self.send = mail.send
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
 class EmailPublishServiceTest(TestCase):
     filename = "IPTC-PhotometadataRef-Std2017.1.jpg"
 
@@ -62,6 +79,7 @@ class EmailPublishServiceTest(TestCase):
         self.app.mail = MockMail()
 
     def tearDown(self):
+        smtp_pool.clear()
         self.app.mail = self._mail
         self.app.media = self._media
 
@@ -87,3 +105,29 @@ class EmailPublishServiceTest(TestCase):
 
         transmitter = EmailPublishService()
         transmitter._transmit(queue_item=queue_item, subscriber={})
+
+    def test_lazy_rendition_attachment(self):
+        queue_item = {
+            'item_id': '123',
+            'destination': {
+                'delivery_type': 'email',
+                'config': {
+                    'media_cid': 'MainImage',
+                    'media_rendition': 'viewImage',
+                    'recipients': 'a@b.c.d',
+                    'attach_media': True,
+                },
+                'name': 'Email',
+                'format': 'Email'
+            },
+            'formatted_item': '{"message_text": "Test", "message_html": "<p>Test</p>", '
+                              '"message_subject": "Test Subject", '
+                              '"renditions": {"viewImage": {"lazy": {"media": "1234", "width": 640}}}}'
+        }
+
+        rendition_cache = Mock()
+        rendition_cache.get_rendition.return_value = self.app.media
+        with patch('superdesk.publish.transmitters.email.get_resource_service', return_value=rendition_cache):
+            EmailPublishService()._transmit(queue_item=queue_item, subscriber={})
+        rendition_cache.get_rendition.assert_called_once_with({'media': '1234', 'width': 640})
+        self.assertEqual(1, self.app.mail.send.call_count)
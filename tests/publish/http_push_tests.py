@@ -151,7 +151,7 @@ class HTTPPushPublishTestCase(unittest.TestCase):
         self.assertEqual(item['version'], 2)
 
     @mock.patch('superdesk.errors.notifiers')
-    @mock.patch('requests.post')
+    @mock.patch('requests.Session.post')
     def test_client_publish_error_thrown(self, fake_post, fake_notifiers):
         with self.app.app_context():
             raise_http_exception = Mock(side_effect=PublishHTTPPushClientError.httpPushError(Exception('client 4xx')))
@@ -168,7 +168,7 @@ class HTTPPushPublishTestCase(unittest.TestCase):
                 service._push_item(self.destination, json.dumps(self.item))
 
     @mock.patch('superdesk.errors.notifiers')
-    @mock.patch('requests.post')
+    @mock.patch('requests.Session.post')
     def test_server_publish_error_thrown(self, fake_post, fake_notifiers):
         with self.app.app_context():
             raise_http_exception = Mock(side_effect=PublishHTTPPushServerError.httpPushError(Exception('server 5xx')))
@@ -186,7 +186,7 @@ class HTTPPushPublishTestCase(unittest.TestCase):
 
     @mock.patch('superdesk.publish.transmitters.http_push.app')
     @mock.patch('superdesk.publish.transmitters.http_push.requests.Session.send', return_value=CreatedResponse)
-    @mock.patch('requests.get', return_value=NotFoundResponse)
+    @mock.patch('requests.Session.get', return_value=NotFoundResponse)
     def test_push_associated_assets(self, get_mock, send_mock, app_mock):
         app_mock.media.get.return_value = TestMedia(b'bin')
 
@@ -215,7 +215,7 @@ class HTTPPushPublishTestCase(unittest.TestCase):
 
     @mock.patch('superdesk.publish.transmitters.http_push.app')
     @mock.patch('superdesk.publish.transmitters.http_push.requests.Session.send', return_value=CreatedResponse)
-    @mock.patch('requests.get', return_value=NotFoundResponse)
+    @mock.patch('requests.Session.get', return_value=NotFoundResponse)
     def test_push_attachments(self, get_mock, send_mock, app_mock):
         app_mock.media.get.return_value = TestMedia(b'bin')
 
@@ -242,8 +242,37 @@ class HTTPPushPublishTestCase(unittest.TestCase):
         self.assertEqual(request.headers['x-superdesk-signature'],
                          'sha1=%s' % hmac.new(b'foo', request.body, 'sha1').hexdigest())
 
+    @mock.patch('superdesk.publish.transmitters.http_push.get_resource_service')
+    @mock.patch('superdesk.publish.transmitters.http_push.app')
+    @mock.patch('superdesk.publish.transmitters.http_push.requests.Session.send', return_value=CreatedResponse)
+    @mock.patch('requests.Session.get', return_value=NotFoundResponse)
+    def test_push_lazy_renditions(self, get_mock, send_mock, app_mock, service_mock):
+        rendered = TestMedia(b'rendered')
+        rendered._id = 'rendered-id'
+        service_mock.return_value.get_rendition.return_value = rendered
+        app_mock.media.get.return_value = rendered
+
+        lazy = {'media': 'base-id', 'ratio': '1:1', 'format': 'jpeg'}
+        dest = {'config': {'assets_url': 'http://example.com'}}
+        item = {
+            'type': 'picture',
+            'renditions': {
+                'baseImage': {'media': 'base-id', 'mimetype': 'image/jpeg', 'href': 'http://localhost/base'},
+                'square': {'lazy': lazy, 'mimetype': 'image/jpeg', 'href': 'http://localhost/square'},
+            },
+        }
+
+        service = HTTPPushService()
+        service._copy_published_media_files(item, dest)
+
+        service_mock.assert_called_with('rendition_cache')
+        service_mock.return_value.get_rendition.assert_called_once_with(lazy)
+        get_mock.assert_any_call('http://example.com/base-id')
+        get_mock.assert_any_call('http://example.com/rendered-id')
+        app_mock.media.get.assert_any_call('rendered-id', resource='upload')
+
     @mock.patch('superdesk.publish.transmitters.http_push.requests.Session.send', return_value=CreatedResponse)
-    @mock.patch('requests.get', return_value=NotFoundResponse)
+    @mock.patch('requests.Session.get', return_value=NotFoundResponse)
     def test_push_binaries(self, get_mock, send_mock):
         media = TestMedia(b'content')
         dest = {'config': {'assets_url': 'http://example.com', 'secret_token': 'foo'}}
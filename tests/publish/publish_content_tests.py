@@ -380,3 +380,39 @@ class TransmitItemTestCase(TestCase):
         pending_item = self.app.data.find_one('publish_queue', req=None, _id=items[1].get('_id'))
         self.assertEqual(pending_item['state'], 'pending')
         self.app.config['CELERY_TASK_ALWAYS_EAGER'] = True
+
+
+class TransmitDestinationItemsTestCase(TestCase):
+
+    @mock.patch('superdesk.publish.publish_content.transmit_item')
+    def test_transmit_by_destination(self, transmit_item):
+        from superdesk.publish.publish_content import transmit_destination_items
+
+        queue_items = [
+            {'_id': 1, 'subscriber_id': 's1', 'destination': {'name': 'ftp', 'delivery_type': 'ftp'}},
+            {'_id': 2, 'subscriber_id': 's1', 'destination': {'name': 'push', 'delivery_type': 'http_push'}},
+            {'_id': 3, 'subscriber_id': 's1', 'destination': {'name': 'ftp', 'delivery_type': 'ftp'}},
+            {'_id': 4, 'subscriber_id': 's1', 'destination': {'name': 'push', 'delivery_type': 'http_push'}},
+        ]
+
+        transmit_destination_items(queue_items)
+
+        transmitted = [call[1]['args'][0] for call in transmit_item.apply.call_args_list]
+        self.assertEqual([1, 2, 3, 4], sorted(transmitted))
+        self.assertLess(transmitted.index(1), transmitted.index(3))
+        self.assertLess(transmitted.index(2), transmitted.index(4))
+
+    def test_queue_metrics(self):
+        from superdesk.publish.publish_content import get_queue_metrics
+
+        self.app.data.insert('publish_queue', [
+            {'state': 'pending', 'item_id': 'item_1', 'subscriber_id': 's1', 'destination': {'name': 'ftp'},
+             '_created': utcnow() - timedelta(minutes=5)},
+            {'state': 'pending', 'item_id': 'item_2', 'subscriber_id': 's1', 'destination': {'name': 'ftp'}},
+            {'state': 'success', 'item_id': 'item_3', 'subscriber_id': 's1', 'destination': {'name': 'ftp'}},
+        ])
+
+        metrics = get_queue_metrics()
+        self.assertEqual(1, len(metrics))
+        self.assertEqual(2, metrics[0]['depth'])
+        self.assertGreaterEqual(metrics[0]['lag'], 300)
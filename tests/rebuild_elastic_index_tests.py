@@ -12,8 +12,10 @@
 from superdesk.tests import TestCase
 from eve.utils import ParsedRequest
 from superdesk import get_resource_service
-from superdesk.commands.rebuild_elastic_index import RebuildElasticIndex
+from superdesk.commands.rebuild_elastic_index import RebuildElasticIndex, copy_index
+from superdesk.elastic_rebuild import get_rebuild_targets
 from time import sleep
+from unittest.mock import patch
 
 
 class RebuildIndexTestCase(TestCase):
@@ -31,3 +33,34 @@ class RebuildIndexTestCase(TestCase):
         req.max_results = 25
         items = get_resource_service('ingest').get(req, {})
         self.assertEqual(10, items.count())
+
+
+class OnlineRebuildIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.app.config['ELASTIC_REBUILD_CHECK_INTERVAL'] = 0
+        data = [{'headline': 'test {}'.format(i), 'slugline': 'rebuild {}'.format(i),
+                 'type': 'text'} for i in range(5)]
+        self.ids = get_resource_service('ingest').post(data)
+
+    def test_keep_changes_done_while_copying(self):
+        service = get_resource_service('ingest')
+
+        def copy_and_change(*args):
+            copied = copy_index(*args)
+            service.post([{'headline': 'new', 'type': 'text'}])
+            service.delete_action({'_id': self.ids[0]})
+            return copied
+
+        with patch('superdesk.commands.rebuild_elastic_index.copy_index', side_effect=copy_and_change):
+            RebuildElasticIndex().run(online=True, batch_size=2)
+        sleep(1)  # sleep so Elastic has time to refresh the indexes
+
+        req = ParsedRequest()
+        req.args = {}
+        req.max_results = 25
+        items = list(service.get(req, {}))
+        self.assertEqual(5, len(items))
+        self.assertIn('new', [item['headline'] for item in items])
+        self.assertNotIn(self.ids[0], [item['_id'] for item in items])
+        self.assertEqual({}, get_rebuild_targets())
@@ -0,0 +1,72 @@
+# -*- coding: utf-8; -*-
+#
+# This file is part of Superdesk.
+#
+# Copyright 2013 - 2018 Sourcefabric z.u. and contributors.
+#
+# For the full copyright and license information, please see the
+# AUTHORS and LICENSE files distributed with this source code, or
+# at https://www.sourcefabric.org/superdesk/license
+
+from superdesk import get_resource_service
+from superdesk.resource_cache import ResourceCache, ReferenceCache, get_generations, get_reference_cache, get_desk
+from superdesk.tests import TestCase
+
+
+class ResourceCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.cache = ResourceCache(['products'])
+
+    def test_reload_only_when_modified(self):
+        service = get_resource_service('products')
+        service.post([{'_id': 'p1', 'name': 'foo'}])
+        self.assertEqual({'products'}, self.cache.refresh())
+        self.assertEqual('foo', self.cache.get('products')['p1']['name'])
+        self.assertEqual(set(), self.cache.refresh())
+
+        service.patch('p1', {'name': 'bar'})
+        self.assertEqual({'products'}, self.cache.refresh())
+        self.assertEqual('bar', self.cache.get('products')['p1']['name'])
+
+        service.delete_action({'_id': 'p1'})
+        self.assertEqual({'products'}, self.cache.refresh())
+        self.assertEqual({}, self.cache.get('products'))
+
+    def test_generation_is_created_on_first_refresh(self):
+        self.assertEqual({}, get_generations(['products']))
+        self.cache.refresh()
+        self.assertIn('products', get_generations(['products']))
+        self.assertEqual(set(), self.cache.refresh())
+
+
+class ReferenceCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.cache = ReferenceCache(['desks'])
+
+    def test_get_and_invalidate(self):
+        service = get_resource_service('desks')
+        ids = service.post([{'name': 'sports'}, {'name': 'politics'}])
+        self.assertEqual('sports', self.cache.get('desks', ids[0])['name'])
+        self.assertEqual('sports', self.cache.get('desks', str(ids[0]))['name'])
+        self.assertEqual(2, len(self.cache.get_many('desks', ids)))
+        self.assertIsNone(self.cache.get('desks', None))
+
+        stats = self.cache.get_stats()['desks']
+        self.assertEqual(2, stats['hits'])
+        self.assertEqual(2, stats['misses'])
+        self.assertEqual(0.5, stats['hit_rate'])
+        self.assertEqual(2, stats['size'])
+
+        service.patch(ids[0], {'name': 'sport'})
+        self.assertEqual('sport', self.cache.get('desks', ids[0])['name'])
+        self.assertEqual(3, self.cache.get_stats()['desks']['misses'])
+
+    def test_accessors_use_app_cache(self):
+        ids = get_resource_service('desks').post([{'name': 'sports'}])
+        self.assertEqual('sports', get_desk(ids[0])['name'])
+        self.assertEqual('sports', get_desk(ids[0])['name'])
+        self.assertGreaterEqual(get_reference_cache().get_stats()['desks']['hits'], 1)
+        get_resource_service('desks').patch(ids[0], {'name': 'sport'})
+        self.assertEqual('sport', get_desk(ids[0])['name'])
@@ -55,3 +55,34 @@ class SequencesTestCase(TestCase):
                 min_seq_number=self.min_seq_number
             )
             self.assertEqual(last_sequence_number, self.min_seq_number)
+
+    def test_reserve_sequence_numbers(self):
+        with self.app.app_context():
+            self.assertEqual([1, 2, 3], self.service.get_next_sequence_numbers('test_sequence_2', 3))
+            self.assertEqual(4, self.service.get_next_sequence_number('test_sequence_2'))
+
+    def test_reserve_sequence_numbers_wraps_around(self):
+        with self.app.app_context():
+            numbers = self.service.get_next_sequence_numbers(
+                'test_sequence_3', 8,
+                max_seq_number=self.max_seq_number,
+                min_seq_number=self.min_seq_number
+            )
+            self.assertEqual([1, 2, 3, 4, 5, 6, 7, 8], numbers)
+            numbers = self.service.get_next_sequence_numbers(
+                'test_sequence_3', 5,
+                max_seq_number=self.max_seq_number,
+                min_seq_number=self.min_seq_number
+            )
+            self.assertEqual([9, 10, 1, 2, 3], numbers)
+            self.assertEqual(4, self.service.get_next_sequence_number(
+                'test_sequence_3',
+                max_seq_number=self.max_seq_number,
+                min_seq_number=self.min_seq_number
+            ))
+
+    def test_sequence_number_from_block(self):
+        with self.app.app_context():
+            numbers = [self.service.get_next_sequence_number_from_block('test_sequence_4', 5) for i in range(7)]
+            self.assertEqual([1, 2, 3, 4, 5, 6, 7], numbers)
+            self.assertEqual(11, self.service.get_next_sequence_number('test_sequence_4'))
@@ -57,6 +57,17 @@ class AmazonMediaStorageTestCase(TestCase):
                     dict(Bucket='acname', Key=path)
                 )
 
+    def test_ranged_get(self):
+        with patch.object(self.amazon, 'client') as s3:
+            s3.head_object.return_value = {'ContentType': 'text/plain', 'ContentLength': 10, 'Metadata': {},
+                                           'LastModified': utcnow(), 'ETag': '"etag"'}
+            media_file = self.amazon.open('test')
+            self.assertFalse(s3.get_object.called)
+            self.assertEqual(10, media_file.length)
+            s3.get_object.return_value = {'Body': Mock(read=Mock(side_effect=[b'2345', b'']))}
+            self.assertEqual([b'2345'], list(self.amazon.read_range(media_file, 2, 5)))
+            self.assertEqual(s3.get_object.call_args[1], dict(Bucket='acname', Key='test', Range='bytes=2-5'))
+
     def test_put_and_delete(self):
         """Test amazon if configured.
 
@@ -1,6 +1,8 @@
 
+import time
 import asyncio
 import unittest
+import threading
 from json import dumps
 from datetime import datetime, timedelta
 from superdesk.websockets_comms import SocketCommunication
@@ -16,6 +18,14 @@ class TestClient():
         self.messages.append(message)
 
 
+class SlowClient(TestClient):
+
+    @asyncio.coroutine
+    def send(self, message):
+        yield from asyncio.sleep(1)
+        self.messages.append(message)
+
+
 class WebsocketsTestCase(unittest.TestCase):
 
     def test_broadcast(self):
@@ -49,3 +59,85 @@ class WebsocketsTestCase(unittest.TestCase):
             'event': 'ingest:update',
             '_created': (datetime.now() + timedelta(seconds=3600)).isoformat()})))
         self.assertEqual(4, len(client.messages))
+
+    def test_subscriptions(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        com = SocketCommunication('host', 'port', 'url')
+        com.clients = set()
+        all_client = TestClient()
+        desk_client = TestClient()
+        com.clients.update([all_client, desk_client])
+        com._get_subscription(desk_client).update({'events': ['item:*'], 'desks': 'desk1,desk2'})
+
+        for event, extra in (
+            ('item:move', {'from_desk': 'desk1', 'to_desk': 'desk3'}),
+            ('item:move', {'from_desk': 'desk3', 'to_desk': 'desk4'}),
+            ('item:lock', {'item': 'foo'}),
+            ('user:update', {'user_id': 'user1'}),
+        ):
+            loop.run_until_complete(com.broadcast(dumps({'event': event, 'extra': extra})))
+
+        self.assertEqual(4, len(all_client.messages))
+        self.assertEqual(2, len(desk_client.messages))
+        self.assertIn('desk1', desk_client.messages[0])
+        self.assertIn('item:lock', desk_client.messages[1])
+
+    def test_coalesce(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        com = SocketCommunication('host', 'port', 'url', coalesce_window=0.01)
+        com.clients = set()
+        client = TestClient()
+        com.clients.add(client)
+
+        for i in range(5):
+            loop.run_until_complete(com.broadcast(dumps({'event': 'item:updated', 'extra': {'item': 'foo'}})))
+        loop.run_until_complete(com.broadcast(dumps({'event': 'item:updated', 'extra': {'item': 'bar'}})))
+        self.assertEqual(0, len(client.messages))
+
+        loop.run_until_complete(asyncio.sleep(0.05))
+        self.assertEqual(2, len(client.messages))
+        self.assertEqual(4, com.subscriptions[client].coalesced)
+
+    def test_max_pending(self):
+        com = SocketCommunication('host', 'port', 'url', max_pending=5)
+        self.assertEqual(5, com._get_subscription(TestClient()).max_pending)
+
+    def test_slow_client_does_not_block_broadcast(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        com = SocketCommunication('host', 'port', 'url')
+        com.clients = set()
+        slow_client = SlowClient()
+        client = TestClient()
+        com.clients.update([slow_client, client])
+
+        start = time.monotonic()
+        loop.run_until_complete(com.broadcast(dumps({'event': 'foo'})))
+        loop.run_until_complete(asyncio.sleep(0.01))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(1, len(client.messages))
+        self.assertEqual(0, len(slow_client.messages))
+
+    def test_broadcast_threadsafe(self):
+        loop = asyncio.new_event_loop()
+        com = SocketCommunication('host', 'port', 'url', coalesce_window=0.01)
+        com.loop = loop
+        com.clients = set()
+        client = TestClient()
+        com.clients.add(client)
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+        try:
+            for i in range(3):
+                com.broadcast_threadsafe(dumps({'event': 'item:updated', 'extra': {'item': 'foo'}}))
+            time.sleep(0.1)
+            com.broadcast_threadsafe(dumps({'event': 'item:updated', 'extra': {'item': 'foo'}}))
+            time.sleep(0.1)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        self.assertEqual(2, len(client.messages))
+        self.assertFalse(com.subscriptions[client].flush_scheduled)